@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import gc
 import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Sequence
 
 import glfw
+import numpy as np
 import imgui  # type: ignore
 from imgui.integrations.glfw import GlfwRenderer  # type: ignore
 
@@ -23,9 +25,16 @@ from template.shape_gallery import build_shape_scene, is_2d_shape
 from utils.dataset_export import DatasetExporter
 from ui import GradientDescentPanel, ChemistryPanel, GeometryPanel
 
+# Frames drawn after each event so ImGui hover/active states can settle.
+_REDRAW_FRAMES = 3
+# Longest an idle render-on-demand loop sleeps before checking again.
+_IDLE_TIMEOUT = 0.5
+
 
 class App:
-    def __init__(self, width, height, use_trackball):
+    def __init__(
+        self, width, height, use_trackball, render_on_demand=False, max_fps=0.0
+    ):
         # Ensure GLFW is properly terminated before initializing
         try:
             glfw.terminate()
@@ -66,6 +75,7 @@ class App:
         glfw.set_scroll_callback(self.window, self._on_scroll)
         glfw.set_mouse_button_callback(self.window, self._on_mouse_press)
         glfw.set_framebuffer_size_callback(self.window, self._on_resize)
+        glfw.set_window_refresh_callback(self.window, self._on_refresh)
 
         self.renderer = None
         self.ui = None
@@ -82,10 +92,18 @@ class App:
 
         self.use_arcball = use_trackball
 
+        # See EngineConfig.render_on_demand / max_fps.
+        self.render_on_demand = render_on_demand
+        self.max_fps = max_fps
+        self._redraw_frames = _REDRAW_FRAMES
+
         # Initialize dataset exporter
         self.dataset_exporter = DatasetExporter()
+        # Save every rendered frame through asynchronous readback (R key).
+        self.capture_frames = False
 
     def _on_resize(self, window, width, height):
+        self.request_redraw()
         width = max(int(width), 1)
         height = max(int(height), 1)
         self.width = width
@@ -93,7 +111,11 @@ class App:
         self.winsize = (width, height)
         GL.glViewport(0, 0, width, height)
 
+    def _on_refresh(self, window):
+        self.request_redraw()
+
     def _on_mouse_press(self, window, button, action, mods):
+        self.request_redraw()
         if self.ui and self.ui.wants_mouse_capture():
             return
         if (
@@ -106,10 +128,22 @@ class App:
             else:
                 self.mouse_pos = (x_pos, y_pos)
             self.mouse_move = True
+        elif button == glfw.MOUSE_BUTTON_MIDDLE and action == glfw.PRESS:
+            x_pos, y_pos = glfw.get_cursor_pos(self.window)
+            hit = self.renderer.pick(x_pos, y_pos)
+            if hit is None:
+                print("Picked nothing")
+            else:
+                print(
+                    f"Picked {type(hit.node.shape).__name__} at "
+                    f"{tuple(round(float(c), 3) for c in hit.point)} "
+                    f"(distance {hit.distance:.3f})"
+                )
         elif action == glfw.RELEASE:
             self.mouse_move = False
 
     def _on_mouse(self, window, x_pos, y_pos):
+        self.request_redraw()
         if self.ui and self.ui.wants_mouse_capture():
             return
         # window   -> the window where the event occured
@@ -139,6 +173,7 @@ class App:
         # action   -> GLFW_PRESS, GLFW_RELEASE, or GLFW_REPEAT
         # mods     -> modifier bits (GLFW_MOD_SHIFT, CTRL, ALT, SUPER)
 
+        self.request_redraw()
         if (
             self.ui
             and self.ui.wants_keyboard_capture()
@@ -163,6 +198,10 @@ class App:
                 )
             if key == glfw.KEY_V and self.renderer:
                 self._export_dataset()
+            if key == glfw.KEY_P and self.renderer and action == glfw.PRESS:
+                self._export_profile()
+            if key == glfw.KEY_R and self.renderer and action == glfw.PRESS:
+                self._toggle_frame_capture()
             if key in self.pressed_keys:
                 self.pressed_keys[key] = True
         elif action == glfw.RELEASE and key in self.pressed_keys:
@@ -172,6 +211,7 @@ class App:
             handler(key, action, mods)
 
     def _on_scroll(self, window, delta_x, delta_y):
+        self.request_redraw()
         if self.ui and self.ui.wants_mouse_capture():
             return
         if self.renderer:
@@ -195,14 +235,39 @@ class App:
     def get_aspect_ratio(self):
         return self.width / self.height
 
+    def request_redraw(self) -> None:
+        """Mark the window dirty so a render-on-demand loop draws again."""
+        self._redraw_frames = _REDRAW_FRAMES
+
+    def _needs_redraw(self) -> bool:
+        return (
+            self._redraw_frames > 0
+            or any(self.pressed_keys.values())
+            or bool(self.renderer and self.renderer.animating)
+            or self.capture_frames
+        )
+
+    def _wait_events(self) -> None:
+        """Process pending events, blocking while idle or ahead of max_fps."""
+        if self.render_on_demand and not self._needs_redraw():
+            glfw.wait_events_timeout(_IDLE_TIMEOUT)
+            return
+        if self.max_fps > 0.0:
+            deadline = self._last_time + 1.0 / self.max_fps
+            while (remaining := deadline - glfw.get_time()) > 0.0:
+                glfw.wait_events_timeout(remaining)
+        glfw.poll_events()
+
     def run(self):
         while not glfw.window_should_close(self.window):
+            self._wait_events()
+            if self.render_on_demand and not self._needs_redraw():
+                continue
+
             current_time = glfw.get_time()
             delta_time = min(current_time - self._last_time, 0.05)
             self._last_time = current_time
 
-            glfw.poll_events()
-
             if self.ui:
                 self.ui.process_inputs()
                 self.ui.new_frame(delta_time, self.winsize)
@@ -214,11 +279,15 @@ class App:
                 if not (self.ui and self.ui.wants_keyboard_capture()):
                     self._update_camera(delta_time)
                 self.renderer.render(delta_time)
+                if self.capture_frames:
+                    self.dataset_exporter.queue_frame(self.width, self.height)
+                self.dataset_exporter.poll_frames()
 
             if self.ui:
                 self.ui.render()
 
             glfw.swap_buffers(self.window)
+            self._redraw_frames = max(self._redraw_frames - 1, 0)
 
         # Cleanup before terminating
         self.cleanup()
@@ -226,6 +295,12 @@ class App:
     def cleanup(self):
         """Cleanup all resources before terminating."""
         try:
+            # Finish queued frame captures while the context is alive
+            self.dataset_exporter.poll_frames(wait=True)
+            self.dataset_exporter.cleanup()
+            if self.dataset_exporter.export_count:
+                self.dataset_exporter.finalize()
+
             # Cleanup renderer resources
             if self.renderer and hasattr(self.renderer, "cleanup"):
                 self.renderer.cleanup()
@@ -288,6 +363,24 @@ class App:
 
         return models
 
+    def _export_profile(self) -> None:
+        """Write the profiler's recorded frames as a Chrome trace JSON file."""
+        profiler = self.renderer.profiler
+        if not profiler.history:
+            print("No profiled frames; enable the profiler in the Controls panel")
+            return
+        path = Path("profiles") / time.strftime("trace_%Y%m%d_%H%M%S.json")
+        profiler.write_chrome_trace(path)
+        print(f"Saved {len(profiler.history)} profiled frames to {path}")
+
+    def _toggle_frame_capture(self) -> None:
+        self.capture_frames = not self.capture_frames
+        if self.capture_frames:
+            print(f"Capturing frames to {self.dataset_exporter.frames_folder}")
+            return
+        self.dataset_exporter.poll_frames(wait=True)
+        print(f"Stopped capture after {self.dataset_exporter.frame_count} frames")
+
     def _export_dataset(self) -> None:
         """Export current scene to dataset formats (COCO and YOLO)."""
         if not self.renderer or not self.renderer.root:
@@ -439,4 +532,39 @@ class SceneControlOverlay:
                     self._imgui.set_item_default_focus()
             self._imgui.end_combo()
 
+        self._render_profiler()
+
         self._imgui.end()
+
+    def _render_profiler(self) -> None:
+        """Profiler toggle, frame time histograms and per-phase averages."""
+        imgui = self._imgui
+        profiler = self.renderer.profiler
+        if not imgui.collapsing_header("Profiler")[0]:
+            return
+
+        changed, enabled = imgui.checkbox("Enabled##profiler", profiler.enabled)
+        if changed:
+            self.renderer.set_profiling(enabled)
+        if not profiler.history:
+            imgui.text("No frames recorded (P saves a Chrome trace)")
+            return
+
+        for label, times in (
+            ("CPU", profiler.frame_times()),
+            ("GPU", profiler.frame_times(gpu=True)),
+        ):
+            times = times[np.isfinite(times)]
+            if not times.size:
+                continue
+            imgui.plot_histogram(
+                f"##{label}_frame_times",
+                times,
+                overlay_text=f"{label} {times[-1]:.2f} ms (max {times.max():.2f})",
+                scale_min=0.0,
+                graph_size=(0, 60),
+            )
+
+        for name, (cpu_ms, gpu_ms) in profiler.summary().items():
+            gpu_text = "" if gpu_ms is None else f" / GPU {gpu_ms:.3f}"
+            imgui.text(f"{name}: CPU {cpu_ms:.3f}{gpu_text} ms")
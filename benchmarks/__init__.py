@@ -0,0 +1 @@
+"""Rendering benchmark suite; run with ``python -m benchmarks.run``."""
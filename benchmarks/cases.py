@@ -0,0 +1,119 @@
+"""Scenes measured by the benchmark suite."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable
+
+from config import MODEL_TEXTURE_MAP, ShadingModel, ShapeConfig, ShapeType
+from graphics.scene import Node
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+_ASSETS = _REPO_ROOT / "assets"
+_TEXTURES = _REPO_ROOT / "textures"
+_MODEL_SUFFIXES = {".obj", ".ply"}
+
+BOHR_LAYERS = range(1, 8)
+EQUATION_DENSITIES = (100, 250, 500, 1000)
+
+
+@dataclass(slots=True)
+class BenchmarkCase:
+    """A named scene builder plus the renderer state it is viewed with."""
+
+    name: str
+    build: Callable[[], Node]
+    shading: ShadingModel = ShadingModel.PHONG
+    cull_face: bool = True
+    params: dict = field(default_factory=dict)
+
+
+def _registered(name: str) -> Callable[[], Node]:
+    def build() -> Node:
+        from template import get_scene
+
+        return get_scene(name).rebuild()
+
+    return build
+
+
+def _bohr(layers: int) -> Callable[[], Node]:
+    def build() -> Node:
+        from template.atom import build_bohr
+
+        return build_bohr(layers)
+
+    return build
+
+
+def _shape(shape_type: ShapeType, config: ShapeConfig) -> Callable[[], Node]:
+    def build() -> Node:
+        from template.shape_gallery import build_shape_scene
+
+        return build_shape_scene(shape_type, config)
+
+    return build
+
+
+def _model_config(path: Path) -> ShapeConfig:
+    texture = MODEL_TEXTURE_MAP.get(path.name)
+    if texture is None:
+        matches = [
+            candidate
+            for candidate in _TEXTURES.glob(f"{path.stem}.*")
+            if candidate.suffix.lower() in (".png", ".jpg", ".jpeg")
+        ]
+        texture = matches[0].name if matches else None
+    return ShapeConfig(
+        model_file=str(path),
+        texture_file=str(_TEXTURES / texture) if texture else None,
+    )
+
+
+def default_cases() -> list[BenchmarkCase]:
+    """Every scene of the suite, in report order."""
+    cases = [BenchmarkCase("atom", _registered("atom"))]
+    cases += [
+        BenchmarkCase(f"bohr_{layers}", _bohr(layers), params={"layers": layers})
+        for layers in BOHR_LAYERS
+    ]
+    cases += [
+        BenchmarkCase("benzene", _registered("benzene")),
+        BenchmarkCase("gradient_descent", _registered("gradient_descent")),
+    ]
+    cases += [
+        BenchmarkCase(
+            f"equation_{density}",
+            _shape(
+                ShapeType.EQUATION,
+                replace(ShapeConfig(), equation_mesh_density=density),
+            ),
+            shading=ShadingModel.NORMAL,
+            cull_face=False,
+            params={"density": density},
+        )
+        for density in EQUATION_DENSITIES
+    ]
+    for path in sorted(_ASSETS.rglob("*")):
+        if path.suffix.lower() not in _MODEL_SUFFIXES:
+            continue
+        relative = path.relative_to(_ASSETS).as_posix()
+        cases.append(
+            BenchmarkCase(
+                f"model:{relative}",
+                _shape(ShapeType.MODEL, _model_config(path)),
+                params={"file": relative},
+            )
+        )
+    return cases
+
+
+def get_case(name: str) -> BenchmarkCase:
+    for case in default_cases():
+        if case.name == name:
+            return case
+    raise KeyError(name)
+
+
+__all__ = ["BenchmarkCase", "default_cases", "get_case"]
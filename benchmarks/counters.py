@@ -0,0 +1,115 @@
+"""GL call counters for benchmark runs."""
+
+from __future__ import annotations
+
+from OpenGL import GL
+
+_TRIANGLE_MODES = {
+    int(GL.GL_TRIANGLES): lambda count: count // 3,
+    int(GL.GL_TRIANGLE_STRIP): lambda count: max(count - 2, 0),
+    int(GL.GL_TRIANGLE_FAN): lambda count: max(count - 2, 0),
+}
+# (function, index of the vertex count, index of the instance count or None)
+_DRAW_CALLS = (
+    ("glDrawArrays", 2, None),
+    ("glDrawElements", 1, None),
+    ("glDrawArraysInstanced", 2, 3),
+    ("glDrawElementsInstanced", 1, 4),
+)
+_BUFFER_UPLOADS = ("glBufferData", "glBufferSubData")
+# glUniform* entry points that do not upload a value.
+_NOT_UPLOADS = {"glUniformBlockBinding", "glUniformSubroutinesuiv"}
+
+
+class GLCounters:
+    """Counts draw calls, triangles, uniform and buffer uploads.
+
+    While installed (``with GLCounters() as counters:``) the relevant
+    functions of ``OpenGL.GL`` are replaced by counting wrappers; the code
+    base always calls them as ``GL.<name>``, so every draw path is seen.
+    The wrappers add Python overhead, so time frames without them. Draws
+    replayed by `rendering.command_list.CommandList` call GL through ctypes
+    and are not seen; `count_replay` adds them from the list after a frame.
+    """
+
+    def __init__(self):
+        self._originals: dict[str, object] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.draw_calls = 0
+        self.triangles = 0
+        self.uniform_uploads = 0
+        self.buffer_uploads = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "draw_calls": self.draw_calls,
+            "triangles": self.triangles,
+            "uniform_uploads": self.uniform_uploads,
+            "buffer_uploads": self.buffer_uploads,
+        }
+
+    def count_replay(self, command_list) -> None:
+        """Add the draws and triangles of the list's last replay, once."""
+        replayed = command_list.replayed
+        command_list.replayed = replayed[:0]
+        self.draw_calls += int(replayed.size)
+        modes = command_list.mode[replayed]
+        counts = command_list.count[replayed]
+        for mode, triangles in _TRIANGLE_MODES.items():
+            for count in counts[modes == mode].tolist():
+                self.triangles += triangles(count)
+
+    def _wrap_draw(self, original, count_index, instance_index):
+        def draw(*args):
+            self.draw_calls += 1
+            triangles = _TRIANGLE_MODES.get(int(args[0]))
+            if triangles is not None:
+                instances = 1 if instance_index is None else int(args[instance_index])
+                self.triangles += triangles(int(args[count_index])) * instances
+            return original(*args)
+
+        return draw
+
+    def _wrap_counter(self, original, attribute):
+        def call(*args, **kwargs):
+            setattr(self, attribute, getattr(self, attribute) + 1)
+            return original(*args, **kwargs)
+
+        return call
+
+    def install(self) -> None:
+        if self._originals:
+            return
+        wrappers = {}
+        for name, count_index, instance_index in _DRAW_CALLS:
+            wrappers[name] = self._wrap_draw(
+                getattr(GL, name), count_index, instance_index
+            )
+        for name in dir(GL):
+            if name.startswith("glUniform") and name not in _NOT_UPLOADS:
+                wrappers[name] = self._wrap_counter(
+                    getattr(GL, name), "uniform_uploads"
+                )
+        for name in _BUFFER_UPLOADS:
+            wrappers[name] = self._wrap_counter(getattr(GL, name), "buffer_uploads")
+        for name, wrapper in wrappers.items():
+            self._originals[name] = getattr(GL, name)
+            setattr(GL, name, wrapper)
+
+    def uninstall(self) -> None:
+        for name, original in self._originals.items():
+            setattr(GL, name, original)
+        self._originals.clear()
+
+    def __enter__(self) -> GLCounters:
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.uninstall()
+        return False
+
+
+__all__ = ["GLCounters"]
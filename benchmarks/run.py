@@ -0,0 +1,289 @@
+"""Headless rendering benchmarks over the built-in scenes.
+
+    python -m benchmarks.run -o benchmarks/results.json
+    python -m benchmarks.run --case atom --case bohr_7 --set compiled_scene=True
+
+Every case renders a fixed orbit of the camera around the scene through
+`OffscreenApp` and is run in a fresh interpreter, so peak RSS and GL state
+belong to that scene alone.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+if sys.platform.startswith("linux"):
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.cases import BenchmarkCase, default_cases, get_case
+
+# Trackball field of view (see Trackball.get_projection_matrix).
+_TRACKBALL_FOV = 35.0
+_PERCENTILES = (50, 95, 99)
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0)
+
+
+def _fit_distance(root) -> float:
+    """Trackball distance at which every shape's bounding sphere is in view."""
+    from rendering.compiled_scene import CompiledScene
+
+    scene = CompiledScene(root)
+    scene.update()
+    center, radius, _ = scene.world_bounds()
+    mask = scene.cullable
+    if not mask.any():
+        return 10.0
+    extent = float((np.linalg.norm(center[mask], axis=1) + radius[mask]).max())
+    return max(extent / np.sin(np.radians(_TRACKBALL_FOV / 2.0)) * 1.05, 1.0)
+
+
+def _camera(distance: float, frame: int, frames: int, pitch: float):
+    """Trackball pose ``frame`` of a full orbit split into ``frames`` steps."""
+    from config import TrackballConfig
+    from rendering.camera import Trackball
+
+    yaw = 360.0 * frame / max(frames, 1)
+    return Trackball(TrackballConfig(distance=distance, yaw=yaw, pitch=pitch))
+
+
+def measure(case: BenchmarkCase, args: argparse.Namespace) -> dict:
+    """Run one case in this process and return its metrics."""
+    from OpenGL import GL
+
+    from benchmarks.counters import GLCounters
+    from config import EngineConfig
+    from offscreen import OffscreenApp
+    from rendering.renderer import Renderer
+
+    options = dict(args.options)
+    # A fixed timestep is stepped explicitly per frame (see `render`) rather
+    # than by a thread on the wall clock, so every run sees the same poses.
+    options["simulation_thread"] = False
+    cfg = EngineConfig(width=args.size[0], height=args.size[1], **options)
+    app = OffscreenApp(cfg.width, cfg.height, use_trackball=True)
+    try:
+        renderer = Renderer(cfg)
+        app.add_renderer(renderer)
+        renderer.set_shading_model(case.shading)
+        renderer.set_face_culling(case.cull_face)
+
+        start = time.perf_counter()
+        root = case.build()
+        build_ms = (time.perf_counter() - start) * 1000.0
+        renderer.set_scene(root)
+        distance = _fit_distance(root)
+        delta_time = 1.0 / args.fps
+        # Simulation ticks per frame, 0 when animations update per frame.
+        ticks = 0
+        if cfg.fixed_timestep > 0.0:
+            ticks = max(round(delta_time / cfg.fixed_timestep), 1)
+
+        def render(frame: int) -> float:
+            renderer.trackball = _camera(distance, frame, args.frames, args.pitch)
+            start = time.perf_counter()
+            if ticks:
+                renderer.step_simulation(ticks)
+                app.render(0.0)
+            else:
+                app.render(delta_time)
+            GL.glFinish()
+            return (time.perf_counter() - start) * 1000.0
+
+        first_frame_ms = render(0)
+        for frame in range(args.warmup):
+            render(frame)
+        frame_ms = np.array([render(frame) for frame in range(args.frames)])
+
+        # Counted separately: the wrappers would skew the timed frames.
+        stride = max(args.frames // args.count_frames, 1)
+        counted = range(0, args.frames, stride)
+        with GLCounters() as counters:
+            for frame in counted:
+                render(frame)
+                if renderer.use_command_list:
+                    counters.count_replay(renderer.command_list)
+        counts = {
+            name: value / len(counted) for name, value in counters.as_dict().items()
+        }
+
+        percentiles = np.percentile(frame_ms, _PERCENTILES)
+        return {
+            "case": case.name,
+            "params": case.params,
+            "build_ms": build_ms,
+            "first_frame_ms": first_frame_ms,
+            "frame_ms": {
+                **{f"p{p}": float(v) for p, v in zip(_PERCENTILES, percentiles)},
+                "mean": float(frame_ms.mean()),
+                "max": float(frame_ms.max()),
+            },
+            **counts,
+            "nodes": len(renderer.shape_nodes) + len(renderer.light_nodes),
+            "camera_distance": distance,
+            "peak_rss_mb": _peak_rss_mb(),
+            "gl_renderer": GL.glGetString(GL.GL_RENDERER).decode(),
+        }
+    finally:
+        app.cleanup()
+
+
+def _worker_argv(args: argparse.Namespace) -> list[str]:
+    argv = [
+        "--size",
+        *map(str, args.size),
+        *("--frames", str(args.frames), "--warmup", str(args.warmup)),
+        *("--count-frames", str(args.count_frames)),
+        *("--fps", str(args.fps), "--pitch", str(args.pitch)),
+    ]
+    for name, value in args.options:
+        argv += ["--set", f"{name}={value!r}"]
+    return argv
+
+
+def _run_isolated(name: str, args: argparse.Namespace) -> dict:
+    command = [sys.executable, "-m", "benchmarks.run", "--worker", name]
+    command += _worker_argv(args)
+    result = subprocess.run(
+        command,
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {"case": name, "error": result.stderr.strip().splitlines()[-1:]}
+    return json.loads(lines[-1])
+
+
+def _environment(results: list[dict]) -> dict:
+    renderers = {result["gl_renderer"] for result in results if "gl_renderer" in result}
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "gl_renderer": sorted(renderers),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    from offscreen import config_option
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--case",
+        dest="cases",
+        action="append",
+        default=[],
+        help="case name (repeatable, default: all); see --list",
+    )
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("--size", nargs=2, type=int, default=(800, 800))
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--count-frames",
+        type=int,
+        default=12,
+        help="frames of the orbit replayed with GL call counters",
+    )
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--pitch", type=float, default=20.0)
+    parser.add_argument(
+        "--set",
+        dest="options",
+        action="append",
+        type=config_option,
+        default=[],
+        metavar="NAME=VALUE",
+        help="EngineConfig field, e.g. --set render_queue=True",
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run all cases in this interpreter (shared peak RSS)",
+    )
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(get_case(args.worker), args)))
+        return
+
+    cases = default_cases()
+    if args.list:
+        print("\n".join(case.name for case in cases))
+        return
+    if args.cases:
+        known = {case.name for case in cases}
+        unknown = sorted(set(args.cases) - known)
+        if unknown:
+            raise SystemExit(f"Unknown cases: {', '.join(unknown)}")
+        cases = [case for case in cases if case.name in args.cases]
+
+    results = []
+    for case in cases:
+        if args.in_process:
+            result = measure(case, args)
+        else:
+            result = _run_isolated(case.name, args)
+        results.append(result)
+        if "error" in result:
+            print(f"{case.name:<28} failed: {result['error']}")
+            continue
+        frame_ms = result["frame_ms"]
+        print(
+            f"{case.name:<28} p50 {frame_ms['p50']:8.2f} ms"
+            f"  p99 {frame_ms['p99']:8.2f} ms"
+            f"  draws {result['draw_calls']:7.0f}"
+            f"  tris {result['triangles']:10.0f}"
+            f"  build {result['build_ms']:8.1f} ms"
+        )
+
+    report = {
+        "environment": _environment(results),
+        "settings": {
+            "size": list(args.size),
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "fps": args.fps,
+            "pitch": args.pitch,
+            "options": dict(args.options),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text, encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,13 @@ _BLINN_PHONG_FRAGMENT_PATH = _shader_path("graphics", "blinn_phong.frag")
 _NORMAL_VERTEX_PATH = _shader_path("graphics", "normal.vert")
 _NORMAL_FRAGMENT_PATH = _shader_path("graphics", "normal.frag")
 _LIGHT_FRAGMENT_PATH = _shader_path("graphics", "light.frag")
+_BBOX_VERTEX_PATH = _shader_path("graphics", "bbox.vert")
+_BBOX_FRAGMENT_PATH = _shader_path("graphics", "bbox.frag")
+_CLUSTERED_FRAGMENT_PATH = _shader_path("graphics", "phong_clustered.frag")
+_GBUFFER_VERTEX_PATH = _shader_path("graphics", "gbuffer.vert")
+_GBUFFER_FRAGMENT_PATH = _shader_path("graphics", "gbuffer.frag")
+_DEFERRED_VERTEX_PATH = _shader_path("graphics", "deferred.vert")
+_DEFERRED_FRAGMENT_PATH = _shader_path("graphics", "deferred.frag")
 
 
 # Model to texture mapping
@@ -89,7 +96,7 @@ class ShapeConfig:
     equation_mesh_size: int = 10
     equation_mesh_density: int = 100
 
-    texture_file: str = r"textures\wall.jpg"
+    texture_file: str = _shader_path("textures", "wall.jpg")
 
     model_file: str = ""
 
@@ -144,6 +151,59 @@ class EngineConfig:
     camera: CameraConfig = field(default_factory=CameraConfig)
     trackball: TrackballConfig = field(default_factory=TrackballConfig)
     cull_face: bool = True
+    # Flatten the scene graph into depth-ordered arrays and evaluate world
+    # matrices in batches instead of recursing through Node.draw.
+    compiled_scene: bool = False
+    # Sort draws by program, texture, VAO and depth each frame (implies
+    # compiled_scene) so state is only rebound when it changes.
+    render_queue: bool = False
+    # Record the sorted draws once into a command list and replay it every
+    # frame through bare ctypes GL calls; only commands of shapes whose
+    # program or texture changed are rewritten (implies compiled_scene).
+    command_list: bool = False
+    # Skip shapes whose bounding volume lies outside the view frustum
+    # (implies compiled_scene).
+    frustum_culling: bool = False
+    # Skip shapes whose bounding box was fully hidden last frame, using
+    # GL_ANY_SAMPLES_PASSED queries (implies compiled_scene). With
+    # occlusion_use_bvh the boxes of BVH leaves are tested instead of
+    # one box per shape.
+    occlusion_culling: bool = False
+    occlusion_use_bvh: bool = False
+    # Step the built-in orbit/ping-pong/pulse/spin animations together as
+    # packed arrays instead of one closure call per transform.
+    animation_system: bool = False
+    # Seconds per fixed simulation tick (0 updates animations once per frame
+    # instead). Ticks run on a worker thread unless simulation_thread is off,
+    # in which case they are driven deterministically by frame time or run
+    # explicitly with Renderer.step_simulation.
+    fixed_timestep: float = 0.0
+    simulation_thread: bool = True
+    # Shade Phong surfaces with every light in the scene: lights are binned
+    # into a view-space cluster grid (tiles x tiles x depth slices) and each
+    # fragment loops over its own cluster only (implies compiled_scene).
+    clustered_lighting: bool = False
+    cluster_grid: Tuple[int, int, int] = (16, 9, 24)
+    # Write position, normal, albedo and material to a G-buffer and light
+    # every pixel once in a full-screen pass (implies compiled_scene). NORMAL
+    # shading, lights and special Model views still render forward.
+    deferred_shading: bool = False
+    # Render into an offscreen target between resolution_scale_bounds times
+    # the window size and upscale it. The scale follows measured GPU frame
+    # time toward target_frame_time (milliseconds) through a PID controller.
+    dynamic_resolution: bool = False
+    target_frame_time: float = 16.7
+    resolution_scale_bounds: Tuple[float, float] = (0.5, 1.0)
+    # Only redraw when something changed (input, UI interaction, resize or a
+    # running animation) and otherwise block in glfw.wait_events_timeout.
+    # max_fps caps the frame rate while redrawing continuously (0 = uncapped).
+    render_on_demand: bool = False
+    max_fps: float = 0.0
+    # Time renderer phases and per-node draws on the CPU (perf_counter_ns)
+    # and GPU (timestamp queries read a few frames late), keeping the last
+    # profiler_history frames for the overlay and Chrome trace export.
+    profiler: bool = False
+    profiler_history: int = 240
     # cull_face: bool = (
     #     False
     #     if shape
@@ -177,6 +237,13 @@ __all__ = [
     "_NORMAL_VERTEX_PATH",
     "_NORMAL_FRAGMENT_PATH",
     "_LIGHT_FRAGMENT_PATH",
+    "_BBOX_VERTEX_PATH",
+    "_BBOX_FRAGMENT_PATH",
+    "_CLUSTERED_FRAGMENT_PATH",
+    "_GBUFFER_VERTEX_PATH",
+    "_GBUFFER_FRAGMENT_PATH",
+    "_DEFERRED_VERTEX_PATH",
+    "_DEFERRED_FRAGMENT_PATH",
     "CameraMovement",
     "ShapeType",
     "ColorMode",
@@ -0,0 +1,298 @@
+"""Synthetic COCO/YOLO dataset generation across headless worker processes.
+
+    python generate_dataset.py atom benzene assets/catn0.obj --count 1000 --workers 4
+
+Sources are registered scenes or model files. Image ``i`` shows source
+``i % len(sources)`` from a camera direction on that source's Fibonacci
+sphere, with the light color, light position, material tint and
+background drawn from a generator seeded with ``(seed, i)``, so the
+dataset does not depend on the number of workers. Every worker owns a
+surfaceless EGL context (`OffscreenApp`) and writes its own
+`DatasetExporter` shard, which are merged into ``--output`` at the end in
+sample order.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+if sys.platform.startswith("linux"):
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+import argparse
+import math
+import multiprocessing
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from OpenGL import GL
+
+from config import EngineConfig, ShapeConfig, ShapeType, TrackballConfig
+from graphics.scene import GeometryNode, LightNode
+from offscreen import OffscreenApp, config_option
+from rendering.camera import Trackball
+from rendering.compiled_scene import CompiledScene
+from rendering.renderer import Renderer
+from template import get_scene, list_scenes
+from template.shape_gallery import build_shape_scene
+from utils.dataset_export import DatasetExporter
+from utils.transform import quaternion_from_axis_angle, quaternion_mul
+
+_MODEL_SUFFIXES = {".obj", ".ply", ".fbx", ".gltf", ".glb"}
+# Trackball field of view (see Trackball.get_projection_matrix).
+_TRACKBALL_FOV = 35.0
+
+
+def fibonacci_sphere(count: int) -> np.ndarray:
+    """(count, 3) evenly spread unit vectors, the spiral of `template.molecule`."""
+    index = np.arange(count, dtype=np.float64)
+    z = 1.0 - 2.0 * (index + 0.5) / max(count, 1)
+    radius = np.sqrt(1.0 - z * z)
+    angle = math.pi * (3.0 - math.sqrt(5.0)) * index
+    return np.stack([np.cos(angle) * radius, np.sin(angle) * radius, z], axis=1)
+
+
+def look_from(direction: np.ndarray) -> np.ndarray:
+    """Trackball rotation placing the camera along ``direction`` from the target."""
+    x, y, z = (float(value) for value in direction)
+    yaw = math.degrees(math.atan2(x, z))
+    pitch = math.degrees(math.asin(max(-1.0, min(1.0, y))))
+    return quaternion_mul(
+        quaternion_from_axis_angle((1.0, 0.0, 0.0), pitch),
+        quaternion_from_axis_angle((0.0, 1.0, 0.0), -yaw),
+    )
+
+
+def build_source(source: str):
+    if Path(source).suffix.lower() in _MODEL_SUFFIXES:
+        return build_shape_scene(ShapeType.MODEL, ShapeConfig(model_file=source))
+    return get_scene(source).rebuild()
+
+
+def _fit_distance(root) -> float:
+    """Trackball distance at which every shape's bounding sphere is in view."""
+    scene = CompiledScene(root)
+    scene.update()
+    center, radius, _ = scene.world_bounds()
+    mask = scene.cullable
+    if not mask.any():
+        return 10.0
+    extent = float((np.linalg.norm(center[mask], axis=1) + radius[mask]).max())
+    return max(extent / np.sin(np.radians(_TRACKBALL_FOV / 2.0)) * 1.05, 1.0)
+
+
+def _shapes(node, kind):
+    found = [node.shape] if isinstance(node, kind) else []
+    for child in node.children:
+        found.extend(_shapes(child, kind))
+    return found
+
+
+def _randomize(renderer, shapes, lights, direction, distance, rng, args) -> dict:
+    """Apply one sample's camera, lighting and colors; returns what was drawn."""
+    renderer.trackball = Trackball(TrackballConfig(distance=distance))
+    renderer.trackball.rotation = look_from(direction)
+
+    light_color = rng.uniform(0.6, 1.0, 3) * rng.uniform(0.6, 1.4)
+    light_offset = rng.normal(size=3) * args.light_jitter
+    for light in lights:
+        light.color = light_color.astype(np.float32)
+        light.position = light_offset.astype(np.float32)
+    # Shapes share their programs, so one tint per image.
+    tint = rng.uniform(0.4, 1.0, 3)
+    for shape in shapes:
+        shape.diffuse = tuple(tint)
+    background = rng.uniform(0.0, 0.4, 3)
+    GL.glClearColor(*background, 1.0)
+
+    return {
+        "camera_direction": direction.tolist(),
+        "camera_distance": distance,
+        "light_color": light_color.tolist(),
+        "light_offset": light_offset.tolist(),
+        "material_tint": tint.tolist(),
+        "background": background.tolist(),
+    }
+
+
+def _exporter(args: argparse.Namespace, folder: Path, **options) -> DatasetExporter:
+    return DatasetExporter(
+        folder,
+        depth_format=args.depth_format,
+        output=args.output_format,
+        shard_size=args.shard_size << 20,
+        **options,
+    )
+
+
+def run_shard(args: argparse.Namespace, shard: int) -> dict:
+    """Render every ``args.workers``-th image starting at ``shard`` into a shard."""
+    width, height = args.size
+    by_source = defaultdict(list)
+    for sample in range(shard, args.count, args.workers):
+        by_source[sample % len(args.sources)].append(sample)
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    folder = args.output / f"shard_{shard:02d}"
+    shutil.rmtree(folder, ignore_errors=True)  # left over from an aborted run
+    app = OffscreenApp(width, height, use_trackball=True)
+    exporter = _exporter(args, folder, segmentation=args.segmentation)
+    try:
+        options = dict(args.options)
+        # With a fixed timestep, keep ticks off the wall clock: captures render
+        # with zero frame time, so every sample shows the starting pose.
+        options["simulation_thread"] = False
+        renderer = Renderer(EngineConfig(width=width, height=height, **options))
+        app.add_renderer(renderer)
+        for index, samples in by_source.items():
+            source = args.sources[index]
+            root = build_source(source)
+            renderer.set_scene(root)
+            distance = _fit_distance(root)
+            shapes = _shapes(root, GeometryNode)
+            lights = _shapes(root, LightNode)
+            # Poses of this source cover its own sphere.
+            total = len(range(index, args.count, len(args.sources)))
+            directions = fibonacci_sphere(total)
+            for sample in samples:
+                rng = np.random.default_rng((args.seed, sample))
+                scale = rng.uniform(*args.distance_scale)
+                metadata = _randomize(
+                    renderer,
+                    shapes,
+                    lights,
+                    directions[sample // len(args.sources)],
+                    distance * scale,
+                    rng,
+                    args,
+                )
+                capture = exporter.capture_pass.capture(
+                    renderer, width, height, coverage=True
+                )
+                stats = capture.stats()
+                bboxes = exporter.mask_bounding_boxes(capture.instance, stats)
+                exporter.export_capture(
+                    capture,
+                    list(bboxes.values()),
+                    {"source": source, "sample": sample, **metadata},
+                    instance_ids=list(bboxes),
+                    stats=stats,
+                )
+        exporter.flush()
+    finally:
+        exporter.cleanup()
+        app.cleanup()
+    return {
+        "shard": shard,
+        "images": exporter.export_count,
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - cpu_start,
+    }
+
+
+def generate(args: argparse.Namespace) -> dict:
+    """Run the shards in parallel and merge them into ``args.output``."""
+    args.output.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    # Fresh interpreters: a forked process would inherit the parent's GL state.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+        futures = [pool.submit(run_shard, args, shard) for shard in range(args.workers)]
+        shards = [future.result() for future in futures]
+    render_seconds = time.perf_counter() - start
+
+    # Numbered by sample index, so the dataset does not depend on --workers.
+    dataset = _exporter(args, args.output)
+    folders = [args.output / f"shard_{shard['shard']:02d}" for shard in shards]
+    dataset.merge_shards(folders, order=lambda image: image["metadata"]["sample"])
+    dataset.flush()  # copies the tar samples out of the shard folders
+    for folder in folders:
+        shutil.rmtree(folder)
+    annotations = dataset.finalize()
+    dataset.cleanup()
+
+    seconds = time.perf_counter() - start
+    images = sum(shard["images"] for shard in shards)
+    return {
+        "images": images,
+        "workers": args.workers,
+        "seconds": seconds,
+        "render_seconds": render_seconds,
+        "images_per_second": images / seconds,
+        "images_per_second_per_core": images / seconds / args.workers,
+        "cpu_seconds": sum(shard["cpu_seconds"] for shard in shards),
+        "annotations": str(annotations),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "sources", nargs="+", help="registered scene names or model files"
+    )
+    parser.add_argument("-o", "--output", type=Path, default=Path("dataset"))
+    parser.add_argument("--count", type=int, default=100, help="images to render")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--size", nargs=2, type=int, default=(640, 480))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth-format", choices=("npy", "png16"), default="npy")
+    parser.add_argument("--segmentation", choices=("rle", "polygon"), default="rle")
+    parser.add_argument(
+        "--output-format",
+        choices=("files", "tar"),
+        default="files",
+        help="COCO/YOLO folders, or WebDataset tar shards with an index",
+    )
+    parser.add_argument(
+        "--shard-size", type=int, default=1024, help="tar shard size in MiB"
+    )
+    parser.add_argument(
+        "--distance-scale",
+        nargs=2,
+        type=float,
+        default=(1.0, 1.5),
+        help="range of the camera distance relative to the fitted one",
+    )
+    parser.add_argument(
+        "--light-jitter",
+        type=float,
+        default=15.0,
+        help="standard deviation of the light position offset",
+    )
+    parser.add_argument(
+        "--set",
+        dest="options",
+        action="append",
+        type=config_option,
+        default=[],
+        metavar="NAME=VALUE",
+        help="EngineConfig field, e.g. --set compiled_scene=True",
+    )
+    args = parser.parse_args(argv)
+    scenes = set(list_scenes())
+    for source in args.sources:
+        if source not in scenes and not Path(source).is_file():
+            parser.error(f"{source!r} is neither a registered scene nor a file")
+    args.count = max(args.count, 0)
+    args.workers = max(min(args.workers, args.count), 1)
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    report = generate(args)
+    print(
+        f"{report['images']} images in {report['seconds']:.1f} s on "
+        f"{report['workers']} workers: {report['images_per_second']:.2f} images/s, "
+        f"{report['images_per_second_per_core']:.2f} images/s/core"
+    )
+    print(report["annotations"])
+
+
+if __name__ == "__main__":
+    main()
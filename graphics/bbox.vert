@@ -0,0 +1,12 @@
+#version 330 core
+
+layout (location = 0) in vec3 position;
+
+uniform vec3 box_center;
+uniform vec3 box_extent;
+uniform mat4 view_proj;
+
+void main()
+{
+    gl_Position = view_proj * vec4(box_center + position * box_extent, 1.0);
+}
@@ -1,6 +1,8 @@
 #version 330 core
 
-out vec4 color;
+layout (location = 0) out vec4 color;
+// Capture target, written only while bound as a draw buffer (rendering/capture.py).
+layout (location = 1) out uint instanceId;
 
 in vec3 vertexColor; // this turn into position for fragment, not vertex anymore
 in vec3 vertexNorm;
@@ -10,6 +12,8 @@ in vec2 textureCoord;
 uniform sampler2D textureData;
 uniform bool use_texture;
 
+uniform uint instance_id;
+
 uniform mat3 I_lights;
 uniform mat3 K_materials;
 
@@ -44,4 +48,5 @@ void main()
     }
 
     color = vec4(finalColor, 1.0);
+    instanceId = instance_id;
 }
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""Local-space bounding volumes for shapes."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class Bounds:
+    """Axis-aligned box plus an enclosing sphere around the same points."""
+
+    minimum: np.ndarray
+    maximum: np.ndarray
+    center: np.ndarray
+    radius: float
+
+    @classmethod
+    def from_points(cls, points: np.ndarray) -> Bounds | None:
+        points = np.asarray(points, dtype=np.float32)
+        if points.size == 0:
+            return None
+        points = points.reshape(len(points), -1)
+        if points.shape[1] < 3:
+            points = np.pad(points, ((0, 0), (0, 3 - points.shape[1])))
+        points = points[:, :3]
+        minimum = points.min(axis=0)
+        maximum = points.max(axis=0)
+        center = (minimum + maximum) * 0.5
+        radius = float(np.sqrt(((points - center) ** 2).sum(axis=1).max()))
+        return cls(minimum, maximum, center, radius)
+
+    @classmethod
+    def from_point_sets(cls, point_sets: Iterable[np.ndarray]) -> Bounds | None:
+        point_sets = [points for points in point_sets if points is not None]
+        if not point_sets:
+            return None
+        return cls.from_points(np.vstack([np.asarray(p)[:, :3] for p in point_sets]))
+
+    @property
+    def extent(self) -> np.ndarray:
+        """Half size of the box along each axis."""
+        return (self.maximum - self.minimum) * 0.5
+
+
+__all__ = ["Bounds"]
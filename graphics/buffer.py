@@ -1,3 +1,5 @@
+import numpy as np
+
 from OpenGL import GL
 
 
@@ -9,6 +11,10 @@ class VAO:
         GL.glBindVertexArray(0)
         self.vbos = {}
         self.ebo = None
+        # CPU-side references to positions and indices, used for bounds
+        # and picking.
+        self.positions = None
+        self.indices = None
 
     def add_vbo(self, location, data, ncomponents, dtype, normalized, stride, offset):
         self.activate()
@@ -18,6 +24,10 @@ class VAO:
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vbo)
         GL.glBufferData(GL.GL_ARRAY_BUFFER, data, GL.GL_STATIC_DRAW)
         self.vbos[location] = vbo
+        if location == 0:
+            self.positions = np.asarray(data, dtype=np.float32).reshape(
+                -1, ncomponents
+            )
 
         # Bind VBO
         GL.glVertexAttribPointer(
@@ -42,6 +52,7 @@ class VAO:
         GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, data, GL.GL_STATIC_DRAW)
         # Store reference; keep EBO bound while VAO is active so the binding is recorded in VAO state
         self.ebo = ebo
+        self.indices = np.asarray(data).ravel()
 
         # Deactivate VAO first so unbinding the EBO (if desired) won't clear the VAO's EBO binding
         self.deactivate()
@@ -0,0 +1,47 @@
+#version 330 core
+
+out vec4 color;
+
+uniform sampler2D gPosition;
+uniform sampler2D gNormal;
+uniform sampler2D gAlbedo;
+uniform sampler2D gMaterial;
+uniform sampler2D gSpecular;
+uniform sampler2D gDepth;
+
+uniform mat3 I_lights;
+uniform vec3 lightCoord;
+uniform bool blinn;
+
+void main()
+{
+    ivec2 pixel = ivec2(gl_FragCoord.xy);
+    float depth = texelFetch(gDepth, pixel, 0).r;
+    if (depth >= 1.0)
+    {
+        discard;
+    }
+
+    vec4 albedo = texelFetch(gAlbedo, pixel, 0);
+    vec3 finalColor = albedo.rgb;
+    if (albedo.a > 0.0)
+    {
+        vec3 vertexCoord = texelFetch(gPosition, pixel, 0).xyz;
+        vec3 vectorNorm = normalize(texelFetch(gNormal, pixel, 0).xyz);
+        vec4 material = texelFetch(gMaterial, pixel, 0);
+        vec3 specularColor = texelFetch(gSpecular, pixel, 0).rgb;
+
+        vec3 lightDirection = normalize(lightCoord - vertexCoord);
+        vec3 cameraDirection = normalize(-vertexCoord);
+        float specular = blinn
+            ? max(dot(vectorNorm, normalize(cameraDirection + lightDirection)), 0.0)
+            : max(dot(cameraDirection, reflect(-lightDirection, vectorNorm)), 0.0);
+
+        vec3 lighting = I_lights[0] * material.rgb * max(dot(lightDirection, vectorNorm), 0.0)
+            + I_lights[1] * specularColor * pow(specular, material.w);
+        finalColor += albedo.a * lighting;
+    }
+
+    color = vec4(finalColor, 1.0);
+    gl_FragDepth = depth;
+}
@@ -0,0 +1,54 @@
+#version 330 core
+
+layout (location = 0) out vec4 gPosition;
+layout (location = 1) out vec4 gNormal;
+layout (location = 2) out vec4 gAlbedo;
+layout (location = 3) out vec4 gMaterial;
+layout (location = 4) out vec4 gSpecular;
+
+in vec3 vertexColor;
+in vec3 vertexNorm;
+in vec3 vertexCoord;
+in vec2 textureCoord;
+in vec3 litColor;
+
+uniform sampler2D textureData;
+uniform bool use_texture;
+uniform bool gouraud;
+
+uniform mat3 I_lights;
+uniform mat3 K_materials;
+uniform float shininess;
+
+void main()
+{
+    gPosition = vec4(vertexCoord, 1.0);
+    gNormal = vec4(normalize(vertexNorm), 0.0);
+    // Per-channel diffuse and specular coefficients, as the forward shaders'
+    // matrixCompMult(K_materials, I_lights) uses them.
+    gMaterial = vec4(K_materials[0], shininess);
+    gSpecular = vec4(K_materials[1], 0.0);
+
+    // albedo.rgb is the unlit part of the forward result, including the
+    // ambient term, and albedo.a the weight of the diffuse and specular
+    // terms added to it in the resolve pass.
+    if (gouraud)
+    {
+        vec3 finalColor = litColor;
+        if (use_texture)
+        {
+            finalColor = mix(finalColor, texture(textureData, textureCoord).rgb, 0.5);
+        }
+        gAlbedo = vec4(finalColor, 0.0);
+        return;
+    }
+
+    vec3 base = vertexColor * 0.5;
+    float weight = 0.5;
+    if (use_texture)
+    {
+        base = base * 0.2 + texture(textureData, textureCoord).rgb * 0.8;
+        weight = 0.1;
+    }
+    gAlbedo = vec4(base + weight * K_materials[2] * I_lights[2], weight);
+}
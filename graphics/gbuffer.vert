@@ -0,0 +1,46 @@
+#version 330 core
+
+layout (location = 0) in vec3 position;
+layout (location = 1) in vec3 color;
+layout (location = 2) in vec3 norm;
+layout (location = 3) in vec2 texture;
+
+out vec3 vertexColor;
+out vec3 vertexNorm;
+out vec3 vertexCoord;
+out vec2 textureCoord;
+out vec3 litColor;
+
+uniform mat4 transform;
+uniform mat4 camera;
+uniform mat4 project;
+
+// Gouraud shading is resolved per vertex here, exactly like gouraud.vert.
+uniform bool gouraud;
+uniform mat3 I_lights;
+uniform mat3 K_materials;
+uniform float shininess;
+uniform vec3 lightCoord;
+
+void main()
+{
+    vertexColor = color;
+    textureCoord = texture;
+
+    vec4 vertexCoord_homo = camera * transform * vec4(position, 1.0);
+    vertexCoord = vec3(vertexCoord_homo) / vertexCoord_homo.w;
+    vertexNorm = mat3(transpose(inverse(camera * transform))) * norm;
+
+    litColor = vec3(0.0);
+    if (gouraud)
+    {
+        vec3 N = normalize(vertexNorm);
+        vec3 L = normalize(lightCoord - vertexCoord);
+        vec3 V = normalize(-vertexCoord);
+        vec3 R = reflect(-L, N);
+        vec3 g = vec3(max(dot(L, N), 0.0), pow(max(dot(V, R), 0.0), shininess), 1.0);
+        litColor = color * 0.5 + matrixCompMult(K_materials, I_lights) * g * 0.5;
+    }
+
+    gl_Position = project * vertexCoord_homo;
+}
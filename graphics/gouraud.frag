@@ -1,6 +1,8 @@
 #version 330 core
 
-out vec4 color;
+layout (location = 0) out vec4 color;
+// Capture target, written only while bound as a draw buffer (rendering/capture.py).
+layout (location = 1) out uint instanceId;
 
 in vec3 vertexColor;
 in vec3 litColor;  // Pre-calculated and interpolated lighting color
@@ -9,6 +11,8 @@ in vec2 textureCoord;
 uniform sampler2D textureData;
 uniform bool use_texture;
 
+uniform uint instance_id;
+
 void main()
 {
     vec3 finalColor = litColor;
@@ -19,4 +23,5 @@ void main()
     }
     
     color = vec4(finalColor, 1.0);
+    instanceId = instance_id;
 }
@@ -1,8 +1,11 @@
 #version 330 core
 
-out vec4 color;
+layout (location = 0) out vec4 color;
+// Not an instance: ID 0 in the capture pass's ID target
+layout (location = 1) out uint instanceId;
 
 void main()
 {
     color = vec4(1.0);
+    instanceId = 0u;
 }
\ No newline at end of file
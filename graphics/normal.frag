@@ -1,6 +1,8 @@
 #version 330 core
 
-out vec4 color;
+layout (location = 0) out vec4 color;
+// Capture target, written only while bound as a draw buffer (rendering/capture.py).
+layout (location = 1) out uint instanceId;
 
 in vec3 vertexColor;
 in vec2 textureCoord;
@@ -8,6 +10,8 @@ in vec2 textureCoord;
 uniform sampler2D textureData;
 uniform bool use_texture;
 
+uniform uint instance_id;
+
 void main()
 {
     vec3 finalColor = vertexColor;
@@ -18,4 +22,5 @@ void main()
     }
     
     color = vec4(finalColor, 1.0);
+    instanceId = instance_id;
 }
@@ -0,0 +1,77 @@
+#version 330 core
+
+layout (location = 0) out vec4 color;
+// Capture target, written only while bound as a draw buffer (rendering/capture.py).
+layout (location = 1) out uint instanceId;
+
+in vec3 vertexColor;
+in vec3 vertexNorm;
+in vec3 vertexCoord;
+in vec2 textureCoord;
+
+uniform sampler2D textureData;
+uniform bool use_texture;
+
+uniform uint instance_id;
+
+uniform mat3 K_materials;
+uniform float shininess;
+
+// Two texels per light: (eye-space position, range), (color, unused).
+uniform samplerBuffer lightData;
+// One texel per cluster: (first entry in lightIndex, light count).
+uniform usamplerBuffer clusterGrid;
+uniform usamplerBuffer lightIndex;
+
+uniform ivec3 cluster_dims;
+uniform vec2 tile_size;
+// slice = log(-z) * slice_scale + slice_bias
+uniform float slice_scale;
+uniform float slice_bias;
+
+void main()
+{
+    vec3 vectorNorm = normalize(vertexNorm);
+    vec3 cameraDirection = normalize(-vertexCoord);
+
+    ivec3 cell = ivec3(
+        int(gl_FragCoord.x / tile_size.x),
+        int(gl_FragCoord.y / tile_size.y),
+        int(floor(log(max(-vertexCoord.z, 1e-6)) * slice_scale + slice_bias))
+    );
+    cell = clamp(cell, ivec3(0), cluster_dims - 1);
+    int cluster = (cell.z * cluster_dims.y + cell.y) * cluster_dims.x + cell.x;
+    uvec2 range = texelFetch(clusterGrid, cluster).xy;
+
+    vec3 fragColor = vec3(0.0);
+    for (uint i = 0u; i < range.y; ++i)
+    {
+        int light = int(texelFetch(lightIndex, int(range.x + i)).r);
+        vec4 positionRange = texelFetch(lightData, light * 2);
+        vec3 lightColor = texelFetch(lightData, light * 2 + 1).rgb;
+
+        vec3 toLight = positionRange.xyz - vertexCoord;
+        float ratio = length(toLight) / positionRange.w;
+        float falloff = clamp(1.0 - ratio * ratio, 0.0, 1.0);
+        falloff *= falloff;
+
+        vec3 lightDirection = normalize(toLight);
+        vec3 reflectDirection = reflect(-lightDirection, vectorNorm);
+        vec3 g = vec3(
+            max(dot(lightDirection, vectorNorm), 0.0),
+            pow(max(dot(cameraDirection, reflectDirection), 0.0), shininess),
+            1.0
+        );
+        fragColor += matrixCompMult(K_materials, mat3(lightColor, lightColor, lightColor)) * g * falloff;
+    }
+    vec3 finalColor = vertexColor * 0.5 + fragColor * 0.5;
+
+    if (use_texture)
+    {
+        vec3 texColor = texture(textureData, textureCoord).rgb;
+        finalColor = mix(finalColor, texColor, 0.8);
+    }
+
+    color = vec4(finalColor, 1.0);
+    instanceId = instance_id;
+}
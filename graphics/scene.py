@@ -4,6 +4,10 @@ from rendering.world import Transform
 
 
 class Node:
+    # Bumped whenever a node is created or gains a child so flattened copies
+    # of the tree (see rendering.compiled_scene) know when to rebuild.
+    structure_version: int = 0
+
     def __init__(
         self,
         name: str = "Node",
@@ -11,9 +15,11 @@ class Node:
     ):
         self.name: str = name
         self.children: list["Node"] = children if children else []
+        Node.structure_version += 1
 
     def add(self, child):
         self.children.append(child)
+        Node.structure_version += 1
 
     def draw(self, parent_matrix, view, proj):
         if parent_matrix is None:
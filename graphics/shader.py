@@ -35,10 +35,36 @@ class Shader:
 
 
 class ShaderProgram:
+    # Linked programs keyed by their shader sources, see `shared`.
+    _shared: dict[tuple[str, ...], "ShaderProgram"] = {}
+
     def __init__(self):
         self.shaders = {}
         self.program = GL.glCreateProgram()
 
+    @classmethod
+    def shared(cls, *sources):
+        """Return the program built from ``sources``, compiling it only once.
+
+        Shapes use the same handful of programs, so sharing them avoids a
+        compile per shape and lets the renderer group draws by program.
+        """
+        program = cls._shared.get(sources)
+        if program is None or program.program is None:
+            program = cls()
+            for source in sources:
+                program.add_shader(Shader(source))
+            program.build()
+            cls._shared[sources] = program
+        return program
+
+    @classmethod
+    def release_shared(cls):
+        """Delete every shared program (call before the context goes away)."""
+        for program in cls._shared.values():
+            program.cleanup()
+        cls._shared.clear()
+
     def add_shader(self, shader):
         self.shaders[shader.source] = shader.shader
 
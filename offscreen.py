@@ -0,0 +1,266 @@
+"""Headless rendering through a surfaceless EGL context.
+
+Renders a registered scene from ``template/`` into an offscreen framebuffer
+and writes PNG files, without opening a window:
+
+    python offscreen.py atom -o atom.png --size 800 800 --yaw 30 --frames 60
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+if sys.platform.startswith("linux"):
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+import argparse
+import ast
+import ctypes
+from dataclasses import fields
+from pathlib import Path
+
+import numpy as np
+from OpenGL import EGL, GL
+
+from config import EngineConfig, TrackballConfig
+from rendering.readback import PixelReadback
+from rendering.renderer import Renderer
+from template import get_scene, list_scenes
+from utils.export_writer import ExportWriter
+
+# EGL_MESA_platform_surfaceless: a display that needs no GPU or window system.
+_EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+
+def _get_display():
+    try:
+        from OpenGL.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+
+        display = eglGetPlatformDisplayEXT(
+            _EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None
+        )
+    except Exception:
+        display = None
+    if not display:
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not display:
+        raise RuntimeError("No EGL display available")
+    return display
+
+
+def create_egl_context():
+    """Create a surfaceless OpenGL 3.3 core context and make it current."""
+    display = _get_display()
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("EGL failed to initialize")
+
+    config_attribs = (EGL.EGLint * 5)(
+        EGL.EGL_RENDERABLE_TYPE,
+        EGL.EGL_OPENGL_BIT,
+        EGL.EGL_SURFACE_TYPE,
+        EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_NONE,
+    )
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if (
+        not EGL.eglChooseConfig(
+            display, config_attribs, ctypes.pointer(config), 1, ctypes.pointer(count)
+        )
+        or count.value < 1
+    ):
+        raise RuntimeError("No EGL config supports desktop OpenGL")
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attribs = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION,
+        3,
+        EGL.EGL_CONTEXT_MINOR_VERSION,
+        3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+        EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE,
+    )
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attribs)
+    if not context:
+        raise RuntimeError("EGL failed to create an OpenGL 3.3 core context")
+    if not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise RuntimeError("EGL surfaceless contexts are not supported")
+    return display, context
+
+
+class OffscreenApp:
+    """Windowless counterpart of `App` rendering into a framebuffer object.
+
+    It offers the attributes `Renderer` reads from its app (``winsize``,
+    ``get_aspect_ratio``), so the same renderer and scenes run unchanged.
+    """
+
+    def __init__(self, width, height, use_trackball=True):
+        self.width = max(int(width), 1)
+        self.height = max(int(height), 1)
+        self.winsize = (self.width, self.height)
+        self.use_arcball = use_trackball
+        self.renderer = None
+
+        self._display, self._context = create_egl_context()
+
+        self.fbo = GL.glGenFramebuffers(1)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        self.color, self.depth = GL.glGenRenderbuffers(2)
+        for renderbuffer, internal_format, attachment in (
+            (self.color, GL.GL_RGBA8, GL.GL_COLOR_ATTACHMENT0),
+            (self.depth, GL.GL_DEPTH_COMPONENT24, GL.GL_DEPTH_ATTACHMENT),
+        ):
+            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, renderbuffer)
+            GL.glRenderbufferStorage(
+                GL.GL_RENDERBUFFER, internal_format, self.width, self.height
+            )
+            GL.glFramebufferRenderbuffer(
+                GL.GL_FRAMEBUFFER, attachment, GL.GL_RENDERBUFFER, renderbuffer
+            )
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Incomplete framebuffer (status 0x{int(status):x})")
+        GL.glViewport(0, 0, self.width, self.height)
+
+    def add_renderer(self, renderer):
+        renderer.use_trackball = self.use_arcball
+        renderer.app = self
+        self.renderer = renderer
+
+    def get_aspect_ratio(self):
+        return self.width / self.height
+
+    def render(self, delta_time: float) -> None:
+        """Draw one frame into the framebuffer."""
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glViewport(0, 0, self.width, self.height)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        if self.renderer:
+            self.renderer.render(delta_time)
+
+    def read_pixels(self) -> np.ndarray:
+        """The last frame as a top-down (height, width, 3) uint8 array."""
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.fbo)
+        GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        data = GL.glReadPixels(
+            0, 0, self.width, self.height, GL.GL_RGB, GL.GL_UNSIGNED_BYTE
+        )
+        pixels = np.frombuffer(data, dtype=np.uint8)
+        return pixels.reshape(self.height, self.width, 3)[::-1].copy()
+
+    def cleanup(self):
+        """Release the renderer, the framebuffer and the EGL context."""
+        if self._context is None:
+            return
+        try:
+            if self.renderer and hasattr(self.renderer, "cleanup"):
+                self.renderer.cleanup()
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+            GL.glDeleteFramebuffers(1, [self.fbo])
+            GL.glDeleteRenderbuffers(2, [self.color, self.depth])
+        finally:
+            EGL.eglMakeCurrent(
+                self._display,
+                EGL.EGL_NO_SURFACE,
+                EGL.EGL_NO_SURFACE,
+                EGL.EGL_NO_CONTEXT,
+            )
+            EGL.eglDestroyContext(self._display, self._context)
+            EGL.eglTerminate(self._display)
+            self._context = None
+
+
+def config_option(text: str) -> tuple[str, object]:
+    name, sep, value = text.partition("=")
+    names = {item.name for item in fields(EngineConfig)}
+    if not sep or name not in names:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=VALUE with NAME in {sorted(names)}"
+        )
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scene", choices=list_scenes())
+    parser.add_argument("-o", "--output", type=Path, default=Path("frame.png"))
+    parser.add_argument("--size", nargs=2, type=int, default=(1000, 1000))
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument(
+        "--fps", type=float, default=60.0, help="animation rate of the frames"
+    )
+    parser.add_argument("--distance", type=float, default=10.0)
+    parser.add_argument("--yaw", type=float, default=0.0)
+    parser.add_argument("--pitch", type=float, default=0.0)
+    parser.add_argument("--roll", type=float, default=0.0)
+    parser.add_argument(
+        "--set",
+        dest="options",
+        action="append",
+        type=config_option,
+        default=[],
+        metavar="NAME=VALUE",
+        help="EngineConfig field, e.g. --set compiled_scene=True",
+    )
+    return parser.parse_args(argv)
+
+
+def frame_path(output: Path, frame: int, frames: int) -> Path:
+    if frames <= 1:
+        return output
+    return output.with_name(f"{output.stem}_{frame:04d}{output.suffix}")
+
+
+def _save(frames: list[tuple[Path, np.ndarray]], writer: ExportWriter) -> None:
+    for path, image in frames:
+        writer.save_image(image, [path])
+        print(path)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    cfg = EngineConfig(
+        width=args.size[0],
+        height=args.size[1],
+        trackball=TrackballConfig(
+            distance=args.distance,
+            yaw=args.yaw,
+            pitch=args.pitch,
+            roll=args.roll,
+        ),
+        **dict(args.options),
+    )
+
+    app = OffscreenApp(cfg.width, cfg.height, use_trackball=True)
+    try:
+        renderer = Renderer(cfg)
+        app.add_renderer(renderer)
+        renderer.set_scene(get_scene(args.scene).get_root())
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        # Frames are read back asynchronously and saved while later ones render.
+        readback = PixelReadback()
+        writer = ExportWriter()
+        for frame in range(args.frames):
+            app.render(1.0 / args.fps)
+            path = frame_path(args.output, frame, args.frames)
+            readback.queue(app.width, app.height, path)
+            _save(readback.poll(), writer)
+        _save(readback.poll(wait=True), writer)
+        readback.cleanup()
+        writer.close()
+    finally:
+        app.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import math
 import numpy as np
+from dataclasses import dataclass
 import sympy as sp
 from typing import Callable, Iterable, Any
 from utils import *
@@ -11,6 +12,25 @@ from shape import Equation
 AnimationFn = Callable[[object, float], None]
 
 
+@dataclass(slots=True)
+class AnimationSpec:
+    """Parameters and running phase of a built-in animation.
+
+    Attached to the closure as ``update.spec`` so `AnimationSystem` can take
+    the animation over and step many of them together; the closure and the
+    system share the phase, so either can resume where the other stopped.
+    """
+
+    kind: str
+    speed: float = 1.0
+    phase: float = 0.0
+    # Orbit radius, ping-pong amplitude or pulse range.
+    amplitude: float = 1.0
+    # Ping-pong center or pulse minimum.
+    offset: float = 0.0
+    axes: tuple[int, ...] = ()
+
+
 def gradient_descent(
     equation: Equation,
     start_pos: Iterable[float, float, float],
@@ -171,32 +191,37 @@ def gradient_descent(
 
 
 def infinite_spin(speed: float = 1.0) -> AnimationFn:
+    spec = AnimationSpec("spin", speed=speed)
+
     def update(transform: Rotate, dt: float) -> None:
-        transform.angle = float((transform.angle + dt * speed) % 360.0)
+        transform.angle = float((transform.angle + dt * spec.speed) % 360.0)
 
+    update.spec = spec
     return update
 
 
 def circular_orbit(
     phase: float = 0.0, speed: float = 1.0, radius: float = 1.0, axis: str = "xy"
 ) -> AnimationFn:
-    theta = phase
     axis = axis.lower()
     axes = {
         "xy": (0, 1),
         "xz": (0, 2),
         "yz": (1, 2),
     }
+    spec = AnimationSpec(
+        "orbit", speed=speed, phase=phase, amplitude=radius, axes=axes[axis]
+    )
 
     def update(transform: Translate, dt: float) -> None:
-        nonlocal theta
-        theta = (theta + dt * speed) % (2 * math.pi)
+        spec.phase = (spec.phase + dt * spec.speed) % (2 * math.pi)
         coords = [transform.x, transform.y, transform.z]
-        first, second = axes[axis]
-        coords[first] = math.cos(theta) * radius
-        coords[second] = math.sin(theta) * radius
+        first, second = spec.axes
+        coords[first] = math.cos(spec.phase) * spec.amplitude
+        coords[second] = math.sin(spec.phase) * spec.amplitude
         transform.x, transform.y, transform.z = coords
 
+    update.spec = spec
     return update
 
 
@@ -207,15 +232,20 @@ def ping_pong_translation(
     center: float = 0.0,
 ) -> AnimationFn:
     axis = axis.lower()
-
-    offset = 0.0
+    spec = AnimationSpec(
+        "ping_pong",
+        speed=speed,
+        amplitude=amplitude,
+        offset=center,
+        axes=("xyz".index(axis),),
+    )
 
     def update(transform: Translate, dt: float) -> None:
-        nonlocal offset
-        offset = (offset + dt * speed) % (2 * math.pi)
-        value = center + math.sin(offset) * amplitude
+        spec.phase = (spec.phase + dt * spec.speed) % (2 * math.pi)
+        value = spec.offset + math.sin(spec.phase) * spec.amplitude
         setattr(transform, axis, value)
 
+    update.spec = spec
     return update
 
 
@@ -227,20 +257,22 @@ def pulse_scale(
     if minimum > maximum:
         minimum, maximum = maximum, minimum
 
-    phase = 0.0
-    span = maximum - minimum
+    spec = AnimationSpec(
+        "pulse", speed=speed, amplitude=maximum - minimum, offset=minimum
+    )
 
     def update(transform: Scale, dt: float) -> None:
-        nonlocal phase
-        phase = (phase + dt * speed) % (2 * math.pi)
-        factor = minimum + (math.sin(phase) * 0.5 + 0.5) * span
+        spec.phase = (spec.phase + dt * spec.speed) % (2 * math.pi)
+        factor = spec.offset + (math.sin(spec.phase) * 0.5 + 0.5) * spec.amplitude
         transform.x = transform.y = transform.z = factor
 
+    update.spec = spec
     return update
 
 
 __all__ = [
     "AnimationFn",
+    "AnimationSpec",
     "gradient_descent",
     "infinite_spin",
     "circular_orbit",
@@ -0,0 +1,307 @@
+"""Vectorized stepping of the built-in transform animations."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from graphics.scene import Node, TransformNode
+from rendering.animation import AnimationSpec
+from rendering.compiled_scene import CompiledScene
+from rendering.world import Composite, Rotate, Scale, Transform, Translate
+
+_ORBIT, _PING_PONG, _PULSE, _SPIN = range(4)
+_KINDS = {"orbit": _ORBIT, "ping_pong": _PING_PONG, "pulse": _PULSE, "spin": _SPIN}
+_TARGET_TYPES = {
+    _ORBIT: Translate,
+    _PING_PONG: Translate,
+    _PULSE: Scale,
+    _SPIN: Rotate,
+}
+_PERIODS = {
+    _ORBIT: 2 * np.pi,
+    _PING_PONG: 2 * np.pi,
+    _PULSE: 2 * np.pi,
+    _SPIN: 360.0,
+}
+
+
+class AnimationSystem:
+    """Steps orbit, ping-pong, pulse and spin animations as packed arrays.
+
+    Transforms whose ``animate`` closure carries an `AnimationSpec` are
+    registered and flagged ``managed`` so their closures are no longer called.
+    `step` advances every phase in one vectorized pass, then writes the
+    results straight into `CompiledScene.local` for transforms that are a
+    node's own transform, and onto the transform attributes otherwise (nested
+    in a `Composite`, or no compiled scene bound).
+    """
+
+    def __init__(self):
+        self.root: Node | None = None
+        self._structure = None
+        self.scene: CompiledScene | None = None
+        self._scene_version = None
+
+        self.transforms: list[Transform] = []
+        self.specs: list[AnimationSpec] = []
+        self._packed = True
+
+        self.kind = np.empty(0, dtype=np.int8)
+        self.phase = np.empty(0, dtype=np.float64)
+        self.speed = np.empty(0, dtype=np.float64)
+        self.period = np.empty(0, dtype=np.float64)
+        self.amplitude = np.empty(0, dtype=np.float64)
+        self.offset = np.empty(0, dtype=np.float64)
+        # First and second animated component (-1 when unused).
+        self.axis = np.empty((0, 2), dtype=np.int64)
+        # Components the animation leaves alone, captured at registration.
+        self.base = np.empty((0, 3), dtype=np.float64)
+        # Normalized rotation axis of spin animations.
+        self.rotation_axis = np.empty((0, 3), dtype=np.float64)
+        # Index into `scene.local`, or -1 to write transform attributes.
+        self.target = np.empty(0, dtype=np.int64)
+
+        self._kind_index: dict[int, np.ndarray] = {}
+        self._direct: dict[int, np.ndarray] = {}
+        self._attribute: dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.transforms)
+
+    def sync(self, root: Node | None, scene: CompiledScene | None = None) -> None:
+        """Re-register after the tree changes and rebind to ``scene`` when needed."""
+        if root is not self.root or self._structure != Node.structure_version:
+            self.clear()
+            self.root = root
+            self._structure = Node.structure_version
+            if root is not None:
+                self.register_tree(root)
+        if scene is not self.scene or (
+            scene is not None and scene.version != self._scene_version
+        ):
+            self.bind(scene)
+
+    def register_tree(self, root: Node) -> int:
+        """Register every supported animation below ``root``; returns the count."""
+        count = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, TransformNode):
+                transforms = [node.transform]
+                while transforms:
+                    transform = transforms.pop()
+                    count += self.register(transform)
+                    if isinstance(transform, Composite):
+                        transforms.extend(transform.transforms)
+            stack.extend(node.children)
+        return count
+
+    def register(self, transform: Transform) -> bool:
+        spec = getattr(transform.animate, "spec", None)
+        if not isinstance(spec, AnimationSpec) or spec.kind not in _KINDS:
+            return False
+        if not isinstance(transform, _TARGET_TYPES[_KINDS[spec.kind]]):
+            return False
+        if transform.managed:
+            return False
+        transform.managed = True
+        self.transforms.append(transform)
+        self.specs.append(spec)
+        self._packed = False
+        return True
+
+    def _pack(self) -> None:
+        count = len(self.transforms)
+        self.kind = np.fromiter(
+            (_KINDS[spec.kind] for spec in self.specs), dtype=np.int8, count=count
+        )
+        self.phase = np.array(
+            [
+                float(transform.angle) if spec.kind == "spin" else spec.phase
+                for transform, spec in zip(self.transforms, self.specs)
+            ],
+            dtype=np.float64,
+        )
+        self.speed = np.array([spec.speed for spec in self.specs], dtype=np.float64)
+        self.period = np.array([_PERIODS[kind] for kind in self.kind.tolist()])
+        self.amplitude = np.array(
+            [spec.amplitude for spec in self.specs], dtype=np.float64
+        )
+        self.offset = np.array([spec.offset for spec in self.specs], dtype=np.float64)
+        self.axis = np.full((count, 2), -1, dtype=np.int64)
+        self.base = np.zeros((count, 3), dtype=np.float64)
+        self.rotation_axis = np.zeros((count, 3), dtype=np.float64)
+        for index, (transform, spec) in enumerate(zip(self.transforms, self.specs)):
+            self.axis[index, : len(spec.axes)] = spec.axes
+            if isinstance(transform, Translate):
+                self.base[index] = (transform.x, transform.y, transform.z)
+            elif isinstance(transform, Rotate):
+                axis = np.asarray(transform.axis, dtype=np.float64)
+                norm = np.linalg.norm(axis)
+                self.rotation_axis[index] = axis / norm if norm > 0.0 else axis
+
+        self._kind_index = {
+            kind: np.flatnonzero(self.kind == kind) for kind in _TARGET_TYPES
+        }
+        self._packed = True
+        self._split_targets()
+
+    def bind(self, scene: CompiledScene | None) -> None:
+        """Write directly into ``scene.local`` where possible (None to unbind)."""
+        if self.scene is not None and self.scene is not scene:
+            self.scene.set_managed(())
+        self.scene = scene
+        self._scene_version = scene.version if scene is not None else None
+
+        self.target = np.full(len(self), -1, dtype=np.int64)
+        if scene is not None:
+            position = {
+                id(transform): index for index, transform in enumerate(self.transforms)
+            }
+            for node_index, node in enumerate(scene.nodes):
+                if not isinstance(node, TransformNode):
+                    continue
+                index = position.get(id(node.transform))
+                # Rotations given in radians ignore `angle`, like the closure.
+                if index is not None and not getattr(node.transform, "radians", None):
+                    self.target[index] = node_index
+            scene.set_managed(self.target[self.target >= 0])
+        self._split_targets()
+
+    def _split_targets(self) -> None:
+        if not self._packed or len(self.target) != len(self):
+            return
+        self._direct = {
+            kind: index[self.target[index] >= 0]
+            for kind, index in self._kind_index.items()
+        }
+        self._attribute = {
+            kind: index[self.target[index] < 0]
+            for kind, index in self._kind_index.items()
+        }
+
+    def step(self, dt: float) -> None:
+        """Advance every registered animation by ``dt`` seconds."""
+        if not self.transforms:
+            return
+        if not self._packed:
+            self._pack()
+            if len(self.target) != len(self):
+                self.bind(self.scene)
+        phase = self.phase
+        phase += dt * self.speed
+        np.mod(phase, self.period, out=phase)
+        values = self._evaluate()
+        if self.scene is not None:
+            self._write_local(values)
+        self._write_attributes(values, self._attribute)
+
+    def _evaluate(self) -> np.ndarray:
+        """Per-animation result: translation, scale factors or spin angle."""
+        values = self.base.copy()
+        phase = self.phase
+        sin = np.sin(phase)
+        rows = np.arange(len(self))
+
+        orbit = self._kind_index[_ORBIT]
+        if orbit.size:
+            first, second = self.axis[orbit, 0], self.axis[orbit, 1]
+            values[rows[orbit], first] = np.cos(phase[orbit]) * self.amplitude[orbit]
+            values[rows[orbit], second] = sin[orbit] * self.amplitude[orbit]
+
+        ping_pong = self._kind_index[_PING_PONG]
+        if ping_pong.size:
+            values[rows[ping_pong], self.axis[ping_pong, 0]] = (
+                self.offset[ping_pong] + sin[ping_pong] * self.amplitude[ping_pong]
+            )
+
+        pulse = self._kind_index[_PULSE]
+        if pulse.size:
+            values[pulse] = (
+                self.offset[pulse] + (sin[pulse] * 0.5 + 0.5) * self.amplitude[pulse]
+            )[:, None]
+
+        spin = self._kind_index[_SPIN]
+        if spin.size:
+            values[spin, 0] = phase[spin]
+        return values
+
+    def _write_local(self, values: np.ndarray) -> None:
+        local = self.scene.local
+
+        moved = np.concatenate([self._direct[_ORBIT], self._direct[_PING_PONG]])
+        if moved.size:
+            local[self.target[moved], :3, 3] = values[moved]
+
+        pulse = self._direct[_PULSE]
+        if pulse.size:
+            targets = self.target[pulse]
+            for component in range(3):
+                local[targets, component, component] = values[pulse, component]
+
+        spin = self._direct[_SPIN]
+        if spin.size:
+            # Same axis-angle matrix as utils.transform.rotate, batched.
+            angle = np.radians(values[spin, 0])
+            s, c = np.sin(angle), np.cos(angle)
+            nc = 1.0 - c
+            x, y, z = self.rotation_axis[spin].T
+            rotation = np.stack(
+                [
+                    x * x * nc + c, x * y * nc - z * s, x * z * nc + y * s,
+                    y * x * nc + z * s, y * y * nc + c, y * z * nc - x * s,
+                    x * z * nc - y * s, y * z * nc + x * s, z * z * nc + c,
+                ],
+                axis=1,
+            )  # fmt: skip
+            local[self.target[spin], :3, :3] = rotation.reshape(-1, 3, 3)
+
+    def _write_attributes(
+        self, values: np.ndarray, groups: dict[int, np.ndarray]
+    ) -> None:
+        transforms = self.transforms
+        for kind in (_ORBIT, _PING_PONG):
+            index = groups.get(kind)
+            if index is None or not index.size:
+                continue
+            for row, (x, y, z) in zip(index.tolist(), values[index].tolist()):
+                transform = transforms[row]
+                transform.x, transform.y, transform.z = x, y, z
+        index = groups.get(_PULSE)
+        if index is not None and index.size:
+            for row, factor in zip(index.tolist(), values[index, 0].tolist()):
+                transform = transforms[row]
+                transform.x = transform.y = transform.z = factor
+        index = groups.get(_SPIN)
+        if index is not None and index.size:
+            for row, angle in zip(index.tolist(), values[index, 0].tolist()):
+                transforms[row].angle = angle
+
+    def write_back(self) -> None:
+        """Copy the current state onto every transform and its spec."""
+        if not self.transforms:
+            return
+        if not self._packed:
+            self._pack()
+        self._write_attributes(self._evaluate(), self._kind_index)
+        for spec, phase in zip(self.specs, self.phase.tolist()):
+            if spec.kind != "spin":
+                spec.phase = phase
+
+    def clear(self) -> None:
+        """Hand every animation back to its closure, keeping its phase."""
+        self.write_back()
+        for transform in self.transforms:
+            transform.managed = False
+        if self.scene is not None:
+            self.scene.set_managed(())
+        self.transforms = []
+        self.specs = []
+        self._packed = False
+        self.target = np.empty(0, dtype=np.int64)
+        self.scene = None
+        self._scene_version = None
+
+
+__all__ = ["AnimationSystem"]
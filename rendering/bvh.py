@@ -0,0 +1,252 @@
+"""Bounding volume hierarchy over the draw slots of a compiled scene."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from rendering.compiled_scene import CompiledScene
+
+
+def _slab(
+    box_min: np.ndarray, box_max: np.ndarray, origin: np.ndarray, inv_dir: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Entry/exit ray parameters for a batch of AABBs."""
+    t1 = (box_min - origin) * inv_dir
+    t2 = (box_max - origin) * inv_dir
+    # fmin/fmax skip the NaNs produced when the origin lies on a slab plane;
+    # the three axes are folded pairwise, which beats a reduce over axis 1.
+    near = np.fmin(t1, t2)
+    far = np.fmax(t1, t2)
+    t_near = np.fmax(np.fmax(near[:, 0], near[:, 1]), near[:, 2])
+    t_far = np.fmin(np.fmin(far[:, 0], far[:, 1]), far[:, 2])
+    return t_near, t_far
+
+
+class BVH:
+    """Binary AABB tree built with median splits along the longest axis.
+
+    Nodes live in flat arrays where every child comes after its parent and
+    each leaf owns a contiguous range of ``items``. When world matrices change
+    the tree is refit rather than rebuilt: only leaves holding moved slots and
+    their ancestors are recomputed, one vectorized pass per depth level.
+    """
+
+    LEAF_SIZE = 4
+    # Tree levels a traversal step descends; see `_skip`.
+    SKIP_LEVELS = 4
+
+    def __init__(self):
+        self._scene: CompiledScene | None = None
+        self._version = None
+        self._evaluations = None
+        # Number of full rebuilds, so dependents can tell the layout changed.
+        self.builds = 0
+
+        self.items = np.empty(0, dtype=np.int32)
+        self.item_min = np.empty((0, 3), dtype=np.float32)
+        self.item_max = np.empty((0, 3), dtype=np.float32)
+        self.slot_leaf = np.empty(0, dtype=np.int32)
+
+        self.node_min = np.empty((0, 3), dtype=np.float32)
+        self.node_max = np.empty((0, 3), dtype=np.float32)
+        self.left = np.empty(0, dtype=np.int32)
+        self.right = np.empty(0, dtype=np.int32)
+        self.start = np.empty(0, dtype=np.int32)
+        self.end = np.empty(0, dtype=np.int32)
+        # Leaf node indices ordered by their item range.
+        self.leaves = np.empty(0, dtype=np.int32)
+        # Internal node indices grouped by depth, deepest level first.
+        self._levels: list[np.ndarray] = []
+        # Per node, its descendants SKIP_LEVELS levels down, or the leaves
+        # that end a branch earlier, padded with -1. Traversal tests these
+        # directly: each numpy pass then covers several levels of the tree.
+        self._skip = np.empty((0, 1 << self.SKIP_LEVELS), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    @staticmethod
+    def _slot_boxes(
+        scene: CompiledScene, slots: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        center, _, extent = scene.world_bounds(slots)
+        return center - extent, center + extent
+
+    def is_stale(self, scene: CompiledScene) -> bool:
+        """True when ``scene`` differs from, or was recompiled since, the built tree."""
+        return scene is not self._scene or scene.version != self._version
+
+    def update(self, scene: CompiledScene) -> bool:
+        """Rebuild after structural changes, otherwise refit. True if anything changed."""
+        if self.is_stale(scene):
+            self.build(scene)
+            return True
+        return self.refit(scene)
+
+    def build(self, scene: CompiledScene) -> None:
+        self.builds += 1
+        self._scene = scene
+        self._version = scene.version
+        self._evaluations = scene.evaluations
+        self.item_min, self.item_max = self._slot_boxes(scene)
+
+        items = np.flatnonzero(scene.bounded).astype(np.int32)
+        centroid = (self.item_min + self.item_max) * 0.5
+
+        node_min: list[np.ndarray] = []
+        node_max: list[np.ndarray] = []
+        left: list[int] = []
+        right: list[int] = []
+        start: list[int] = []
+        end: list[int] = []
+        depth: list[int] = []
+
+        def new_node(lo: int, hi: int, level: int) -> int:
+            members = items[lo:hi]
+            node_min.append(self.item_min[members].min(axis=0))
+            node_max.append(self.item_max[members].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            start.append(lo)
+            end.append(hi)
+            depth.append(level)
+            return len(left) - 1
+
+        if items.size:
+            stack = [new_node(0, items.size, 0)]
+            while stack:
+                node = stack.pop()
+                lo, hi = start[node], end[node]
+                if hi - lo <= self.LEAF_SIZE:
+                    continue
+                members = items[lo:hi]
+                spread = centroid[members].max(axis=0) - centroid[members].min(axis=0)
+                axis = int(np.argmax(spread))
+                mid = (hi - lo) // 2
+                order = np.argpartition(centroid[members, axis], mid)
+                items[lo:hi] = members[order]
+                left[node] = new_node(lo, lo + mid, depth[node] + 1)
+                right[node] = new_node(lo + mid, hi, depth[node] + 1)
+                stack.extend((left[node], right[node]))
+
+        count = len(left)
+        self.items = items
+        self.node_min = np.asarray(node_min, dtype=np.float32).reshape(count, 3)
+        self.node_max = np.asarray(node_max, dtype=np.float32).reshape(count, 3)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.int32)
+        self.end = np.asarray(end, dtype=np.int32)
+
+        is_leaf = self.left < 0
+        self.leaves = np.flatnonzero(is_leaf).astype(np.int32)
+        self.leaves = self.leaves[np.argsort(self.start[self.leaves])]
+        self.slot_leaf = np.full(len(scene.draw_index), -1, dtype=np.int32)
+        for leaf in self.leaves:
+            self.slot_leaf[items[self.start[leaf] : self.end[leaf]]] = leaf
+
+        skip = np.arange(count, dtype=np.int32)[:, None]
+        for _ in range(self.SKIP_LEVELS):
+            node = np.maximum(skip, 0)
+            internal = (skip >= 0) & (self.left[node] >= 0)
+            skip = np.concatenate(
+                [
+                    np.where(internal, self.left[node], skip),
+                    np.where(internal, self.right[node], -1),
+                ],
+                axis=1,
+            )
+        self._skip = skip
+
+        depths = np.asarray(depth, dtype=np.int32)
+        internal = np.flatnonzero(~is_leaf)
+        self._levels = [
+            internal[depths[internal] == level]
+            for level in range(int(depths.max(initial=0)), -1, -1)
+        ]
+
+    def refit(self, scene: CompiledScene) -> bool:
+        """Refit the boxes of animated slots that moved since the last update."""
+        if scene.evaluations == self._evaluations:
+            return False
+        self._evaluations = scene.evaluations
+
+        slots = scene.dynamic_slots[self.slot_leaf[scene.dynamic_slots] >= 0]
+        box_min, box_max = self._slot_boxes(scene, slots)
+        moved = (box_min != self.item_min[slots]).any(axis=1) | (
+            box_max != self.item_max[slots]
+        ).any(axis=1)
+        if not moved.any():
+            return False
+        slots = slots[moved]
+        self.item_min[slots] = box_min[moved]
+        self.item_max[slots] = box_max[moved]
+
+        dirty = np.zeros(len(self), dtype=bool)
+        dirty[self.slot_leaf[slots]] = True
+        # Leaves own contiguous, start-ordered ranges of `items`.
+        offsets = self.start[self.leaves]
+        self.node_min[self.leaves] = np.minimum.reduceat(
+            self.item_min[self.items], offsets
+        )
+        self.node_max[self.leaves] = np.maximum.reduceat(
+            self.item_max[self.items], offsets
+        )
+
+        for nodes in self._levels:
+            left, right = self.left[nodes], self.right[nodes]
+            nodes = nodes[dirty[left] | dirty[right]]
+            if not nodes.size:
+                continue
+            left, right = self.left[nodes], self.right[nodes]
+            dirty[nodes] = True
+            self.node_min[nodes] = np.minimum(self.node_min[left], self.node_min[right])
+            self.node_max[nodes] = np.maximum(self.node_max[left], self.node_max[right])
+        return True
+
+    def intersect(
+        self,
+        origin: np.ndarray,
+        direction: np.ndarray,
+        max_distance: float = np.inf,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Draw slots whose world AABB the ray enters, sorted by entry distance."""
+        if not len(self):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv_dir = 1.0 / np.asarray(direction, dtype=np.float64)
+            return self._traverse(np.asarray(origin, np.float64), inv_dir, max_distance)
+
+    def _traverse(
+        self, origin: np.ndarray, inv_dir: np.ndarray, max_distance: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        leaves: list[np.ndarray] = []
+        frontier = np.zeros(1, dtype=np.int32)
+        while frontier.size:
+            t_near, t_far = _slab(
+                self.node_min[frontier], self.node_max[frontier], origin, inv_dir
+            )
+            frontier = frontier[
+                (t_near <= t_far) & (t_far >= 0.0) & (t_near <= max_distance)
+            ]
+            leaf = self.left[frontier] < 0
+            leaves.append(frontier[leaf])
+            frontier = self._skip[frontier[~leaf]].ravel()
+            frontier = frontier[frontier >= 0]
+
+        leaves = np.concatenate(leaves)
+        if not leaves.size:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        # Expand the leaves' [start, end) ranges into one index array.
+        lengths = self.end[leaves] - self.start[leaves]
+        offsets = np.repeat(self.start[leaves] - np.cumsum(lengths) + lengths, lengths)
+        slots = self.items[offsets + np.arange(lengths.sum())]
+        t_near, t_far = _slab(self.item_min[slots], self.item_max[slots], origin, inv_dir)
+        hit = (t_near <= t_far) & (t_far >= 0.0) & (t_near <= max_distance)
+        slots, entry = slots[hit], np.maximum(t_near[hit], 0.0)
+        order = np.argsort(entry, kind="stable")
+        return slots[order], entry[order]
+
+
+__all__ = ["BVH"]
@@ -0,0 +1,328 @@
+"""Single-pass capture of shaded color, float depth and instance IDs."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from OpenGL import GL
+
+from graphics.scene import LightNode
+
+_DRAW_BUFFERS = (GL.GL_COLOR_ATTACHMENT0, GL.GL_COLOR_ATTACHMENT1)
+
+
+def clip_planes(proj: np.ndarray) -> tuple[float, float]:
+    """Near and far distances of a perspective or orthographic projection."""
+    zz, zw = float(proj[2, 2]), float(proj[2, 3])
+    if proj[3, 2] != 0.0:  # perspective
+        return zw / (zz - 1.0), zw / (zz + 1.0)
+    return (zw + 1.0) / zz, (zw - 1.0) / zz
+
+
+def linearize_depth(window_depth: np.ndarray, proj: np.ndarray) -> np.ndarray:
+    """View-space distance of [0, 1] depth buffer values, 0 at the far clear.
+
+    Computed in float64 so the far end of a 32-bit depth buffer keeps its
+    precision, then stored as float32.
+    """
+    near, far = clip_planes(proj)
+    window_depth = np.asarray(window_depth, dtype=np.float64)
+    if proj[3, 2] != 0.0:
+        ndc = window_depth * 2.0 - 1.0
+        depth = 2.0 * far * near / ((far + near) - ndc * (far - near))
+    else:
+        depth = near + window_depth * (far - near)
+    depth[window_depth >= 1.0] = 0.0
+    return depth.astype(np.float32)
+
+
+def camera_intrinsics(proj: np.ndarray, width: int, height: int) -> np.ndarray:
+    """3x3 pinhole matrix in pixels for a top-left image origin.
+
+    Pairs with `camera_extrinsics`, whose camera looks down +z with +y
+    pointing down the image, as OpenCV expects.
+    """
+    fx = float(proj[0, 0]) * width / 2.0
+    fy = float(proj[1, 1]) * height / 2.0
+    cx = (1.0 - float(proj[0, 2])) * width / 2.0
+    cy = (1.0 + float(proj[1, 2])) * height / 2.0
+    return np.array([[fx, 0.0, cx], [0.0, fy, cy], [0.0, 0.0, 1.0]])
+
+
+def camera_extrinsics(view: np.ndarray) -> np.ndarray:
+    """3x4 world-to-camera [R | t] of a GL view matrix, in OpenCV axes."""
+    return np.diag([1.0, -1.0, -1.0]) @ np.asarray(view, dtype=np.float64)[:3]
+
+
+@dataclass(slots=True)
+class InstanceStats:
+    """Visibility of every instance of an ID image, indexed by instance ID."""
+
+    # (N,) visible pixels; entry 0 is the background.
+    pixels: np.ndarray
+    # (N, 4) top-down pixel box [x_min, y_min, x_max, y_max) of the visible
+    # pixels, all zeros for instances with none.
+    boxes: np.ndarray
+    # (N,) pixels each instance covers when drawn alone, if measured.
+    coverage: np.ndarray | None = None
+
+    @property
+    def visible(self) -> np.ndarray:
+        """IDs of the instances with at least one visible pixel."""
+        return np.flatnonzero(self.pixels[1:]) + 1
+
+    @property
+    def occlusion(self) -> np.ndarray:
+        """Hidden fraction of each instance's coverage, NaN where it has none."""
+        if self.coverage is None:
+            raise ValueError("Capture with coverage=True to measure occlusion")
+        ratio = np.full(len(self.pixels), np.nan)
+        covered = self.coverage > 0
+        ratio[covered] = 1.0 - self.pixels[covered] / self.coverage[covered]
+        return np.clip(ratio, 0.0, 1.0)
+
+
+def instance_stats(
+    instance: np.ndarray, count: int = 0, coverage: np.ndarray | None = None
+) -> InstanceStats:
+    """Pixel counts and tight boxes of every ID in one pass over the image.
+
+    The image is split into horizontal runs of equal IDs, which are few
+    compared to pixels; counts are a bincount of run lengths and boxes
+    min/max reductions of run rows and ends. ``count`` is the minimum
+    number of IDs to report, e.g. one more than the capture's draw nodes.
+    """
+    height, width = instance.shape
+    flat = instance.ravel()
+    count = max(count, int(flat.max(initial=0)) + 1)
+
+    change = np.empty(flat.size, dtype=bool)
+    change[:1] = True
+    np.not_equal(flat[1:], flat[:-1], out=change[1:])
+    change[::width] = True  # runs end with their row
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], flat.size)
+    values = flat[starts]
+    rows, first = np.divmod(starts, width)
+
+    pixels = np.bincount(values, weights=ends - starts, minlength=count)
+    boxes = np.empty((count, 4), dtype=np.int64)
+    boxes[:, :2] = (width, height)
+    boxes[:, 2:] = 0
+    np.minimum.at(boxes[:, 0], values, first)
+    np.minimum.at(boxes[:, 1], values, rows)
+    np.maximum.at(boxes[:, 2], values, ends - rows * width)
+    np.maximum.at(boxes[:, 3], values, rows + 1)
+    pixels = pixels.astype(np.int64)
+    boxes[pixels == 0] = 0
+    return InstanceStats(pixels, boxes, coverage)
+
+
+@dataclass(slots=True)
+class CaptureResult:
+    """One captured frame, top-down like an image."""
+
+    # (H, W, 3) uint8 shaded color.
+    color: np.ndarray
+    # (H, W) float32 view-space distance along the view direction, 0 where
+    # nothing was drawn.
+    depth: np.ndarray
+    # (H, W) uint32, 0 for background and lights, otherwise draw slot + 1.
+    instance: np.ndarray
+    # CompiledScene.draw_nodes at capture time: instance i is nodes[i - 1].
+    nodes: list
+    # Camera matrices the frame was rendered with.
+    view: np.ndarray
+    proj: np.ndarray
+    # (len(nodes) + 1,) pixels of each instance drawn alone, if measured.
+    coverage: np.ndarray | None = None
+
+    def node_at(self, instance: int):
+        return self.nodes[instance - 1] if instance > 0 else None
+
+    @property
+    def intrinsics(self) -> np.ndarray:
+        height, width = self.depth.shape
+        return camera_intrinsics(self.proj, width, height)
+
+    @property
+    def extrinsics(self) -> np.ndarray:
+        return camera_extrinsics(self.view)
+
+    def stats(self) -> InstanceStats:
+        return instance_stats(self.instance, len(self.nodes) + 1, self.coverage)
+
+
+class CapturePass:
+    """Framebuffer with color and R32UI ID targets over a 32F depth buffer.
+
+    The forward shaders always declare the ID output; it only lands
+    anywhere while this pass binds both attachments as draw buffers.
+    `capture` renders one frame through
+    ``Renderer.render(tag_instances=True)``, which gives each draw slot its
+    own ``instance_id``, then reads the targets back. Depth comes from the
+    depth attachment itself as floats and is linearized with the frame's
+    projection. The window's framebuffer is left untouched, so no restoring
+    render is needed.
+
+    With ``coverage=True`` every geometry slot is drawn once more on its
+    own to count the pixels it would cover unoccluded, which `InstanceStats`
+    compares with its visible pixels. The draws pass the depth test always
+    and go through a stencil test that lets each pixel through once, so a
+    ``GL_SAMPLES_PASSED`` query counts the footprint without overlap.
+    """
+
+    def __init__(self):
+        self.fbo = None
+        self.size = (0, 0)
+        self._renderbuffers: list[int] = []
+
+    def _allocate(self, width: int, height: int) -> None:
+        if self.fbo is not None and self.size == (width, height):
+            return
+        self.cleanup()
+        self.fbo = GL.glGenFramebuffers(1)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        self._renderbuffers = [int(name) for name in GL.glGenRenderbuffers(3)]
+        for renderbuffer, internal_format, attachment in zip(
+            self._renderbuffers,
+            (GL.GL_RGBA8, GL.GL_R32UI, GL.GL_DEPTH32F_STENCIL8),
+            (*_DRAW_BUFFERS, GL.GL_DEPTH_STENCIL_ATTACHMENT),
+        ):
+            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, renderbuffer)
+            GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, internal_format, width, height)
+            GL.glFramebufferRenderbuffer(
+                GL.GL_FRAMEBUFFER, attachment, GL.GL_RENDERBUFFER, renderbuffer
+            )
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Incomplete capture framebuffer (0x{int(status):x})")
+        self.size = (width, height)
+
+    def _read(self, attachment, width, height, fmt, gl_type, dtype, channels):
+        if attachment is not None:
+            GL.glReadBuffer(attachment)
+        data = GL.glReadPixels(0, 0, width, height, fmt, gl_type)
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        return np.frombuffer(data, dtype=dtype).reshape(shape)[::-1]
+
+    def capture(
+        self, renderer, width: int, height: int, coverage: bool = False
+    ) -> CaptureResult:
+        """Render the renderer's scene once and read back every target."""
+        previous = int(GL.glGetIntegerv(GL.GL_DRAW_FRAMEBUFFER_BINDING))
+        self._allocate(width, height)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glDrawBuffers(len(_DRAW_BUFFERS), _DRAW_BUFFERS)
+        GL.glClearBufferfv(GL.GL_COLOR, 0, GL.glGetFloatv(GL.GL_COLOR_CLEAR_VALUE))
+        GL.glClearBufferuiv(GL.GL_COLOR, 1, (0, 0, 0, 0))
+        GL.glClearBufferfi(GL.GL_DEPTH_STENCIL, 0, 1.0, 0)
+        try:
+            renderer.render(0.0, tag_instances=True)
+
+            GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.fbo)
+            GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+            color = self._read(
+                GL.GL_COLOR_ATTACHMENT0,
+                width,
+                height,
+                GL.GL_RGB,
+                GL.GL_UNSIGNED_BYTE,
+                np.uint8,
+                3,
+            )
+            instance = self._read(
+                GL.GL_COLOR_ATTACHMENT1,
+                width,
+                height,
+                GL.GL_RED_INTEGER,
+                GL.GL_UNSIGNED_INT,
+                np.uint32,
+                1,
+            )
+            window_depth = self._read(
+                None,
+                width,
+                height,
+                GL.GL_DEPTH_COMPONENT,
+                GL.GL_FLOAT,
+                np.float32,
+                1,
+            )
+            pixels = self._measure_coverage(renderer) if coverage else None
+        finally:
+            GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0)
+            GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, previous)
+        proj = np.asarray(renderer.projection_matrix, dtype=np.float64)
+        return CaptureResult(
+            color,
+            linearize_depth(window_depth, proj),
+            instance,
+            list(renderer.compiled_scene.draw_nodes),
+            np.asarray(renderer.view_matrix, dtype=np.float64),
+            proj,
+            pixels,
+        )
+
+    @staticmethod
+    def _measure_coverage(renderer) -> np.ndarray:
+        """Pixels each geometry slot covers on its own, by instance ID."""
+        scene = renderer.compiled_scene
+        view, proj = renderer.view_matrix, renderer.projection_matrix
+        coverage = np.zeros(len(scene.draw_nodes) + 1, dtype=np.int64)
+        slots = [
+            slot
+            for slot, node in enumerate(scene.draw_nodes)
+            if not isinstance(node, LightNode)
+        ]
+        if not slots:
+            return coverage
+
+        queries = np.atleast_1d(GL.glGenQueries(len(slots)))
+        depth_func = int(GL.glGetIntegerv(GL.GL_DEPTH_FUNC))
+        GL.glColorMask(GL.GL_FALSE, GL.GL_FALSE, GL.GL_FALSE, GL.GL_FALSE)
+        GL.glDepthMask(GL.GL_FALSE)
+        GL.glDepthFunc(GL.GL_ALWAYS)
+        GL.glEnable(GL.GL_STENCIL_TEST)
+        GL.glStencilFunc(GL.GL_EQUAL, 0, 0xFF)
+        GL.glStencilOp(GL.GL_KEEP, GL.GL_KEEP, GL.GL_INCR)
+        try:
+            for query, slot in zip(queries, slots):
+                shape = scene.draw_nodes[slot].shape
+                GL.glClearBufferiv(GL.GL_STENCIL, 0, (0,))
+                shape.transform(proj, view, scene.world[scene.draw_index[slot]])
+                GL.glBeginQuery(GL.GL_SAMPLES_PASSED, int(query))
+                shape.draw()
+                GL.glEndQuery(GL.GL_SAMPLES_PASSED)
+        finally:
+            GL.glDisable(GL.GL_STENCIL_TEST)
+            GL.glDepthFunc(depth_func)
+            GL.glDepthMask(GL.GL_TRUE)
+            GL.glColorMask(GL.GL_TRUE, GL.GL_TRUE, GL.GL_TRUE, GL.GL_TRUE)
+        for query, slot in zip(queries, slots):
+            coverage[slot + 1] = GL.glGetQueryObjectuiv(query, GL.GL_QUERY_RESULT)
+        GL.glDeleteQueries(len(queries), queries)
+        return coverage
+
+    def cleanup(self) -> None:
+        if self.fbo is None:
+            return
+        GL.glDeleteFramebuffers(1, [self.fbo])
+        GL.glDeleteRenderbuffers(len(self._renderbuffers), self._renderbuffers)
+        self.fbo = None
+        self._renderbuffers = []
+        self.size = (0, 0)
+
+
+__all__ = [
+    "CapturePass",
+    "CaptureResult",
+    "InstanceStats",
+    "camera_extrinsics",
+    "camera_intrinsics",
+    "clip_planes",
+    "instance_stats",
+    "linearize_depth",
+]
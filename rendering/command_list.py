@@ -0,0 +1,330 @@
+"""Draw stream of a compiled scene recorded once and replayed every frame."""
+
+from __future__ import annotations
+
+import ctypes
+
+import numpy as np
+from OpenGL import GL
+from OpenGL import platform as gl_platform
+from OpenGL.raw.GL.VERSION import GL_1_1, GL_2_0, GL_3_0
+
+from rendering.compiled_scene import CompiledScene
+from rendering.render_queue import RenderQueue
+from rendering.stats import FrameStats
+
+# Entry points the replay calls, with the module PyOpenGL resolves them in
+# and their C argument types.
+_ENTRY_POINTS = {
+    "glUseProgram": (GL_2_0, (ctypes.c_uint,)),
+    "glBindVertexArray": (GL_3_0, (ctypes.c_uint,)),
+    "glBindTexture": (GL_1_1, (ctypes.c_uint, ctypes.c_uint)),
+    "glUniform1i": (GL_2_0, (ctypes.c_int, ctypes.c_int)),
+    "glUniformMatrix4fv": (
+        GL_2_0,
+        (ctypes.c_int, ctypes.c_int, ctypes.c_ubyte, ctypes.c_void_p),
+    ),
+    "glDrawArrays": (GL_1_1, (ctypes.c_uint, ctypes.c_int, ctypes.c_int)),
+    "glDrawElements": (
+        GL_1_1,
+        (ctypes.c_uint, ctypes.c_int, ctypes.c_uint, ctypes.c_void_p),
+    ),
+}
+# Bytes between consecutive 4x4 float32 matrices of `CompiledScene.world`.
+_MATRIX_STRIDE = 16 * 4
+# `program` value of commands whose shape draws itself.
+_CUSTOM = -1
+
+
+class GLDispatch:
+    """The replay's GL entry points, called straight through ctypes.
+
+    PyOpenGL still resolves the addresses, but the calls skip its argument
+    conversion and the ``glGetError`` check it runs after every call, which
+    cost more than the small state changes themselves. Matrices are passed
+    as raw pointers. Needs a current context.
+    """
+
+    def __init__(self):
+        prototype = gl_platform.PLATFORM.functionTypeFor(gl_platform.PLATFORM.GL)
+        for name, (module, argtypes) in _ENTRY_POINTS.items():
+            function = getattr(module, name)
+            if hasattr(function, "load"):  # not called through PyOpenGL yet
+                function = function.load()
+            if not function:
+                raise RuntimeError(f"{name} is not available in this context")
+            address = ctypes.cast(function, ctypes.c_void_p).value
+            setattr(self, name, prototype(None, *argtypes)(address))
+
+
+class CommandList:
+    """The sorted draws of a compiled scene, resolved to GL names and ranges.
+
+    `record` takes the order of a built `RenderQueue` and stores one command
+    per shape part: program, uniform locations, texture, VAO, draw mode and
+    count, plus a pointer to the slot's row of `CompiledScene.world`, which
+    `evaluate` updates in place, so moving transforms need no patching.
+    `replay` walks the commands through `GLDispatch`, uploading view and
+    projection once per program; no Shape method or tree walk is involved.
+    The list observes its shapes (`Shape.state_observers`): a change of
+    program, texture or texture toggle marks the shape's slots dirty, and
+    the next replay rewrites only their commands. Shapes that override
+    `draw` or `transform` are kept as commands that call them.
+    """
+
+    def __init__(self):
+        self._scene: CompiledScene | None = None
+        self._version = None
+        self._world: np.ndarray | None = None
+        self._gl: GLDispatch | None = None
+
+        self.slot = np.empty(0, dtype=np.int32)
+        self.vao = np.empty(0, dtype=np.int64)
+        self.mode = np.empty(0, dtype=np.int64)
+        self.count = np.empty(0, dtype=np.int64)
+        self.indexed = np.empty(0, dtype=bool)
+        self.custom = np.empty(0, dtype=bool)
+        # Per draw slot: program, texture, use_texture and the locations of
+        # the projection, view, model and use_texture uniforms.
+        self.slot_state = np.empty((0, 7), dtype=np.int64)
+        self._commands: list[tuple] = []
+        # Command indices of every slot, the slots of every observed shape
+        # (by id) and the slots whose shape changed since the last patch.
+        self._slot_commands: dict[int, list[int]] = {}
+        self._shape_slots: dict[int, list[int]] = {}
+        self._observed: list = []
+        self._dirty: set[int] = set()
+        # Indices of the commands the last replay submitted through ctypes
+        # (custom ones excluded), for counters that cannot see those calls.
+        self.replayed = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def invalidate(self) -> None:
+        self._scene = None
+        self._detach()
+
+    def _observe(self, shape) -> None:
+        self._dirty.update(self._shape_slots.get(id(shape), ()))
+
+    def _detach(self) -> None:
+        for shape in self._observed:
+            shape.state_observers.remove(self._observe)
+        self._observed = []
+        self._shape_slots = {}
+        self._dirty.clear()
+
+    def is_stale(self, scene: CompiledScene) -> bool:
+        """Whether ``scene`` was rebuilt since the list was recorded."""
+        return (
+            scene is not self._scene
+            or scene.version != self._version
+            or scene.world is not self._world
+        )
+
+    @staticmethod
+    def _shape_state(shape) -> tuple:
+        mode = shape.shading_mode
+        enabled = shape.texture_enabled
+        return (
+            shape._get_active_program().program,
+            shape.texture.tex if shape.texture and enabled else 0,
+            1 if enabled else 0,
+            shape.project_locs[mode],
+            shape.camera_locs[mode],
+            shape.transform_locs[mode],
+            shape.use_texture_locs[mode],
+        )
+
+    @classmethod
+    def _slot_state(cls, scene: CompiledScene) -> np.ndarray:
+        rows = [cls._shape_state(shape) for shape in scene.shapes]
+        return np.asarray(rows, dtype=np.int64).reshape(-1, 7)
+
+    def record(self, scene: CompiledScene, queue: RenderQueue) -> None:
+        """Resolve ``queue.order`` (built for ``scene``) into commands."""
+        if self._gl is None:
+            self._gl = GLDispatch()
+        slots: list[int] = []
+        vaos: list[int] = []
+        modes: list[int] = []
+        counts: list[int] = []
+        indexed: list[bool] = []
+        for item in queue.order:
+            slot = int(queue.item_slot[item])
+            part = queue.item_parts[item]
+            if part is None and not queue.slot_custom[slot]:
+                continue  # no parts, nothing to draw
+            slots.append(slot)
+            if part is None:
+                vaos.append(0)
+                modes.append(0)
+                counts.append(0)
+                indexed.append(False)
+                continue
+            is_indexed = part.vao.ebo is not None
+            vaos.append(int(part.vao.vao))
+            modes.append(int(part.draw_mode))
+            counts.append(int(part.index_num if is_indexed else part.vertex_num))
+            indexed.append(is_indexed)
+
+        self.slot = np.asarray(slots, dtype=np.int32)
+        self.vao = np.asarray(vaos, dtype=np.int64)
+        self.mode = np.asarray(modes, dtype=np.int64)
+        self.count = np.asarray(counts, dtype=np.int64)
+        self.indexed = np.asarray(indexed, dtype=bool)
+        self.custom = queue.slot_custom[self.slot]
+        self.slot_state = self._slot_state(scene)
+
+        self._scene = scene
+        self._version = scene.version
+        self._world = scene.world
+        self._commands = [self._command(index) for index in range(self.slot.size)]
+        self._slot_commands = {}
+        for index, slot in enumerate(self.slot.tolist()):
+            self._slot_commands.setdefault(slot, []).append(index)
+
+        self._detach()
+        for slot, shape in enumerate(scene.shapes):
+            if id(shape) not in self._shape_slots:
+                self._shape_slots[id(shape)] = []
+                self._observed.append(shape)
+                shape.state_observers.append(self._observe)
+            self._shape_slots[id(shape)].append(slot)
+
+    def _command(self, index: int) -> tuple:
+        slot = int(self.slot[index])
+        if self.custom[index]:
+            return (slot, _CUSTOM) + (0,) * 11
+        state = self.slot_state[slot].tolist()
+        model = (
+            self._world.ctypes.data
+            + int(self._scene.draw_index[slot]) * _MATRIX_STRIDE
+        )
+        return (
+            slot,
+            *state,
+            int(self.vao[index]),
+            int(self.mode[index]),
+            int(self.count[index]),
+            bool(self.indexed[index]),
+            model,
+        )
+
+    def patch(self, scene: CompiledScene) -> int:
+        """Rewrite the commands of dirty slots whose state changed."""
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        patched = 0
+        for slot in dirty:
+            state = self._shape_state(scene.shapes[slot])
+            if tuple(self.slot_state[slot].tolist()) == state:
+                continue
+            self.slot_state[slot] = state
+            for index in self._slot_commands.get(slot, ()):
+                self._commands[index] = self._command(index)
+                patched += 1
+        return patched
+
+    def replay(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        proj: np.ndarray,
+        visible: np.ndarray | None = None,
+        stats: FrameStats | None = None,
+    ) -> None:
+        """Submit the recorded commands of the ``visible`` slots."""
+        stats = stats if stats is not None else FrameStats()
+        stats.patched_commands += self.patch(scene)
+        commands = self._commands
+        if visible is not None:
+            kept = np.flatnonzero(visible[self.slot])
+            commands = [commands[index] for index in kept.tolist()]
+            stats.draw_order = self.slot[kept]
+        else:
+            kept = np.arange(self.slot.size)
+            stats.draw_order = self.slot
+        self.replayed = kept[~self.custom[kept]]
+
+        gl = self._gl
+        shapes = scene.shapes
+        world = scene.world
+        draw_index = scene.draw_index
+        view32 = np.ascontiguousarray(view, dtype=np.float32)
+        proj32 = np.ascontiguousarray(proj, dtype=np.float32)
+        view_ptr = view32.ctypes.data
+        proj_ptr = proj32.ctypes.data
+        unsigned_int = int(GL.GL_UNSIGNED_INT)
+        texture_2d = int(GL.GL_TEXTURE_2D)
+
+        current_program = current_slot = current_texture = current_vao = -1
+        uploaded = set()
+        draws = program_binds = texture_binds = vao_binds = 0
+        for (
+            slot,
+            program,
+            texture,
+            use_texture,
+            project_loc,
+            camera_loc,
+            model_loc,
+            use_texture_loc,
+            vao,
+            mode,
+            count,
+            indexed,
+            model,
+        ) in commands:
+            if program == _CUSTOM:
+                shape = shapes[slot]
+                shape.transform(proj, view, world[draw_index[slot]])
+                shape.draw()
+                draws += len(shape.shapes)
+                current_program = current_slot = current_texture = current_vao = -1
+                continue
+
+            if program != current_program:
+                gl.glUseProgram(program)
+                current_program = program
+                current_slot = -1
+                program_binds += 1
+                if program not in uploaded:
+                    gl.glUniformMatrix4fv(project_loc, 1, 1, proj_ptr)
+                    gl.glUniformMatrix4fv(camera_loc, 1, 1, view_ptr)
+                    uploaded.add(program)
+
+            if slot != current_slot:
+                gl.glUniformMatrix4fv(model_loc, 1, 1, model)
+                gl.glUniform1i(use_texture_loc, use_texture)
+                current_slot = slot
+
+            if texture != current_texture:
+                gl.glBindTexture(texture_2d, texture)
+                current_texture = texture
+                texture_binds += 1
+
+            if vao != current_vao:
+                gl.glBindVertexArray(vao)
+                current_vao = vao
+                vao_binds += 1
+
+            if indexed:
+                gl.glDrawElements(mode, count, unsigned_int, None)
+            else:
+                gl.glDrawArrays(mode, 0, count)
+            draws += 1
+
+        gl.glBindVertexArray(0)
+        gl.glBindTexture(texture_2d, 0)
+        gl.glUseProgram(0)
+
+        stats.draw_calls += draws
+        stats.program_binds += program_binds
+        stats.texture_binds += texture_binds
+        stats.vao_binds += vao_binds
+
+
+__all__ = ["CommandList", "GLDispatch"]
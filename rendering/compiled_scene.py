@@ -0,0 +1,249 @@
+"""Flattened struct-of-arrays representation of a scene graph."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from graphics.scene import Node, GeometryNode, LightNode, TransformNode
+from rendering.world import Composite, Transform
+
+
+def is_animated(transform: Transform) -> bool:
+    """Whether a transform (or any transform nested in it) animates."""
+    if transform.animate is not None:
+        return True
+    if isinstance(transform, Composite):
+        return any(is_animated(child) for child in transform.transforms)
+    return False
+
+
+class CompiledScene:
+    """Depth-ordered arrays built from a `graphics.scene` tree.
+
+    Nodes are stored breadth-first so every parent precedes its children and
+    each depth level occupies a contiguous slice. World matrices are then
+    evaluated one level at a time with a single batched ``np.matmul`` instead
+    of recursing through ``Node.draw``.
+    """
+
+    def __init__(self, root: Node | None = None):
+        self.root: Node | None = None
+        self.version = -1
+
+        self.nodes: list[Node] = []
+        self.parent = np.empty(0, dtype=np.int32)
+        self.depth = np.empty(0, dtype=np.int32)
+        self.local = np.empty((0, 4, 4), dtype=np.float32)
+        self.world = np.empty((0, 4, 4), dtype=np.float32)
+        self.levels: list[tuple[slice, np.ndarray]] = []
+
+        # Transform nodes whose matrix changes over time, as (index, node).
+        self.dynamic: list[tuple[int, TransformNode]] = []
+        # The subset of `dynamic` re-read by `refresh_dynamic`; transforms
+        # written straight into `local` elsewhere are left out, see
+        # `set_managed`.
+        self.refreshed: list[tuple[int, TransformNode]] = []
+        # Draw slots below at least one animated transform.
+        self.dynamic_slots = np.empty(0, dtype=np.int32)
+        # Bumped by every `evaluate`, so consumers can tell when world moved.
+        self.evaluations = 0
+
+        # Drawable nodes in the original tree (draw) order.
+        self.draw_index = np.empty(0, dtype=np.int32)
+        self.draw_nodes: list[GeometryNode | LightNode] = []
+        self.shapes: list = []
+
+        # Local bounds per draw slot. Only bounded, non-light slots are
+        # cullable; drawing a light shape also moves the light.
+        self.bound_center = np.empty((0, 3), dtype=np.float32)
+        self.bound_extent = np.empty((0, 3), dtype=np.float32)
+        self.bound_radius = np.empty(0, dtype=np.float32)
+        self.bounded = np.empty(0, dtype=bool)
+        self.cullable = np.empty(0, dtype=bool)
+
+        self.shape_nodes: list[GeometryNode] = []
+        self.light_nodes: list[LightNode] = []
+        self.transform_nodes: list[TransformNode] = []
+
+        if root is not None:
+            self.compile(root)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def is_stale(self, root: Node | None) -> bool:
+        """True when ``root`` differs from, or was restructured since, the compiled tree."""
+        return root is not self.root or self.version != Node.structure_version
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next call to `sync`."""
+        self.version = -1
+
+    def sync(self, root: Node | None) -> bool:
+        """Recompile if the tree changed. Returns True when a rebuild happened."""
+        if not self.is_stale(root):
+            return False
+        self.compile(root)
+        return True
+
+    def compile(self, root: Node | None) -> None:
+        self.root = root
+        self.version = Node.structure_version
+
+        nodes: list[Node] = []
+        parents: list[int] = []
+        depths: list[int] = []
+        if root is not None:
+            frontier = [(root, -1)]
+            depth = 0
+            while frontier:
+                next_frontier = []
+                for node, parent in frontier:
+                    index = len(nodes)
+                    nodes.append(node)
+                    parents.append(parent)
+                    depths.append(depth)
+                    next_frontier.extend((child, index) for child in node.children)
+                frontier = next_frontier
+                depth += 1
+
+        count = len(nodes)
+        self.nodes = nodes
+        self.parent = np.asarray(parents, dtype=np.int32)
+        self.depth = np.asarray(depths, dtype=np.int32)
+        self.local = np.tile(np.identity(4, dtype=np.float32), (count, 1, 1))
+        self.world = np.empty_like(self.local)
+
+        # Contiguous slice per level (root level excluded) plus its parents.
+        self.levels = []
+        if count:
+            bounds = np.flatnonzero(np.diff(self.depth)) + 1
+            starts = [0, *bounds.tolist()]
+            ends = [*bounds.tolist(), count]
+            for start, end in zip(starts[1:], ends[1:]):
+                self.levels.append((slice(start, end), self.parent[start:end]))
+
+        self.dynamic = []
+        self.transform_nodes = []
+        for index, node in enumerate(nodes):
+            if isinstance(node, TransformNode):
+                self.transform_nodes.append(node)
+                self.local[index] = node.transform.get_matrix()
+                if is_animated(node.transform):
+                    self.dynamic.append((index, node))
+        self.refreshed = list(self.dynamic)
+
+        # Depth-first walk to keep the same draw order as `Node.draw`.
+        flat_index = {id(node): index for index, node in enumerate(nodes)}
+        draw_index: list[int] = []
+        self.draw_nodes = []
+        self.shape_nodes = []
+        self.light_nodes = []
+        stack = [root] if root is not None else []
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (GeometryNode, LightNode)):
+                draw_index.append(flat_index[id(node)])
+                self.draw_nodes.append(node)
+                if isinstance(node, LightNode):
+                    self.light_nodes.append(node)
+                else:
+                    self.shape_nodes.append(node)
+            stack.extend(reversed(node.children))
+
+        self.draw_index = np.asarray(draw_index, dtype=np.int32)
+        self.shapes = [node.shape for node in self.draw_nodes]
+
+        moving = np.zeros(count, dtype=bool)
+        moving[[index for index, _ in self.dynamic]] = True
+        for level, parents in self.levels:
+            moving[level] |= moving[parents]
+        self.dynamic_slots = np.flatnonzero(moving[self.draw_index]).astype(np.int32)
+        self._gather_bounds()
+
+    def _gather_bounds(self) -> None:
+        count = len(self.draw_nodes)
+        self.bound_center = np.zeros((count, 3), dtype=np.float32)
+        self.bound_extent = np.zeros((count, 3), dtype=np.float32)
+        self.bound_radius = np.zeros(count, dtype=np.float32)
+        self.bounded = np.zeros(count, dtype=bool)
+        for slot, node in enumerate(self.draw_nodes):
+            bounds = node.shape.bounds
+            if bounds is None:
+                continue
+            self.bound_center[slot] = bounds.center
+            self.bound_extent[slot] = bounds.extent
+            self.bound_radius[slot] = bounds.radius
+            self.bounded[slot] = True
+        self.cullable = self.bounded & np.fromiter(
+            (not isinstance(node, LightNode) for node in self.draw_nodes),
+            dtype=bool,
+            count=count,
+        )
+
+    def set_managed(self, indices) -> None:
+        """Stop re-reading the transforms at ``indices``; their owner fills `local`."""
+        managed = {int(index) for index in indices}
+        self.refreshed = [
+            (index, node) for index, node in self.dynamic if index not in managed
+        ]
+
+    def refresh_dynamic(self) -> None:
+        """Re-read the local matrix of every animated transform."""
+        local = self.local
+        for index, node in self.refreshed:
+            local[index] = node.transform.get_matrix()
+
+    def evaluate(self) -> np.ndarray:
+        """Propagate local matrices down the tree, one batched matmul per level."""
+        if not self.nodes:
+            return self.world
+        self.evaluations += 1
+        world = self.world
+        world[0] = self.local[0]
+        for level, parents in self.levels:
+            np.matmul(world[parents], self.local[level], out=world[level])
+        return world
+
+    def update(self) -> np.ndarray:
+        self.refresh_dynamic()
+        return self.evaluate()
+
+    def world_bounds(
+        self, slots: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """World-space center, sphere radius and AABB half extent per draw slot."""
+        if slots is None:
+            slots = slice(None)
+        model = self.world[self.draw_index[slots]]
+        basis = model[:, :3, :3]
+        center = (
+            np.einsum("nij,nj->ni", basis, self.bound_center[slots]) + model[:, :3, 3]
+        )
+        scale = np.sqrt((basis * basis).sum(axis=1)).max(axis=1)
+        radius = self.bound_radius[slots] * scale
+        extent = np.einsum("nij,nj->ni", np.abs(basis), self.bound_extent[slots])
+        return center, radius, extent
+
+    def draw(
+        self,
+        view: np.ndarray,
+        proj: np.ndarray,
+        visible: np.ndarray | None = None,
+        profiler=None,
+    ) -> None:
+        """Draw every visible slot; ``profiler`` times each one as a scope."""
+        world = self.world
+        for slot, (index, shape) in enumerate(zip(self.draw_index, self.shapes)):
+            if visible is not None and not visible[slot]:
+                continue
+            if profiler is None:
+                shape.transform(proj, view, world[index])
+                shape.draw()
+                continue
+            with profiler.scope(self.draw_nodes[slot].name):
+                shape.transform(proj, view, world[index])
+                shape.draw()
+
+
+__all__ = ["CompiledScene", "is_animated"]
@@ -0,0 +1,65 @@
+"""View-frustum culling over a compiled scene."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from rendering.compiled_scene import CompiledScene
+
+
+def frustum_planes(view_proj: np.ndarray) -> np.ndarray:
+    """Six normalized planes (a, b, c, d) pointing into the frustum.
+
+    Extracted from the rows of ``proj @ view`` (Gribb/Hartmann); a point ``p``
+    is inside a plane when ``dot(n, p) + d >= 0``.
+    """
+    m = np.asarray(view_proj, dtype=np.float64)
+    planes = np.stack(
+        [
+            m[3] + m[0],  # left
+            m[3] - m[0],  # right
+            m[3] + m[1],  # bottom
+            m[3] - m[1],  # top
+            m[3] + m[2],  # near
+            m[3] - m[2],  # far
+        ]
+    )
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+class FrustumCuller:
+    """Vectorized sphere-then-AABB test of every draw slot against the frustum."""
+
+    def __init__(self):
+        self.visible = np.empty(0, dtype=bool)
+        self.culled = 0
+
+    def cull(
+        self, scene: CompiledScene, view: np.ndarray, proj: np.ndarray
+    ) -> np.ndarray:
+        """Return a boolean mask over ``scene.draw_index`` of slots to draw."""
+        if not len(scene.draw_index):
+            self.visible = np.empty(0, dtype=bool)
+            self.culled = 0
+            return self.visible
+
+        planes = frustum_planes(proj @ view)
+        normals = planes[:, :3]
+        center, radius, extent = scene.world_bounds()
+
+        # (planes, slots) signed distances of each bound's center.
+        distance = normals @ center.T + planes[:, 3:4]
+        inside = (distance >= -radius).all(axis=0)
+
+        # Tighten survivors with the world AABB: its projected radius onto
+        # each plane normal is |n| . extent.
+        box_radius = np.abs(normals) @ extent.T
+        inside &= (distance >= -box_radius).all(axis=0)
+
+        self.visible = inside | ~scene.cullable
+        self.culled = int(self.visible.size - np.count_nonzero(self.visible))
+        return self.visible
+
+
+__all__ = ["FrustumCuller", "frustum_planes"]
@@ -0,0 +1,303 @@
+"""Deferred shading through a G-buffer."""
+
+from __future__ import annotations
+
+import numpy as np
+from OpenGL import GL
+
+from config import (
+    _DEFERRED_FRAGMENT_PATH,
+    _DEFERRED_VERTEX_PATH,
+    _GBUFFER_FRAGMENT_PATH,
+    _GBUFFER_VERTEX_PATH,
+    ModelVisualizationMode,
+    ShadingModel,
+)
+from graphics.scene import LightNode
+from graphics.shader import ShaderProgram
+from rendering.compiled_scene import CompiledScene
+from rendering.render_queue import _uses_custom_draw
+from rendering.stats import FrameStats
+
+# Attachments in layout order: view-space position, normal, albedo (unlit
+# color with the ambient term, plus lighting weight), material (RGB diffuse,
+# shininess) and RGB specular.
+_TARGETS = (
+    ("gPosition", GL.GL_RGBA32F),
+    ("gNormal", GL.GL_RGBA16F),
+    ("gAlbedo", GL.GL_RGBA16F),
+    ("gMaterial", GL.GL_RGBA16F),
+    ("gSpecular", GL.GL_RGBA16F),
+)
+
+
+def deferrable(node) -> bool:
+    """Whether a draw node goes through the G-buffer rather than forward."""
+    if isinstance(node, LightNode):
+        return False
+    shape = node.shape
+    mode = getattr(shape, "visualization_mode", None)
+    if mode is not None:
+        # Model only overrides draw for its debug views.
+        return mode is ModelVisualizationMode.NORMAL
+    return not _uses_custom_draw(shape)
+
+
+class GBuffer:
+    """Framebuffer with the `_TARGETS` color attachments and a depth texture."""
+
+    def __init__(self):
+        self.fbo = None
+        self.textures: list[int] = []
+        self.depth = None
+        self.size = (0, 0)
+
+    def resize(self, width: int, height: int) -> None:
+        if (width, height) == self.size and self.fbo is not None:
+            return
+        self.cleanup()
+        self.size = (width, height)
+        self.fbo = GL.glGenFramebuffers(1)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+
+        for attachment, (_, internal_format) in enumerate(_TARGETS):
+            texture = self._texture(
+                width, height, internal_format, GL.GL_RGBA, GL.GL_FLOAT
+            )
+            GL.glFramebufferTexture2D(
+                GL.GL_FRAMEBUFFER,
+                GL.GL_COLOR_ATTACHMENT0 + attachment,
+                GL.GL_TEXTURE_2D,
+                texture,
+                0,
+            )
+            self.textures.append(texture)
+        self.depth = self._texture(
+            width, height, GL.GL_DEPTH_COMPONENT24, GL.GL_DEPTH_COMPONENT, GL.GL_FLOAT
+        )
+        GL.glFramebufferTexture2D(
+            GL.GL_FRAMEBUFFER, GL.GL_DEPTH_ATTACHMENT, GL.GL_TEXTURE_2D, self.depth, 0
+        )
+        GL.glDrawBuffers(
+            len(_TARGETS),
+            [GL.GL_COLOR_ATTACHMENT0 + index for index in range(len(_TARGETS))],
+        )
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Incomplete G-buffer (status 0x{int(status):x})")
+
+    @staticmethod
+    def _texture(width, height, internal_format, texture_format, dtype) -> int:
+        texture = GL.glGenTextures(1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        GL.glTexImage2D(
+            GL.GL_TEXTURE_2D,
+            0,
+            internal_format,
+            width,
+            height,
+            0,
+            texture_format,
+            dtype,
+            None,
+        )
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        return texture
+
+    def cleanup(self) -> None:
+        if self.fbo is not None:
+            GL.glDeleteFramebuffers(1, [self.fbo])
+            GL.glDeleteTextures([*self.textures, self.depth])
+        self.fbo = None
+        self.textures = []
+        self.depth = None
+        self.size = (0, 0)
+
+
+class DeferredRenderer:
+    """Renders the compiled scene in a geometry pass and a lighting pass.
+
+    The geometry pass draws every deferrable visible slot front to back into
+    the `GBuffer`, so hidden fragments only cost a G-buffer write. One
+    full-screen pass then lights each pixel once with the scene light,
+    using the reflection (Phong) or half vector (Blinn-Phong); Gouraud
+    lighting stays per vertex and is stored already lit. The resolve writes
+    ``gl_FragDepth`` so anything drawn forward afterwards (lights, Model
+    debug views) is depth tested against the deferred geometry.
+    """
+
+    def __init__(self):
+        self.gbuffer = GBuffer()
+        self.geometry_program: ShaderProgram | None = None
+        self.resolve_program: ShaderProgram | None = None
+        self._locs: dict[str, int] = {}
+        self._resolve_locs: dict[str, int] = {}
+        self._empty_vao = None
+        self.deferred_slots = 0
+
+    def _ensure_resources(self) -> None:
+        geometry = ShaderProgram.shared(_GBUFFER_VERTEX_PATH, _GBUFFER_FRAGMENT_PATH)
+        if geometry is not self.geometry_program:
+            self.geometry_program = geometry
+            self._locs = {
+                name: GL.glGetUniformLocation(geometry.program, name)
+                for name in (
+                    "transform",
+                    "camera",
+                    "project",
+                    "use_texture",
+                    "textureData",
+                    "gouraud",
+                    "I_lights",
+                    "K_materials",
+                    "shininess",
+                    "lightCoord",
+                )
+            }
+        resolve = ShaderProgram.shared(_DEFERRED_VERTEX_PATH, _DEFERRED_FRAGMENT_PATH)
+        if resolve is not self.resolve_program:
+            self.resolve_program = resolve
+            self._resolve_locs = {
+                name: GL.glGetUniformLocation(resolve.program, name)
+                for name in ("I_lights", "lightCoord", "blinn")
+            }
+            resolve.activate()
+            for unit, (name, _) in enumerate(_TARGETS):
+                GL.glUniform1i(GL.glGetUniformLocation(resolve.program, name), unit)
+            GL.glUniform1i(
+                GL.glGetUniformLocation(resolve.program, "gDepth"), len(_TARGETS)
+            )
+            resolve.deactivate()
+        if self._empty_vao is None:
+            self._empty_vao = GL.glGenVertexArrays(1)
+
+    def render(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        proj: np.ndarray,
+        visible: np.ndarray | None,
+        shading: ShadingModel,
+        light_color: np.ndarray,
+        light_position: np.ndarray,
+        viewport: tuple[int, int],
+        stats: FrameStats | None = None,
+    ) -> np.ndarray:
+        """Draw and light the deferrable slots; returns the slots left to forward."""
+        stats = stats if stats is not None else FrameStats()
+        self._ensure_resources()
+
+        deferred = np.fromiter(
+            (deferrable(node) for node in scene.draw_nodes),
+            dtype=bool,
+            count=len(scene.draw_nodes),
+        )
+        forward = ~deferred
+        if visible is not None:
+            deferred &= visible
+            forward &= visible
+        slots = np.flatnonzero(deferred)
+        self.deferred_slots = int(slots.size)
+
+        # Front to back, so the depth test rejects most hidden fragments.
+        origins = scene.world[scene.draw_index[slots]][:, :3, 3]
+        slots = slots[np.argsort(-(origins @ view[2, :3] + view[2, 3]))]
+
+        lights = np.tile(np.asarray(light_color, dtype=np.float32)[:, None], (1, 3))
+        light_position = np.asarray(light_position, dtype=np.float32)[:3]
+
+        target = GL.glGetIntegerv(GL.GL_DRAW_FRAMEBUFFER_BINDING)
+        self.gbuffer.resize(*(int(size) for size in viewport))
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.gbuffer.fbo)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        self._geometry_pass(scene, slots, view, proj, shading, lights, light_position)
+        stats.program_binds += 1
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, int(target))
+
+        self._resolve(shading, lights, light_position)
+        stats.program_binds += 1
+        stats.draw_calls += 1
+        for slot in slots:
+            stats.draw_calls += len(scene.shapes[slot].shapes)
+        return forward
+
+    def _geometry_pass(
+        self, scene, slots, view, proj, shading, lights, light_position
+    ) -> None:
+        locs = self._locs
+        self.geometry_program.activate()
+        GL.glUniformMatrix4fv(locs["camera"], 1, GL.GL_TRUE, view)
+        GL.glUniformMatrix4fv(locs["project"], 1, GL.GL_TRUE, proj)
+        GL.glUniform1i(locs["textureData"], 0)
+        GL.glUniform1i(locs["gouraud"], shading is ShadingModel.GOURAUD)
+        GL.glUniformMatrix3fv(locs["I_lights"], 1, GL.GL_TRUE, lights)
+        GL.glUniform3fv(locs["lightCoord"], 1, light_position)
+
+        world = scene.world
+        draw_index = scene.draw_index
+        for slot in slots:
+            shape = scene.shapes[slot]
+            GL.glUniformMatrix4fv(
+                locs["transform"], 1, GL.GL_TRUE, world[draw_index[slot]]
+            )
+            GL.glUniformMatrix3fv(
+                locs["K_materials"], 1, GL.GL_TRUE, shape.material_matrix()
+            )
+            GL.glUniform1f(locs["shininess"], shape.shininess)
+            textured = bool(shape.texture and shape.texture_enabled)
+            GL.glUniform1i(locs["use_texture"], textured)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, shape.texture.tex if textured else 0)
+            for part in shape.shapes:
+                GL.glBindVertexArray(part.vao.vao)
+                if part.vao.ebo is not None:
+                    GL.glDrawElements(
+                        part.draw_mode, part.index_num, GL.GL_UNSIGNED_INT, None
+                    )
+                else:
+                    GL.glDrawArrays(part.draw_mode, 0, part.vertex_num)
+        GL.glBindVertexArray(0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        self.geometry_program.deactivate()
+
+    def _resolve(self, shading, lights, light_position) -> None:
+        cull_face = GL.glIsEnabled(GL.GL_CULL_FACE)
+        polygon_mode = int(np.atleast_1d(GL.glGetIntegerv(GL.GL_POLYGON_MODE))[0])
+        depth_func = int(GL.glGetIntegerv(GL.GL_DEPTH_FUNC))
+        GL.glDisable(GL.GL_CULL_FACE)
+        GL.glPolygonMode(GL.GL_FRONT_AND_BACK, GL.GL_FILL)
+        GL.glDepthFunc(GL.GL_ALWAYS)
+
+        locs = self._resolve_locs
+        self.resolve_program.activate()
+        GL.glUniformMatrix3fv(locs["I_lights"], 1, GL.GL_TRUE, lights)
+        GL.glUniform3fv(locs["lightCoord"], 1, light_position)
+        GL.glUniform1i(locs["blinn"], shading is ShadingModel.BLINN_PHONG)
+        for unit, texture in enumerate([*self.gbuffer.textures, self.gbuffer.depth]):
+            GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+        GL.glBindVertexArray(self._empty_vao)
+        GL.glDrawArrays(GL.GL_TRIANGLES, 0, 3)
+        GL.glBindVertexArray(0)
+        for unit in reversed(range(len(_TARGETS) + 1)):
+            GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        self.resolve_program.deactivate()
+
+        GL.glDepthFunc(depth_func)
+        GL.glPolygonMode(GL.GL_FRONT_AND_BACK, polygon_mode)
+        if cull_face:
+            GL.glEnable(GL.GL_CULL_FACE)
+
+    def cleanup(self) -> None:
+        self.gbuffer.cleanup()
+        if self._empty_vao is not None:
+            GL.glDeleteVertexArrays(1, [self._empty_vao])
+            self._empty_vao = None
+        self.geometry_program = None
+        self.resolve_program = None
+
+
+__all__ = ["DeferredRenderer", "GBuffer", "deferrable"]
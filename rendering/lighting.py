@@ -0,0 +1,272 @@
+"""Clustered forward lighting for scenes with many point lights."""
+
+from __future__ import annotations
+
+import numpy as np
+from OpenGL import GL
+
+from config import _CLUSTERED_FRAGMENT_PATH, _SHAPE_VERTEX_PATH
+from graphics.scene import LightNode
+from graphics.shader import ShaderProgram
+from rendering.compiled_scene import CompiledScene
+
+# Range uploaded for lights without one; large enough to never fade.
+_UNBOUNDED = 1.0e30
+# Texture units of the light, cluster and index buffers (unit 0 is textureData).
+_LIGHT_UNIT, _CLUSTER_UNIT, _INDEX_UNIT = 1, 2, 3
+
+
+def clip_range(proj: np.ndarray) -> tuple[float, float]:
+    """Near and far distances encoded in a perspective or orthographic projection."""
+    if proj[3, 3] == 0.0:
+        near = proj[2, 3] / (proj[2, 2] - 1.0)
+        far = proj[2, 3] / (proj[2, 2] + 1.0)
+    else:
+        near = (proj[2, 3] + 1.0) / proj[2, 2]
+        far = (proj[2, 3] - 1.0) / proj[2, 2]
+    near = max(float(abs(near)), 1e-3)
+    return near, max(float(abs(far)), near * 1.001)
+
+
+class _TextureBuffer:
+    """A buffer object exposed to shaders as a ``samplerBuffer``."""
+
+    def __init__(self, internal_format):
+        self.internal_format = internal_format
+        self.buffer = GL.glGenBuffers(1)
+        self.texture = GL.glGenTextures(1)
+
+    def upload(self, data: np.ndarray) -> None:
+        if not data.size:
+            # Zero-sized buffers cannot back a texture; keep one dummy texel.
+            data = np.zeros(4, dtype=data.dtype)
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, self.buffer)
+        GL.glBufferData(GL.GL_TEXTURE_BUFFER, data.nbytes, data, GL.GL_STREAM_DRAW)
+        GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, 0)
+
+    def bind(self, unit: int) -> None:
+        GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+        GL.glBindTexture(GL.GL_TEXTURE_BUFFER, self.texture)
+        GL.glTexBuffer(GL.GL_TEXTURE_BUFFER, self.internal_format, self.buffer)
+
+    def cleanup(self) -> None:
+        GL.glDeleteTextures([self.texture])
+        GL.glDeleteBuffers(1, [self.buffer])
+
+
+class ClusteredLighting:
+    """Bins the scene's point lights into a view-space cluster grid.
+
+    The view frustum is split into ``grid`` = (x tiles, y tiles, z slices)
+    clusters, the slices spaced exponentially between the near and far
+    planes. Every frame the sphere of each light (center from its world
+    matrix, radius from ``LightSource.light_range``) is tested against the
+    view-space box of every cluster in one vectorized pass, and three
+    texture buffers are uploaded: light data, a (first, count) pair per
+    cluster and the flat light index list. ``phong_clustered.frag`` then
+    loops over the lights of its own cluster only, so shading cost follows
+    lights per cluster rather than the total light count.
+    """
+
+    def __init__(self, grid: tuple[int, int, int] = (16, 9, 24)):
+        self.grid = tuple(int(size) for size in grid)
+        if min(self.grid) < 1:
+            raise ValueError("Cluster grid sizes must be positive")
+        self._scene: CompiledScene | None = None
+        self._version = None
+        self.light_nodes: list[LightNode] = []
+        self._light_index = np.empty(0, dtype=np.int32)
+
+        # Cluster boxes in view space, rebuilt when the projection changes.
+        self._grid_key = None
+        self.slice_edges = np.empty(0, dtype=np.float32)
+        self.tile_x = np.empty((0, 0, 2), dtype=np.float32)
+        self.tile_y = np.empty((0, 0, 2), dtype=np.float32)
+        self._slice_scale = 0.0
+        self._slice_bias = 0.0
+
+        self.cluster_offset = np.empty(0, dtype=np.uint32)
+        self.cluster_count = np.empty(0, dtype=np.uint32)
+        self.light_list = np.empty(0, dtype=np.uint32)
+
+        self.program: ShaderProgram | None = None
+        self._buffers: tuple[_TextureBuffer, ...] = ()
+
+    @property
+    def cluster_total(self) -> int:
+        x, y, z = self.grid
+        return x * y * z
+
+    def _gather_lights(self, scene: CompiledScene) -> None:
+        slots = [
+            slot
+            for slot, node in enumerate(scene.draw_nodes)
+            if isinstance(node, LightNode)
+        ]
+        self.light_nodes = [scene.draw_nodes[slot] for slot in slots]
+        self._light_index = scene.draw_index[slots]
+        self._scene = scene
+        self._version = scene.version
+
+    def _light_properties(self) -> tuple[np.ndarray, np.ndarray]:
+        count = len(self.light_nodes)
+        colors = np.ones((count, 3), dtype=np.float32)
+        ranges = np.full(count, np.inf, dtype=np.float32)
+        for index, node in enumerate(self.light_nodes):
+            color = getattr(node.shape, "color", None)
+            if color is not None:
+                colors[index] = color
+            light_range = getattr(node.shape, "light_range", None)
+            if light_range is not None:
+                ranges[index] = light_range
+        return colors, ranges
+
+    def _update_grid(self, proj: np.ndarray, viewport: tuple[int, int]) -> None:
+        key = (proj.tobytes(), tuple(viewport))
+        if key == self._grid_key:
+            return
+        self._grid_key = key
+        tiles_x, tiles_y, slices = self.grid
+        near, far = clip_range(proj)
+        steps = np.arange(slices + 1, dtype=np.float64) / slices
+        distance = near * (far / near) ** steps
+        self.slice_edges = distance.astype(np.float32)
+        log_ratio = np.log(far / near)
+        self._slice_scale = slices / log_ratio
+        self._slice_bias = -slices * np.log(near) / log_ratio
+
+        # View-space x (or y) of every tile edge at every slice edge; it is
+        # bilinear in (ndc, z), so each cell's extremes sit at its corners.
+        z = -distance[:, None]
+        w = proj[3, 2] * z + proj[3, 3]
+
+        def edges(row: int, tiles: int) -> np.ndarray:
+            ndc = np.linspace(-1.0, 1.0, tiles + 1)[None, :]
+            values = (ndc * w - proj[row, 2] * z - proj[row, 3]) / proj[row, row]
+            corners = np.stack(
+                [values[:-1, :-1], values[:-1, 1:], values[1:, :-1], values[1:, 1:]]
+            )
+            return np.stack([corners.min(axis=0), corners.max(axis=0)], axis=-1)
+
+        self.tile_x = edges(0, tiles_x).astype(np.float32)
+        self.tile_y = edges(1, tiles_y).astype(np.float32)
+
+    def assign(
+        self, positions: np.ndarray, ranges: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(cluster, light) pairs for eye-space light spheres, sorted by cluster."""
+        if not len(positions):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        def gap(value: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+            return np.maximum(np.maximum(low - value, value - high), 0.0) ** 2
+
+        edges = self.slice_edges
+        distance = -positions[:, 2:3]
+        dz = gap(distance, edges[None, :-1], edges[None, 1:])
+        dx = gap(
+            positions[:, 0, None, None], self.tile_x[None, ..., 0], self.tile_x[..., 1]
+        )
+        dy = gap(
+            positions[:, 1, None, None], self.tile_y[None, ..., 0], self.tile_y[..., 1]
+        )
+        # Squared sphere-to-box distance per (light, slice, tile y, tile x).
+        inside = (
+            dz[:, :, None, None] + dy[:, :, :, None] + dx[:, :, None, :]
+        ) <= (ranges * ranges)[:, None, None, None]
+        light, cluster = np.nonzero(inside.reshape(len(positions), -1))
+        order = np.argsort(cluster, kind="stable")
+        return cluster[order], light[order]
+
+    def _ensure_resources(self) -> None:
+        program = ShaderProgram.shared(_SHAPE_VERTEX_PATH, _CLUSTERED_FRAGMENT_PATH)
+        if program is not self.program:
+            self.program = program
+            handle = program.program
+            program.activate()
+            GL.glUniform1i(GL.glGetUniformLocation(handle, "lightData"), _LIGHT_UNIT)
+            GL.glUniform1i(
+                GL.glGetUniformLocation(handle, "clusterGrid"), _CLUSTER_UNIT
+            )
+            GL.glUniform1i(GL.glGetUniformLocation(handle, "lightIndex"), _INDEX_UNIT)
+            program.deactivate()
+            self._dims_loc = GL.glGetUniformLocation(handle, "cluster_dims")
+            self._tile_size_loc = GL.glGetUniformLocation(handle, "tile_size")
+            self._slice_scale_loc = GL.glGetUniformLocation(handle, "slice_scale")
+            self._slice_bias_loc = GL.glGetUniformLocation(handle, "slice_bias")
+        if not self._buffers:
+            self._buffers = (
+                _TextureBuffer(GL.GL_RGBA32F),
+                _TextureBuffer(GL.GL_RG32UI),
+                _TextureBuffer(GL.GL_R32UI),
+            )
+
+    def update(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        proj: np.ndarray,
+        viewport: tuple[int, int],
+    ) -> None:
+        """Bin this frame's lights and bind the buffers; call after `evaluate`."""
+        self._ensure_resources()
+        if scene is not self._scene or scene.version != self._version:
+            self._gather_lights(scene)
+        self._update_grid(proj, viewport)
+
+        world = scene.world[self._light_index][:, :3, 3]
+        positions = world @ view[:3, :3].T + view[:3, 3]
+        colors, ranges = self._light_properties()
+        cluster, light = self.assign(positions, ranges)
+
+        count = np.bincount(cluster, minlength=self.cluster_total)
+        self.cluster_count = count.astype(np.uint32)
+        self.cluster_offset = (np.cumsum(count) - count).astype(np.uint32)
+        self.light_list = light.astype(np.uint32)
+
+        light_data = np.zeros((len(positions), 2, 4), dtype=np.float32)
+        light_data[:, 0, :3] = positions
+        light_data[:, 0, 3] = np.minimum(ranges, _UNBOUNDED)
+        light_data[:, 1, :3] = colors
+
+        light_buffer, cluster_buffer, index_buffer = self._buffers
+        light_buffer.upload(light_data.ravel())
+        cluster_buffer.upload(
+            np.stack([self.cluster_offset, self.cluster_count], axis=1).ravel()
+        )
+        index_buffer.upload(self.light_list)
+
+        light_buffer.bind(_LIGHT_UNIT)
+        cluster_buffer.bind(_CLUSTER_UNIT)
+        index_buffer.bind(_INDEX_UNIT)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+
+        width, height = viewport
+        tiles_x, tiles_y, slices = self.grid
+        self.program.activate()
+        GL.glUniform3i(self._dims_loc, tiles_x, tiles_y, slices)
+        GL.glUniform2f(self._tile_size_loc, width / tiles_x, height / tiles_y)
+        GL.glUniform1f(self._slice_scale_loc, self._slice_scale)
+        GL.glUniform1f(self._slice_bias_loc, self._slice_bias)
+        self.program.deactivate()
+
+    @property
+    def light_count(self) -> int:
+        return len(self.light_nodes)
+
+    @property
+    def max_per_cluster(self) -> int:
+        return int(self.cluster_count.max()) if self.cluster_count.size else 0
+
+    def cleanup(self) -> None:
+        for buffer in self._buffers:
+            buffer.cleanup()
+        self._buffers = ()
+        self.program = None
+        self._scene = None
+        self._version = None
+        self._grid_key = None
+
+
+__all__ = ["ClusteredLighting", "clip_range"]
@@ -0,0 +1,271 @@
+"""Hardware occlusion culling with bounding-box queries."""
+
+from __future__ import annotations
+
+import numpy as np
+from OpenGL import GL
+
+from config import _BBOX_FRAGMENT_PATH, _BBOX_VERTEX_PATH
+from graphics.buffer import VAO
+from graphics.shader import ShaderProgram
+from rendering.bvh import BVH
+from rendering.compiled_scene import CompiledScene
+
+# fmt: off
+_CUBE_CORNERS = np.array(
+    [
+        [-1, -1, -1], [ 1, -1, -1], [ 1,  1, -1], [-1,  1, -1],
+        [-1, -1,  1], [ 1, -1,  1], [ 1,  1,  1], [-1,  1,  1],
+    ],
+    dtype=np.float32,
+)
+_CUBE_INDICES = np.array(
+    [
+        0, 2, 1, 0, 3, 2,  4, 5, 6, 4, 6, 7,
+        0, 1, 5, 0, 5, 4,  3, 6, 2, 3, 7, 6,
+        0, 4, 7, 0, 7, 3,  1, 2, 6, 1, 6, 5,
+    ],
+    dtype=np.uint32,
+)
+# fmt: on
+
+# Relative growth applied to every tested box.
+_BOX_PADDING = 0.01
+
+
+def _near_plane(proj: np.ndarray) -> float:
+    """Near distance encoded in a perspective or orthographic projection."""
+    if proj[3, 3] == 0.0:
+        return float(abs(proj[2, 3] / (proj[2, 2] - 1.0)))
+    return float(abs((proj[2, 3] + 1.0) / proj[2, 2]))
+
+
+class OcclusionCuller:
+    """Skips draw slots whose bounding box produced no samples last frame.
+
+    After the frame's geometry is drawn, the world AABB of every tested group
+    (one per draw slot, or one per BVH leaf when a `BVH` is given) is
+    rasterized with color and depth writes off inside a
+    ``GL_ANY_SAMPLES_PASSED`` query. Results are collected on the next frame
+    only once the GPU reports them available, so the CPU never waits; groups
+    without a result are treated as visible.
+    """
+
+    def __init__(self, bvh: BVH | None = None):
+        self.bvh = bvh
+        self._scene: CompiledScene | None = None
+        # Scene version (or BVH build count) the query groups belong to.
+        self._version = None
+
+        self.queries = np.empty(0, dtype=np.uint32)
+        self.pending = np.empty(0, dtype=bool)
+        self.occluded = np.empty(0, dtype=bool)
+        self.slot_group = np.empty(0, dtype=np.int32)
+        self.box_min = np.empty((0, 3), dtype=np.float32)
+        self.box_max = np.empty((0, 3), dtype=np.float32)
+
+        self.program: ShaderProgram | None = None
+        self.vao: VAO | None = None
+
+        self.occluded_slots = 0
+        self.draws_saved = 0
+        self.fragments_saved = 0
+        self.queries_issued = 0
+
+    def _ensure_resources(self) -> None:
+        if self.program is None:
+            self.program = ShaderProgram.shared(_BBOX_VERTEX_PATH, _BBOX_FRAGMENT_PATH)
+            program = self.program.program
+            self._center_loc = GL.glGetUniformLocation(program, "box_center")
+            self._extent_loc = GL.glGetUniformLocation(program, "box_extent")
+            self._view_proj_loc = GL.glGetUniformLocation(program, "view_proj")
+        if self.vao is None:
+            self.vao = VAO()
+            self.vao.add_vbo(
+                location=0,
+                data=_CUBE_CORNERS,
+                ncomponents=3,
+                dtype=GL.GL_FLOAT,
+                normalized=False,
+                stride=0,
+                offset=None,
+            )
+            self.vao.add_ebo(_CUBE_INDICES)
+
+    def _resize(self, count: int) -> None:
+        self._delete_queries()
+        self.queries = (
+            np.atleast_1d(np.asarray(GL.glGenQueries(count), dtype=np.uint32))
+            if count
+            else np.empty(0, dtype=np.uint32)
+        )
+        self.pending = np.zeros(count, dtype=bool)
+        self.occluded = np.zeros(count, dtype=bool)
+
+    def _update_groups(self, scene: CompiledScene) -> None:
+        if self.bvh is None:
+            count = len(scene.draw_index)
+            if scene is not self._scene or scene.version != self._version:
+                self._resize(count)
+                self.slot_group = np.where(
+                    scene.cullable, np.arange(count, dtype=np.int32), -1
+                ).astype(np.int32)
+                self._scene = scene
+                self._version = scene.version
+            center, _, extent = scene.world_bounds()
+            self.box_min, self.box_max = center - extent, center + extent
+            return
+
+        bvh = self.bvh
+        bvh.update(scene)
+        if bvh.builds != self._version:
+            leaves = len(bvh.leaves)
+            self._resize(leaves)
+            group_of_node = np.full(len(bvh), -1, dtype=np.int32)
+            group_of_node[bvh.leaves] = np.arange(leaves, dtype=np.int32)
+            self.slot_group = np.where(
+                scene.cullable & (bvh.slot_leaf >= 0),
+                group_of_node[np.maximum(bvh.slot_leaf, 0)],
+                -1,
+            ).astype(np.int32)
+            self._scene = scene
+            self._version = bvh.builds
+        self.box_min = bvh.node_min[bvh.leaves]
+        self.box_max = bvh.node_max[bvh.leaves]
+
+    def _collect_results(self) -> None:
+        """Read back queries whose results are ready; never blocks."""
+        for group in np.flatnonzero(self.pending):
+            query = int(self.queries[group])
+            if not GL.glGetQueryObjectuiv(query, GL.GL_QUERY_RESULT_AVAILABLE):
+                continue
+            self.occluded[group] = not GL.glGetQueryObjectuiv(query, GL.GL_QUERY_RESULT)
+            self.pending[group] = False
+
+    def filter(
+        self,
+        scene: CompiledScene,
+        visible: np.ndarray | None,
+        view: np.ndarray,
+        proj: np.ndarray,
+        viewport: tuple[int, int],
+    ) -> np.ndarray:
+        """Drop slots whose group was occluded according to last frame's queries."""
+        self._ensure_resources()
+        self._update_groups(scene)
+        self._collect_results()
+
+        count = len(scene.draw_index)
+        if visible is None:
+            visible = np.ones(count, dtype=bool)
+        grouped = self.slot_group >= 0
+        hidden = np.zeros(count, dtype=bool)
+        hidden[grouped] = self.occluded[self.slot_group[grouped]]
+        hidden &= visible
+
+        slots = np.flatnonzero(hidden)
+        self.occluded_slots = int(slots.size)
+        self.draws_saved = sum(len(scene.shapes[slot].shapes) for slot in slots)
+        self.fragments_saved = self._projected_area(scene, slots, view, proj, viewport)
+        return visible & ~hidden
+
+    @staticmethod
+    def _projected_area(
+        scene: CompiledScene,
+        slots: np.ndarray,
+        view: np.ndarray,
+        proj: np.ndarray,
+        viewport: tuple[int, int],
+    ) -> int:
+        """Estimate shaded fragments as the screen rectangle of each slot's box."""
+        if not slots.size:
+            return 0
+        center, _, extent = scene.world_bounds(slots)
+        corners = center[:, None, :] + _CUBE_CORNERS[None] * extent[:, None, :]
+        clip = np.concatenate([corners, np.ones((*corners.shape[:2], 1))], axis=2)
+        clip = clip @ (proj @ view).T
+        w = np.maximum(clip[..., 3:4], 1e-6)
+        ndc = np.clip(clip[..., :2] / w, -1.0, 1.0)
+        size = (ndc.max(axis=1) - ndc.min(axis=1)) * 0.5
+        width, height = viewport
+        return int((size[:, 0] * width * size[:, 1] * height).sum())
+
+    def issue(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        proj: np.ndarray,
+        visible: np.ndarray | None = None,
+    ) -> None:
+        """Queue this frame's box queries; call after the scene has been drawn."""
+        count = len(self.queries)
+        tested = np.zeros(count, dtype=bool)
+        grouped = self.slot_group >= 0
+        if visible is not None:
+            grouped &= visible
+        tested[self.slot_group[grouped]] = True
+
+        # Boxes that reach the near plane would be clipped and report no
+        # samples, so they are always considered visible.
+        eye = np.linalg.inv(view)[:3, 3]
+        margin = _near_plane(proj) * 2.0
+        around_eye = (
+            (self.box_min - margin <= eye) & (eye <= self.box_max + margin)
+        ).all(axis=1)
+        self.occluded[~tested | around_eye] = False
+        tested &= ~around_eye
+
+        groups = np.flatnonzero(tested)
+        self.queries_issued = int(groups.size)
+        if not groups.size:
+            return
+
+        # Pad the boxes so flat shapes, whose box faces would coincide with
+        # their own surface, are not hidden by the depth test.
+        center = (self.box_min + self.box_max) * 0.5
+        extent = (self.box_max - self.box_min) * 0.5
+        extent = extent + extent.max(axis=1, keepdims=True) * _BOX_PADDING + 1e-4
+
+        cull_face = GL.glIsEnabled(GL.GL_CULL_FACE)
+        GL.glDisable(GL.GL_CULL_FACE)
+        GL.glColorMask(GL.GL_FALSE, GL.GL_FALSE, GL.GL_FALSE, GL.GL_FALSE)
+        GL.glDepthMask(GL.GL_FALSE)
+
+        self.program.activate()
+        GL.glUniformMatrix4fv(self._view_proj_loc, 1, GL.GL_TRUE, proj @ view)
+        self.vao.activate()
+        for group in groups:
+            GL.glUniform3fv(self._center_loc, 1, center[group])
+            GL.glUniform3fv(self._extent_loc, 1, extent[group])
+            GL.glBeginQuery(GL.GL_ANY_SAMPLES_PASSED, int(self.queries[group]))
+            GL.glDrawElements(
+                GL.GL_TRIANGLES, len(_CUBE_INDICES), GL.GL_UNSIGNED_INT, None
+            )
+            GL.glEndQuery(GL.GL_ANY_SAMPLES_PASSED)
+        self.vao.deactivate()
+        self.program.deactivate()
+
+        GL.glDepthMask(GL.GL_TRUE)
+        GL.glColorMask(GL.GL_TRUE, GL.GL_TRUE, GL.GL_TRUE, GL.GL_TRUE)
+        if cull_face:
+            GL.glEnable(GL.GL_CULL_FACE)
+
+        self.pending[:] = False
+        self.pending[groups] = True
+
+    def _delete_queries(self) -> None:
+        if len(self.queries):
+            GL.glDeleteQueries(len(self.queries), self.queries)
+        self.queries = np.empty(0, dtype=np.uint32)
+
+    def cleanup(self) -> None:
+        self._delete_queries()
+        if self.vao is not None:
+            self.vao.cleanup()
+            self.vao = None
+        self.program = None
+        self._scene = None
+        self._version = None
+
+
+__all__ = ["OcclusionCuller"]
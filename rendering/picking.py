@@ -0,0 +1,151 @@
+"""CPU ray picking against the compiled scene."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from graphics.scene import GeometryNode, LightNode
+from rendering.bvh import BVH
+from rendering.compiled_scene import CompiledScene
+
+_EPSILON = 1e-9
+
+
+@dataclass(slots=True)
+class PickResult:
+    """Nearest hit along a picking ray."""
+
+    node: GeometryNode | LightNode
+    slot: int
+    triangle: int
+    distance: float
+    point: np.ndarray
+
+
+def screen_ray(
+    x: float,
+    y: float,
+    width: float,
+    height: float,
+    view: np.ndarray,
+    proj: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """World-space origin and unit direction through window pixel (x, y).
+
+    ``y`` is measured from the top of the window, as GLFW reports it.
+    """
+    ndc_x = 2.0 * x / width - 1.0
+    ndc_y = 1.0 - 2.0 * y / height
+    inverse = np.linalg.inv(np.asarray(proj, np.float64) @ np.asarray(view, np.float64))
+    near = inverse @ np.array([ndc_x, ndc_y, -1.0, 1.0])
+    far = inverse @ np.array([ndc_x, ndc_y, 1.0, 1.0])
+    near = near[:3] / near[3]
+    far = far[:3] / far[3]
+    direction = far - near
+    return near, direction / np.linalg.norm(direction)
+
+
+def triangle_edges(triangles: np.ndarray) -> np.ndarray:
+    """Pack (T, 3, 3) triangles as a (3, 3, T) array of v0, edge1, edge2 rows."""
+    triangles = np.asarray(triangles, dtype=np.float64)
+    v0 = triangles[:, 0]
+    return np.ascontiguousarray(
+        np.stack([v0, triangles[:, 1] - v0, triangles[:, 2] - v0]).transpose(0, 2, 1)
+    )
+
+
+def intersect_triangles(
+    origin: np.ndarray, direction: np.ndarray, edges: np.ndarray
+) -> tuple[int, float]:
+    """Vectorized Möller–Trumbore over `triangle_edges` output.
+
+    Returns the nearest (triangle index, t), or (-1, inf) on a miss.
+    """
+    if not edges.shape[-1]:
+        return -1, np.inf
+    (v0x, v0y, v0z), (e1x, e1y, e1z), (e2x, e2y, e2z) = edges
+    dx, dy, dz = (float(c) for c in direction)
+    ox, oy, oz = (float(c) for c in origin)
+
+    # Cross products are spelled out so the ray terms stay scalars.
+    px = dy * e2z - dz * e2y
+    py = dz * e2x - dx * e2z
+    pz = dx * e2y - dy * e2x
+    det = e1x * px + e1y * py + e1z * pz
+    valid = np.abs(det) > _EPSILON
+    inv_det = np.divide(1.0, det, out=np.zeros_like(det), where=valid)
+
+    sx, sy, sz = ox - v0x, oy - v0y, oz - v0z
+    u = (sx * px + sy * py + sz * pz) * inv_det
+    qx = sy * e1z - sz * e1y
+    qy = sz * e1x - sx * e1z
+    qz = sx * e1y - sy * e1x
+    v = (dx * qx + dy * qy + dz * qz) * inv_det
+    t = (e2x * qx + e2y * qy + e2z * qz) * inv_det
+
+    hit = valid & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t > _EPSILON)
+    if not hit.any():
+        return -1, np.inf
+    t = np.where(hit, t, np.inf)
+    index = int(np.argmin(t))
+    return index, float(t[index])
+
+
+class Picker:
+    """Casts rays through a `BVH` and tests candidate meshes nearest-first."""
+
+    def __init__(self):
+        self.bvh = BVH()
+        # Packed triangle edges per shape, dropped whenever the BVH rebuilds.
+        self._edges: dict[int, np.ndarray] = {}
+
+    def _shape_edges(self, shape) -> np.ndarray:
+        edges = self._edges.get(id(shape))
+        if edges is None:
+            edges = triangle_edges(shape.triangles)
+            self._edges[id(shape)] = edges
+        return edges
+
+    def pick(
+        self, scene: CompiledScene, origin: np.ndarray, direction: np.ndarray
+    ) -> PickResult | None:
+        if self.bvh.is_stale(scene):
+            self._edges.clear()
+        self.bvh.update(scene)
+        slots, entry = self.bvh.intersect(origin, direction)
+
+        best: PickResult | None = None
+        best_t = np.inf
+        for slot, t_entry in zip(slots.tolist(), entry.tolist()):
+            if t_entry > best_t:
+                break
+            # Test in local space; with an unnormalized local direction the
+            # ray parameter t is the same in both spaces.
+            model = scene.world[scene.draw_index[slot]].astype(np.float64)
+            inverse = np.linalg.inv(model)
+            local_origin = inverse[:3, :3] @ origin + inverse[:3, 3]
+            local_direction = inverse[:3, :3] @ direction
+            triangle, t = intersect_triangles(
+                local_origin, local_direction, self._shape_edges(scene.shapes[slot])
+            )
+            if triangle >= 0 and t < best_t:
+                best_t = t
+                best = PickResult(
+                    node=scene.draw_nodes[slot],
+                    slot=slot,
+                    triangle=triangle,
+                    distance=t,
+                    point=origin + t * direction,
+                )
+        return best
+
+
+__all__ = [
+    "PickResult",
+    "Picker",
+    "intersect_triangles",
+    "screen_ray",
+    "triangle_edges",
+]
@@ -0,0 +1,285 @@
+"""Per-frame CPU and GPU scope profiler with Chrome trace export."""
+
+from __future__ import annotations
+
+import ctypes
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from OpenGL import GL
+
+# Frames whose GPU results may still be outstanding; past this new frames
+# are recorded without GPU timing rather than stalling on old queries.
+_MAX_PENDING = 6
+# Returned by `Profiler.scope` while not recording.
+_NULL_SCOPE = nullcontext()
+
+
+@dataclass(slots=True)
+class ProfileEvent:
+    """One scope: CPU times from ``perf_counter_ns``, GPU times on the GL clock."""
+
+    name: str
+    depth: int
+    start_ns: int
+    duration_ns: int = 0
+    gpu_start_ns: int | None = None
+    gpu_duration_ns: int | None = None
+    queries: tuple[int, int] | None = None
+
+
+@dataclass(slots=True)
+class ProfileFrame:
+    index: int
+    # perf_counter_ns minus GL_TIMESTAMP when the frame began, to place GPU
+    # events on the CPU timeline. Drivers without a readable GL clock (Mesa
+    # llvmpipe returns 0) get the GPU frame aligned to the CPU frame start.
+    gpu_offset_ns: int | None = None
+    events: list[ProfileEvent] = field(default_factory=list)
+
+    @property
+    def cpu_ms(self) -> float:
+        return self.events[0].duration_ns / 1.0e6 if self.events else 0.0
+
+    @property
+    def gpu_ms(self) -> float | None:
+        if not self.events or self.events[0].gpu_duration_ns is None:
+            return None
+        return self.events[0].gpu_duration_ns / 1.0e6
+
+
+class _Scope:
+    __slots__ = ("profiler", "name", "gpu")
+
+    def __init__(self, profiler: Profiler, name: str, gpu: bool):
+        self.profiler = profiler
+        self.name = name
+        self.gpu = gpu
+
+    def __enter__(self):
+        self.profiler.begin(self.name, self.gpu)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.end()
+        return False
+
+
+class Profiler:
+    """Nested timing scopes recorded for the last ``history`` frames.
+
+    `begin_frame`/`end_frame` bracket a frame and `scope` times a block in
+    it. GPU scopes write a ``GL_TIMESTAMP`` query at each end; the results
+    are collected a few frames later without waiting. While disabled,
+    `scope` returns a shared no-op context manager and the frame calls
+    return immediately.
+    """
+
+    def __init__(self, history: int = 240):
+        self.enabled = False
+        self.history: deque[ProfileFrame] = deque(maxlen=max(int(history), 1))
+        self._pending: deque[ProfileFrame] = deque()
+        self._frame: ProfileFrame | None = None
+        self._stack: list[ProfileEvent] = []
+        self._gpu = True
+        self._free: list[int] = []
+        self._frame_index = 0
+        self._result = ctypes.c_uint64()
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = bool(enabled)
+        if not self.enabled and self._frame is not None:
+            self._free.extend(self._frame_queries(self._frame))
+            self._frame = None
+            self._stack.clear()
+
+    def scope(self, name: str, gpu: bool = False):
+        """Context manager timing a block; ``gpu`` adds timestamp queries."""
+        if self._frame is None:
+            return _NULL_SCOPE
+        return _Scope(self, name, gpu)
+
+    def begin_frame(self) -> None:
+        if not self.enabled:
+            return
+        self._collect()
+        self._stack.clear()
+        self._gpu = len(self._pending) < _MAX_PENDING
+        frame = ProfileFrame(self._frame_index)
+        self._frame_index += 1
+        if self._gpu:
+            gpu_now = int(GL.glGetInteger64v(GL.GL_TIMESTAMP))
+            if gpu_now > 0:
+                frame.gpu_offset_ns = time.perf_counter_ns() - gpu_now
+        self._frame = frame
+        self.begin("frame", gpu=True)
+
+    def end_frame(self) -> None:
+        if self._frame is None:
+            return
+        while self._stack:
+            self.end()
+        if self._gpu:
+            self._pending.append(self._frame)
+        else:
+            self.history.append(self._frame)
+        self._frame = None
+
+    def begin(self, name: str, gpu: bool = False) -> None:
+        event = ProfileEvent(name, len(self._stack), time.perf_counter_ns())
+        if gpu and self._gpu:
+            event.queries = (self._query(), self._query())
+            GL.glQueryCounter(event.queries[0], GL.GL_TIMESTAMP)
+        self._frame.events.append(event)
+        self._stack.append(event)
+
+    def end(self) -> None:
+        event = self._stack.pop()
+        if event.queries is not None:
+            GL.glQueryCounter(event.queries[1], GL.GL_TIMESTAMP)
+        event.duration_ns = time.perf_counter_ns() - event.start_ns
+
+    def _query(self) -> int:
+        if not self._free:
+            queries = np.atleast_1d(GL.glGenQueries(16))
+            self._free.extend(int(query) for query in queries)
+        return self._free.pop()
+
+    def _read(self, query: int) -> int:
+        GL.glGetQueryObjectui64v(
+            query, GL.GL_QUERY_RESULT, ctypes.byref(self._result)
+        )
+        return self._result.value
+
+    def _collect(self) -> None:
+        """Move frames whose queries have all finished into `history`."""
+        while self._pending:
+            frame = self._pending[0]
+            # Queries complete in order, so the frame's last one decides.
+            last = frame.events[0].queries[1]
+            if not GL.glGetQueryObjectuiv(last, GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+            self._pending.popleft()
+            for event in frame.events:
+                if event.queries is None:
+                    continue
+                start, end = (self._read(query) for query in event.queries)
+                event.gpu_start_ns = start
+                event.gpu_duration_ns = max(end - start, 0)
+                self._free.extend(event.queries)
+                event.queries = None
+            if frame.gpu_offset_ns is None:
+                first = frame.events[0]
+                frame.gpu_offset_ns = first.start_ns - first.gpu_start_ns
+            self.history.append(frame)
+
+    def frame_times(self, gpu: bool = False) -> np.ndarray:
+        """Milliseconds per recorded frame, oldest first (NaN if unknown)."""
+        if gpu:
+            values = [frame.gpu_ms for frame in self.history]
+            values = [np.nan if value is None else value for value in values]
+        else:
+            values = [frame.cpu_ms for frame in self.history]
+        return np.asarray(values, dtype=np.float32)
+
+    def summary(self, max_depth: int = 1) -> dict[str, tuple[float, float | None]]:
+        """Mean CPU and GPU milliseconds per scope name across `history`."""
+        cpu: dict[str, list[int]] = {}
+        gpu: dict[str, list[int]] = {}
+        for frame in self.history:
+            for event in frame.events:
+                if event.depth > max_depth:
+                    continue
+                cpu.setdefault(event.name, []).append(event.duration_ns)
+                if event.gpu_duration_ns is not None:
+                    gpu.setdefault(event.name, []).append(event.gpu_duration_ns)
+        return {
+            name: (
+                float(np.mean(values)) / 1.0e6,
+                float(np.mean(gpu[name])) / 1.0e6 if name in gpu else None,
+            )
+            for name, values in cpu.items()
+        }
+
+    def chrome_trace(self, frames: int | None = None) -> dict:
+        """The last ``frames`` frames as a Chrome ``about:tracing`` document."""
+        recorded = list(self.history)
+        if frames is not None:
+            recorded = recorded[-frames:]
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 0,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in ((0, "CPU"), (1, "GPU"))
+        ]
+        for frame in recorded:
+            for event in frame.events:
+                args = {"frame": frame.index}
+                events.append(
+                    {
+                        "name": event.name,
+                        "ph": "X",
+                        "pid": 0,
+                        "tid": 0,
+                        "ts": event.start_ns / 1000.0,
+                        "dur": event.duration_ns / 1000.0,
+                        "args": args,
+                    }
+                )
+                if event.gpu_duration_ns is not None:
+                    events.append(
+                        {
+                            "name": event.name,
+                            "ph": "X",
+                            "pid": 0,
+                            "tid": 1,
+                            "ts": (event.gpu_start_ns + frame.gpu_offset_ns)
+                            / 1000.0,
+                            "dur": event.gpu_duration_ns / 1000.0,
+                            "args": args,
+                        }
+                    )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(
+        self, path: str | Path, frames: int | None = None
+    ) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as handle:
+            json.dump(self.chrome_trace(frames), handle)
+        return path
+
+    @staticmethod
+    def _frame_queries(frame: ProfileFrame) -> list[int]:
+        return [
+            query
+            for event in frame.events
+            if event.queries is not None
+            for query in event.queries
+        ]
+
+    def cleanup(self) -> None:
+        queries = list(self._free)
+        for frame in self._pending:
+            queries.extend(self._frame_queries(frame))
+        if self._frame is not None:
+            queries.extend(self._frame_queries(self._frame))
+        if queries:
+            GL.glDeleteQueries(len(queries), queries)
+        self._free = []
+        self._pending.clear()
+        self._frame = None
+        self._stack.clear()
+
+
+__all__ = ["Profiler", "ProfileEvent", "ProfileFrame"]
@@ -0,0 +1,116 @@
+"""Asynchronous framebuffer readback through a ring of pixel pack buffers."""
+
+from __future__ import annotations
+
+import ctypes
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+from OpenGL import GL
+
+
+@dataclass(slots=True)
+class _Transfer:
+    buffer: int
+    fence: object
+    width: int
+    height: int
+    tag: object
+
+
+class PixelReadback:
+    """Reads the bound read framebuffer into PBOs and maps them frames later.
+
+    `queue` only records a ``glReadPixels`` into the next free buffer of the
+    ring plus a fence, so the copy runs on the GPU while the CPU moves on.
+    `poll` maps the transfers whose fence has signalled, in queue order,
+    and returns them as top-down images: rows are copied out once and
+    flipped through a negative-stride view. With ``size`` buffers a capture
+    queued in frame N is normally collected around frame N + size - 1;
+    when every buffer is still in flight, `queue` waits for the oldest.
+    """
+
+    def __init__(self, size: int = 3):
+        self.size = max(int(size), 1)
+        self._free: list[int] = []
+        self._capacity: dict[int, int] = {}
+        self._pending: deque[_Transfer] = deque()
+        self._ready: list[tuple[object, np.ndarray]] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _buffer(self, nbytes: int) -> int:
+        if not self._free:
+            buffers = np.atleast_1d(GL.glGenBuffers(self.size))
+            self._free.extend(int(buffer) for buffer in buffers)
+        buffer = self._free.pop()
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, buffer)
+        if self._capacity.get(buffer, 0) < nbytes:
+            GL.glBufferData(GL.GL_PIXEL_PACK_BUFFER, nbytes, None, GL.GL_STREAM_READ)
+            self._capacity[buffer] = nbytes
+        return buffer
+
+    def queue(
+        self, width: int, height: int, tag: object = None, x: int = 0, y: int = 0
+    ) -> None:
+        """Start reading a ``width`` x ``height`` RGB region; ``tag`` is returned."""
+        if len(self._pending) >= self.size:
+            self._ready.extend(self._finish(self._pending.popleft(), wait=True))
+        nbytes = width * height * 3
+        buffer = self._buffer(nbytes)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        GL.glReadPixels(
+            x, y, width, height, GL.GL_RGB, GL.GL_UNSIGNED_BYTE, ctypes.c_void_p(0)
+        )
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        fence = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self._pending.append(_Transfer(buffer, fence, width, height, tag))
+
+    def _finish(self, transfer: _Transfer, wait: bool) -> list:
+        timeout = GL.GL_TIMEOUT_IGNORED if wait else 0
+        status = GL.glClientWaitSync(
+            transfer.fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, timeout
+        )
+        if status not in (GL.GL_ALREADY_SIGNALED, GL.GL_CONDITION_SATISFIED):
+            return []
+        GL.glDeleteSync(transfer.fence)
+
+        image = np.empty((transfer.height, transfer.width, 3), dtype=np.uint8)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, transfer.buffer)
+        pointer = GL.glMapBufferRange(
+            GL.GL_PIXEL_PACK_BUFFER, 0, image.nbytes, GL.GL_MAP_READ_BIT
+        )
+        ctypes.memmove(image.ctypes.data, pointer, image.nbytes)
+        GL.glUnmapBuffer(GL.GL_PIXEL_PACK_BUFFER)
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, 0)
+        self._free.append(transfer.buffer)
+        # GL rows run bottom-up.
+        return [(transfer.tag, image[::-1])]
+
+    def poll(self, wait: bool = False) -> list[tuple[object, np.ndarray]]:
+        """(tag, image) of every finished transfer; ``wait`` drains all of them."""
+        ready, self._ready = self._ready, []
+        while self._pending:
+            finished = self._finish(self._pending[0], wait)
+            if not finished:
+                break
+            self._pending.popleft()
+            ready.extend(finished)
+        return ready
+
+    def cleanup(self) -> None:
+        for transfer in self._pending:
+            GL.glDeleteSync(transfer.fence)
+            self._free.append(transfer.buffer)
+        if self._free:
+            GL.glDeleteBuffers(len(self._free), self._free)
+        self._free = []
+        self._capacity.clear()
+        self._pending.clear()
+        self._ready.clear()
+
+
+__all__ = ["PixelReadback"]
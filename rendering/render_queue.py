@@ -0,0 +1,227 @@
+"""State-sorted render queue built from a compiled scene."""
+
+from __future__ import annotations
+
+import numpy as np
+from OpenGL import GL
+
+from shape.base import Shape
+from rendering.compiled_scene import CompiledScene
+from rendering.stats import FrameStats
+
+# 64-bit sort key layout, most significant first:
+#   program (12 bits) | texture (12 bits) | VAO (16 bits) | depth (24 bits)
+_PROGRAM_SHIFT = np.uint64(52)
+_TEXTURE_SHIFT = np.uint64(40)
+_VAO_SHIFT = np.uint64(24)
+_DEPTH_LEVELS = (1 << 24) - 1
+
+
+def _uses_custom_draw(shape: Shape) -> bool:
+    """Shapes that override draw/transform must go through their own path."""
+    cls = type(shape)
+    return cls.draw is not Shape.draw or cls.transform is not Shape.transform
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Map arbitrary GL names to dense ranks so they fit in the key fields."""
+    if values.size == 0:
+        return values.astype(np.uint64)
+    return np.unique(values, return_inverse=True)[1].astype(np.uint64)
+
+
+def _changes(values: np.ndarray) -> int:
+    if values.size == 0:
+        return 0
+    return int(np.count_nonzero(values[1:] != values[:-1])) + 1
+
+
+class RenderQueue:
+    """Sorts one frame's draws by (program, texture, VAO, front-to-back depth).
+
+    Items are one per shape part. The static part of every item (its draw
+    slot, VAO and draw range) is gathered once per compiled-scene rebuild;
+    programs, textures and depth are refreshed every frame before sorting.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._scene: CompiledScene | None = None
+
+        self.item_slot = np.empty(0, dtype=np.int32)
+        self.item_vao = np.empty(0, dtype=np.int64)
+        self.item_parts: list = []
+        self.slot_custom = np.empty(0, dtype=bool)
+
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.order = np.empty(0, dtype=np.int64)
+        self._unsorted_changes = 0
+        self._slot_program = np.empty(0, dtype=np.int64)
+        self._slot_texture = np.empty(0, dtype=np.int64)
+
+    def _gather_items(self, scene: CompiledScene) -> None:
+        slots: list[int] = []
+        vaos: list[int] = []
+        parts: list = []
+        custom: list[bool] = []
+        for slot, shape in enumerate(scene.shapes):
+            is_custom = _uses_custom_draw(shape)
+            custom.append(is_custom)
+            if is_custom or not shape.shapes:
+                # One item for the whole shape; it draws itself.
+                slots.append(slot)
+                vaos.append(int(shape.shapes[0].vao.vao) if shape.shapes else 0)
+                parts.append(None)
+                continue
+            for part in shape.shapes:
+                slots.append(slot)
+                vaos.append(int(part.vao.vao))
+                parts.append(part)
+
+        self.item_slot = np.asarray(slots, dtype=np.int32)
+        self.item_vao = np.asarray(vaos, dtype=np.int64)
+        self.item_parts = parts
+        self.slot_custom = np.asarray(custom, dtype=bool)
+        self._scene = scene
+        self._version = scene.version
+
+    def build(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        visible: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Compute sort keys and the submission order for this frame."""
+        if scene is not self._scene or scene.version != self._version:
+            self._gather_items(scene)
+
+        shapes = scene.shapes
+        self._slot_program = np.fromiter(
+            (shape._get_active_program().program for shape in shapes),
+            dtype=np.int64,
+            count=len(shapes),
+        )
+        self._slot_texture = np.fromiter(
+            (
+                shape.texture.tex if shape.texture and shape.texture_enabled else 0
+                for shape in shapes
+            ),
+            dtype=np.int64,
+            count=len(shapes),
+        )
+
+        # Front-to-back distance of every drawable's origin in view space.
+        origins = scene.world[scene.draw_index][:, :3, 3]
+        distance = -(origins @ view[2, :3] + view[2, 3])
+        if distance.size:
+            distance = np.clip(distance, 0.0, None)
+            far = float(distance.max()) or 1.0
+            depth = (distance / far * _DEPTH_LEVELS).astype(np.uint64)
+        else:
+            depth = distance.astype(np.uint64)
+
+        items = np.arange(self.item_slot.size)
+        if visible is not None:
+            items = items[visible[self.item_slot]]
+        slots = self.item_slot[items]
+
+        program = self._slot_program[slots]
+        texture = self._slot_texture[slots]
+        vao = self.item_vao[items]
+        self.keys = (
+            (_ranks(program) << _PROGRAM_SHIFT)
+            | (_ranks(texture) << _TEXTURE_SHIFT)
+            | (_ranks(vao) << _VAO_SHIFT)
+            | depth[slots]
+        )
+        self.order = items[np.argsort(self.keys, kind="stable")]
+        self._unsorted_changes = _changes(program) + _changes(texture) + _changes(vao)
+        return self.order
+
+    def execute(
+        self,
+        scene: CompiledScene,
+        view: np.ndarray,
+        proj: np.ndarray,
+        stats: FrameStats | None = None,
+    ) -> None:
+        """Submit the sorted draws, rebinding state only when it changes."""
+        stats = stats if stats is not None else FrameStats()
+        shapes = scene.shapes
+        world = scene.world
+        draw_index = scene.draw_index
+        item_slot = self.item_slot
+        item_parts = self.item_parts
+        slot_custom = self.slot_custom
+        slot_program = self._slot_program
+        slot_texture = self._slot_texture
+
+        current_program = None
+        current_vao = None
+        current_texture = None
+        current_slot = None
+        uploaded = set()
+
+        for item in self.order:
+            slot = item_slot[item]
+            shape = shapes[slot]
+            model = world[draw_index[slot]]
+
+            if slot_custom[slot]:
+                shape.transform(proj, view, model)
+                shape.draw()
+                stats.draw_calls += len(shape.shapes)
+                current_program = current_vao = current_texture = None
+                current_slot = None
+                continue
+
+            mode = shape.shading_mode
+            program = slot_program[slot]
+            if program != current_program:
+                GL.glUseProgram(program)
+                current_program = program
+                current_slot = None
+                stats.program_binds += 1
+                if program not in uploaded:
+                    GL.glUniformMatrix4fv(shape.project_locs[mode], 1, GL.GL_TRUE, proj)
+                    GL.glUniformMatrix4fv(shape.camera_locs[mode], 1, GL.GL_TRUE, view)
+                    uploaded.add(program)
+
+            if slot != current_slot:
+                GL.glUniformMatrix4fv(
+                    shape.transform_locs[mode], 1, GL.GL_TRUE, model
+                )
+                GL.glUniform1i(
+                    shape.use_texture_locs[mode], 1 if shape.texture_enabled else 0
+                )
+                current_slot = slot
+
+            texture = slot_texture[slot]
+            if texture != current_texture:
+                GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+                current_texture = texture
+                stats.texture_binds += 1
+
+            part = item_parts[item]
+            if part.vao.vao != current_vao:
+                GL.glBindVertexArray(part.vao.vao)
+                current_vao = part.vao.vao
+                stats.vao_binds += 1
+
+            if part.vao.ebo is not None:
+                GL.glDrawElements(
+                    part.draw_mode, part.index_num, GL.GL_UNSIGNED_INT, None
+                )
+            else:
+                GL.glDrawArrays(part.draw_mode, 0, part.vertex_num)
+            stats.draw_calls += 1
+
+        GL.glBindVertexArray(0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glUseProgram(0)
+
+        stats.unsorted_state_changes += self._unsorted_changes
+        stats.draw_order = item_slot[self.order]
+
+
+__all__ = ["RenderQueue"]
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+import numpy as np
 from OpenGL import GL
 
 from config import ShadingModel
 from graphics.scene import Node, LightNode, GeometryNode, TransformNode
+from graphics.shader import ShaderProgram
+from rendering.animation_system import AnimationSystem
 from rendering.camera import Camera, CameraMovement, Trackball
+from rendering.command_list import CommandList
+from rendering.compiled_scene import CompiledScene, is_animated
+from rendering.culling import FrustumCuller
+from rendering.deferred import DeferredRenderer
+from rendering.lighting import ClusteredLighting
+from rendering.occlusion import OcclusionCuller
+from rendering.picking import Picker, PickResult, screen_ray
+from rendering.profiler import Profiler
+from rendering.render_queue import RenderQueue
+from rendering.resolution import DynamicResolution
+from rendering.simulation import SimulationLoop
+from rendering.stats import FrameStats
 from rendering.world import Transform
 
 
@@ -16,6 +31,11 @@ class Renderer:
 
         self.app = None
         self.root = None
+        # Size of the current render target, see `dynamic_resolution`.
+        self.viewport = (config.width, config.height)
+        # Camera matrices of the last rendered frame.
+        self.view_matrix = None
+        self.projection_matrix = None
 
         # GL state (simple defaults)
         GL.glViewport(0, 0, self.config.width, self.config.height)
@@ -36,9 +56,84 @@ class Renderer:
         self.light_nodes = []
         self.transform_nodes = []
 
+        self.use_compiled_scene = config.compiled_scene
+        self.compiled_scene = CompiledScene()
+
+        self.use_render_queue = config.render_queue
+        self.render_queue = RenderQueue()
+        self.use_command_list = config.command_list
+        self.command_list = CommandList()
+        self.stats = FrameStats()
+
+        self.use_frustum_culling = config.frustum_culling
+        self.culler = FrustumCuller()
+        self.picker = Picker()
+
+        self.use_animation_system = config.animation_system
+        self.animation = AnimationSystem()
+
+        self.simulation: SimulationLoop | None = None
+        if config.fixed_timestep > 0.0:
+            self.simulation = SimulationLoop(
+                config.fixed_timestep,
+                threaded=config.simulation_thread,
+                step_fn=self._step_animation_system,
+            )
+
+        self.use_occlusion_culling = config.occlusion_culling
+        self.occlusion = OcclusionCuller(
+            self.picker.bvh if config.occlusion_use_bvh else None
+        )
+
+        self.use_clustered_lighting = config.clustered_lighting
+        self.lighting = ClusteredLighting(config.cluster_grid)
+
+        self.use_deferred_shading = config.deferred_shading
+        self.deferred = DeferredRenderer()
+
+        self.dynamic_resolution: DynamicResolution | None = None
+        if config.dynamic_resolution:
+            self.dynamic_resolution = DynamicResolution(
+                config.target_frame_time, config.resolution_scale_bounds
+            )
+
+        self.profiler = Profiler(config.profiler_history)
+        self.profiler.set_enabled(config.profiler)
+
+    @property
+    def uses_compiled_scene(self) -> bool:
+        # The render queue and culling work on the flattened arrays.
+        return (
+            self.use_compiled_scene
+            or self.use_render_queue
+            or self.use_command_list
+            or self.use_frustum_culling
+            or self.use_occlusion_culling
+            or self.use_clustered_lighting
+            or self.use_deferred_shading
+            or self.simulation is not None
+        )
+
+    @property
+    def animating(self) -> bool:
+        """Whether the last rendered scene has transforms that move on their own."""
+        if self.root is None:
+            return False
+        if self.uses_compiled_scene:
+            return bool(self.compiled_scene.dynamic)
+        return any(is_animated(node.transform) for node in self.transform_nodes)
+
     def set_scene(self, scene):
         self.root = scene
 
+    def _sync_compiled_scene(self) -> bool:
+        if not self.compiled_scene.sync(self.root):
+            return False
+        self.shape_nodes[:] = self.compiled_scene.shape_nodes
+        self.light_nodes[:] = self.compiled_scene.light_nodes
+        self.transform_nodes[:] = self.compiled_scene.transform_nodes
+        return True
+
     def _collect_node(self, node):
         if isinstance(node, LightNode):
             self.light_nodes.append(node)
@@ -76,18 +171,80 @@ class Renderer:
         for node in self.shape_nodes:
             if hasattr(node.shape, "set_shading_mode"):
                 node.shape.set_shading_mode(self.shading_model)
+            if hasattr(node.shape, "set_clustered_lighting"):
+                node.shape.set_clustered_lighting(self.use_clustered_lighting)
 
-    def _apply_animation(self, dt):
-        for node in self.transform_nodes:
-            node.transform.update_matrix(dt)
+    def _apply_clustered_lighting(self, view_matrix, projection_matrix):
+        self.lighting.update(
+            self.compiled_scene, view_matrix, projection_matrix, self.viewport
+        )
+        self.stats.lights = self.lighting.light_count
+        self.stats.light_assignments = len(self.lighting.light_list)
+        self.stats.max_cluster_lights = self.lighting.max_per_cluster
+
+    def _render_deferred(self, view_matrix, projection_matrix, visible):
+        """Draw deferrable slots through the G-buffer; returns the forward ones."""
+        if self.light_nodes:
+            light = self.light_nodes[0].shape
+            color, position = light.get_color(), light.get_position()
+        else:
+            color, position = (1.0, 1.0, 1.0), (0.0, 0.0, 0.0)
+        return self.deferred.render(
+            self.compiled_scene,
+            view_matrix,
+            projection_matrix,
+            visible,
+            self.shading_model,
+            color,
+            position,
+            self.viewport,
+            self.stats,
+        )
 
-    def render(self, delta_time):
-        if not self.app:
-            raise ValueError("Must attach to an Application")
+    def _step_animation_system(self, dt):
+        if self.use_animation_system:
+            self.animation.step(dt)
+
+    def _bind_simulation(self):
+        simulation = self.simulation
+        if simulation.is_stale(self.compiled_scene):
+            with simulation.paused():
+                if self.use_animation_system:
+                    # Transforms are read back per tick, so no direct writes.
+                    self.animation.sync(self.root)
+            simulation.bind(self.compiled_scene)
+
+    def _apply_simulation(self, dt):
+        self._bind_simulation()
+        self.simulation.advance(dt)
+        self.simulation.apply(self.compiled_scene.local)
+
+    def step_simulation(self, count: int = 1) -> None:
+        """Run ``count`` simulation ticks of the current scene now.
+
+        For non-threaded simulations driven explicitly: render the frame
+        after with a zero ``delta_time`` so no further ticks accumulate.
+        """
+        if self.simulation is None or self.root is None:
+            return
+        self._sync_compiled_scene()
+        self._bind_simulation()
+        self.simulation.step(count)
 
-        if self.root is None:
+    def _apply_animation(self, dt):
+        if self.use_animation_system:
+            self.animation.sync(
+                self.root, self.compiled_scene if self.uses_compiled_scene else None
+            )
+            self.animation.step(dt)
+        if self.uses_compiled_scene:
+            for _, node in self.compiled_scene.refreshed:
+                node.transform.update_matrix(dt)
             return
+        for node in self.transform_nodes:
+            node.transform.update_matrix(dt)
 
+    def _camera_matrices(self):
         aspect_ratio = (
             float(self.app.get_aspect_ratio())
             if self.app and hasattr(self.app, "get_aspect_ratio")
@@ -105,19 +262,181 @@ class Renderer:
             if not self.use_trackball
             else self.trackball.get_view_matrix()
         )
+        return view_matrix, projection_matrix
+
+    def render(self, delta_time, tag_instances: bool = False):
+        """Draw one frame; ``tag_instances`` also writes the capture targets."""
+        if not self.app:
+            raise ValueError("Must attach to an Application")
+
+        if self.root is None:
+            return
 
-        if self.app:
-            width, height = self.app.winsize
-            GL.glViewport(0, 0, int(width), int(height))
+        view_matrix, projection_matrix = self._camera_matrices()
+        self.view_matrix, self.projection_matrix = view_matrix, projection_matrix
 
-        self.shape_nodes.clear()
-        self.light_nodes.clear()
-        self.transform_nodes.clear()
-        self._collect_node(self.root)
-        self._apply_shading()
-        self._apply_animation(delta_time)
-        self._apply_lighting()
-        self.root.draw(None, view_matrix, projection_matrix)
+        width, height = self.app.winsize
+        self.viewport = (int(width), int(height))
+        self.stats.reset()
+        self.profiler.begin_frame()
+
+        if self.dynamic_resolution is None or tag_instances:
+            GL.glViewport(0, 0, *self.viewport)
+            self._render_frame(
+                delta_time, view_matrix, projection_matrix, tag_instances
+            )
+        else:
+            self.viewport = self.dynamic_resolution.begin(*self.viewport)
+            self._render_frame(delta_time, view_matrix, projection_matrix)
+            with self.profiler.scope("upscale", gpu=True):
+                self.dynamic_resolution.end()
+            self.stats.resolution_scale = self.dynamic_resolution.scale
+            self.stats.gpu_time_ms = self.dynamic_resolution.gpu_time_ms
+
+        self.profiler.end_frame()
+
+    def _render_frame(
+        self, delta_time, view_matrix, projection_matrix, tag_instances=False
+    ):
+        profiler = self.profiler
+        if self.uses_compiled_scene:
+            with profiler.scope("sync"):
+                self._sync_compiled_scene()
+            with profiler.scope("shading"):
+                self._apply_shading()
+            with profiler.scope("animation"):
+                if self.simulation is not None:
+                    self._apply_simulation(delta_time)
+                else:
+                    self._apply_animation(delta_time)
+            with profiler.scope("lighting", gpu=True):
+                self._apply_lighting()
+            with profiler.scope("evaluate"):
+                if self.simulation is not None:
+                    self.compiled_scene.evaluate()
+                else:
+                    self.compiled_scene.update()
+            if (
+                self.use_clustered_lighting
+                and self.shading_model is ShadingModel.PHONG
+            ):
+                with profiler.scope("clustered_lighting", gpu=True):
+                    self._apply_clustered_lighting(view_matrix, projection_matrix)
+            visible = None
+            if self.use_frustum_culling:
+                with profiler.scope("frustum_culling"):
+                    visible = self.culler.cull(
+                        self.compiled_scene, view_matrix, projection_matrix
+                    )
+                self.stats.culled = self.culler.culled
+            in_frustum = visible
+            if self.use_occlusion_culling:
+                with profiler.scope("occlusion_culling", gpu=True):
+                    visible = self.occlusion.filter(
+                        self.compiled_scene,
+                        visible,
+                        view_matrix,
+                        projection_matrix,
+                        self.viewport,
+                    )
+            if (
+                self.use_deferred_shading
+                and self.shading_model is not ShadingModel.NORMAL
+                and not tag_instances
+            ):
+                with profiler.scope("deferred", gpu=True):
+                    visible = self._render_deferred(
+                        view_matrix, projection_matrix, visible
+                    )
+            with profiler.scope("draw", gpu=True):
+                if tag_instances:
+                    self._draw_tagged(view_matrix, projection_matrix, visible)
+                elif self.use_command_list:
+                    self._replay_command_list(view_matrix, projection_matrix, visible)
+                elif self.use_render_queue:
+                    self.render_queue.build(self.compiled_scene, view_matrix, visible)
+                    self.render_queue.execute(
+                        self.compiled_scene, view_matrix, projection_matrix, self.stats
+                    )
+                else:
+                    self.compiled_scene.draw(
+                        view_matrix,
+                        projection_matrix,
+                        visible,
+                        profiler if profiler.enabled else None,
+                    )
+            if self.use_occlusion_culling:
+                with profiler.scope("occlusion_queries", gpu=True):
+                    self.occlusion.issue(
+                        self.compiled_scene, view_matrix, projection_matrix, in_frustum
+                    )
+                self.stats.occluded = self.occlusion.occluded_slots
+                self.stats.draws_saved = self.occlusion.draws_saved
+                self.stats.fragments_saved = self.occlusion.fragments_saved
+                self.stats.occlusion_queries = self.occlusion.queries_issued
+            return
+
+        with profiler.scope("collect"):
+            self.shape_nodes.clear()
+            self.light_nodes.clear()
+            self.transform_nodes.clear()
+            self._collect_node(self.root)
+        with profiler.scope("shading"):
+            self._apply_shading()
+        with profiler.scope("animation"):
+            self._apply_animation(delta_time)
+        with profiler.scope("lighting", gpu=True):
+            self._apply_lighting()
+        with profiler.scope("draw", gpu=True):
+            if tag_instances:
+                # Compiled for the slot numbering of the instance IDs.
+                self.compiled_scene.compile(self.root)
+                self.compiled_scene.update()
+                self._draw_tagged(view_matrix, projection_matrix)
+            elif profiler.enabled:
+                self._draw_profiled(self.root, None, view_matrix, projection_matrix)
+            else:
+                self.root.draw(None, view_matrix, projection_matrix)
+
+    def _draw_tagged(self, view_matrix, projection_matrix, visible=None):
+        """Draw every visible slot with ``instance_id`` = slot + 1 (0 for lights)."""
+        scene = self.compiled_scene
+        world = scene.world
+        for slot, (index, node) in enumerate(zip(scene.draw_index, scene.draw_nodes)):
+            if visible is not None and not visible[slot]:
+                continue
+            shape = node.shape
+            location = shape.instance_id_locs.get(shape.shading_mode, -1)
+            if location != -1:
+                instance = 0 if isinstance(node, LightNode) else slot + 1
+                shape._get_active_program().activate()
+                GL.glUniform1ui(location, instance)
+            shape.transform(projection_matrix, view_matrix, world[index])
+            shape.draw()
+
+    def _replay_command_list(self, view_matrix, projection_matrix, visible):
+        scene = self.compiled_scene
+        if self.command_list.is_stale(scene):
+            with self.profiler.scope("record_commands"):
+                # Recorded for every slot so culling only filters the replay.
+                self.render_queue.build(scene, view_matrix)
+                self.command_list.record(scene, self.render_queue)
+        self.command_list.replay(
+            scene, view_matrix, projection_matrix, visible, self.stats
+        )
+
+    def _draw_profiled(self, node, parent_matrix, view_matrix, projection_matrix):
+        """`Node.draw` with a profiler scope around every drawable node."""
+        if parent_matrix is None:
+            parent_matrix = np.identity(4)
+        if isinstance(node, (GeometryNode, LightNode)):
+            with self.profiler.scope(node.name):
+                node.draw(parent_matrix, view_matrix, projection_matrix)
+            return
+        if isinstance(node, TransformNode):
+            parent_matrix = np.dot(parent_matrix, node.transform.get_matrix())
+        for child in node.children:
+            self._draw_profiled(child, parent_matrix, view_matrix, projection_matrix)
 
     def move_camera(self, movement: CameraMovement, step_scale: float = 1.0) -> None:
         self.camera.move(movement, step_scale)
@@ -151,9 +470,84 @@ class Renderer:
             if hasattr(node.shape, "set_texture_enabled"):
                 node.shape.set_texture_enabled(self.use_texture)
 
+    def pick(self, x: float, y: float) -> PickResult | None:
+        """Nearest node under window pixel (x, y), measured from the top-left."""
+        if self.root is None or not self.app:
+            return None
+        # Compiled rendering leaves world matrices current after each frame;
+        # otherwise bring the side copy up to date with the live transforms.
+        if not self.uses_compiled_scene or self._sync_compiled_scene():
+            self.compiled_scene.sync(self.root)
+            self.compiled_scene.update()
+
+        view_matrix, projection_matrix = self._camera_matrices()
+        width, height = self.app.winsize
+        origin, direction = screen_ray(
+            x, y, width, height, view_matrix, projection_matrix
+        )
+        return self.picker.pick(self.compiled_scene, origin, direction)
+
     def set_shading_model(self, shading: ShadingModel) -> None:
         self.shading_model = shading
 
+    def set_compiled_scene(self, enabled: bool) -> None:
+        self.use_compiled_scene = enabled
+        self.compiled_scene.invalidate()
+
+    def set_render_queue(self, enabled: bool) -> None:
+        self.use_render_queue = enabled
+        self.compiled_scene.invalidate()
+
+    def set_command_list(self, enabled: bool) -> None:
+        self.use_command_list = enabled
+        self.command_list.invalidate()
+        self.compiled_scene.invalidate()
+
+    def set_animation_system(self, enabled: bool) -> None:
+        if self.simulation is not None:
+            with self.simulation.paused():
+                self._set_animation_system(enabled)
+            self.compiled_scene.invalidate()
+        else:
+            self._set_animation_system(enabled)
+
+    def _set_animation_system(self, enabled: bool) -> None:
+        self.use_animation_system = enabled
+        if not enabled:
+            self.animation.clear()
+            self.animation.root = None
+
+    def set_frustum_culling(self, enabled: bool) -> None:
+        self.use_frustum_culling = enabled
+        self.compiled_scene.invalidate()
+
+    def set_occlusion_culling(self, enabled: bool, use_bvh: bool | None = None) -> None:
+        self.use_occlusion_culling = enabled
+        if use_bvh is not None and use_bvh != (self.occlusion.bvh is not None):
+            self.occlusion.cleanup()
+            self.occlusion = OcclusionCuller(self.picker.bvh if use_bvh else None)
+        self.compiled_scene.invalidate()
+
+    def set_clustered_lighting(self, enabled: bool) -> None:
+        self.use_clustered_lighting = enabled
+        self.compiled_scene.invalidate()
+
+    def set_deferred_shading(self, enabled: bool) -> None:
+        self.use_deferred_shading = enabled
+        self.compiled_scene.invalidate()
+
+    def set_profiling(self, enabled: bool) -> None:
+        self.profiler.set_enabled(enabled)
+
+    def set_dynamic_resolution(self, enabled: bool) -> None:
+        if enabled and self.dynamic_resolution is None:
+            self.dynamic_resolution = DynamicResolution(
+                self.config.target_frame_time, self.config.resolution_scale_bounds
+            )
+        elif not enabled and self.dynamic_resolution is not None:
+            self.dynamic_resolution.cleanup()
+            self.dynamic_resolution = None
+
     def set_face_culling(self, enabled: bool) -> None:
         if enabled and not self.cull_face_enabled:
             GL.glEnable(GL.GL_CULL_FACE)
@@ -172,7 +566,20 @@ class Renderer:
             self.shape_nodes.clear()
             self.light_nodes.clear()
             self.transform_nodes.clear()
+            self.compiled_scene.compile(None)
+            self.command_list.invalidate()
+            self.occlusion.cleanup()
+            self.lighting.cleanup()
+            self.deferred.cleanup()
+            if self.dynamic_resolution is not None:
+                self.dynamic_resolution.cleanup()
+            self.profiler.cleanup()
+            if self.simulation is not None:
+                self.simulation.stop()
+            self.animation.clear()
             self.root = None
+
+            ShaderProgram.release_shared()
         except Exception:
             pass  # Silently ignore cleanup errors
 
@@ -0,0 +1,206 @@
+"""Dynamic resolution scaling driven by measured GPU frame time."""
+
+from __future__ import annotations
+
+import ctypes
+from collections import deque
+
+import numpy as np
+from OpenGL import GL
+
+# Scales are snapped to this step so small corrections do not resize the
+# render target (and anything sized from the viewport) every frame.
+_SCALE_STEP = 1.0 / 32.0
+# Timer queries in flight; results are read a few frames late.
+_QUERY_RING = 4
+# Timer results above this are treated as bogus and ignored.
+_MAX_SAMPLE_MS = 10_000.0
+
+
+class ScaleController:
+    """PID controller turning frame time error into a resolution scale.
+
+    The error is relative, ``(target - measured) / target`` clamped to
+    [-1, 1], so the gains do not depend on the target. A positive output means there is headroom and
+    the scale grows; the integral is clamped to avoid wind-up while the
+    scale sits at one of its bounds.
+    """
+
+    def __init__(
+        self,
+        target_ms: float,
+        bounds: tuple[float, float] = (0.5, 1.0),
+        kp: float = 0.15,
+        ki: float = 0.02,
+        kd: float = 0.05,
+        windup: float = 2.0,
+    ):
+        low, high = sorted(float(bound) for bound in bounds)
+        if target_ms <= 0.0 or low <= 0.0:
+            raise ValueError("Target frame time and scale bounds must be positive")
+        self.target_ms = float(target_ms)
+        self.bounds = (low, high)
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.windup = windup
+        self.scale = high
+        self._integral = 0.0
+        self._previous: float | None = None
+
+    def update(self, frame_ms: float) -> float:
+        """Feed one measured frame time; returns the new scale."""
+        error = min(max((self.target_ms - frame_ms) / self.target_ms, -1.0), 1.0)
+        self._integral = float(
+            np.clip(self._integral + error, -self.windup, self.windup)
+        )
+        derivative = 0.0 if self._previous is None else error - self._previous
+        self._previous = error
+        adjust = self.kp * error + self.ki * self._integral + self.kd * derivative
+        self.scale = float(np.clip(self.scale + adjust, *self.bounds))
+        return self.scale
+
+    def reset(self) -> None:
+        self.scale = self.bounds[1]
+        self._integral = 0.0
+        self._previous = None
+
+
+class DynamicResolution:
+    """Offscreen color/depth target rendered at a fraction of the window size.
+
+    `begin` binds the target with its viewport already scaled and starts a
+    ``GL_TIME_ELAPSED`` query; `end` stops it and blits (linear filtering)
+    the result up to whatever framebuffer was bound before. Finished
+    queries are collected without waiting and drive a `ScaleController`.
+    The target is allocated at the largest scale, so scale changes only
+    change the viewport.
+    """
+
+    def __init__(self, target_ms: float, bounds: tuple[float, float] = (0.5, 1.0)):
+        self.controller = ScaleController(target_ms, bounds)
+        self.fbo = None
+        self.color = None
+        self.depth = None
+        self.capacity = (0, 0)
+        self.window = (0, 0)
+        self.viewport = (0, 0)
+        self.gpu_time_ms = 0.0
+
+        self._free: list[int] = []
+        self._pending: deque[int] = deque()
+        self._active: int | None = None
+        self._target = 0
+        self._elapsed = ctypes.c_uint64()
+
+    @property
+    def scale(self) -> float:
+        return self.viewport[0] / self.window[0] if self.window[0] else 1.0
+
+    def _allocate(self, width: int, height: int) -> None:
+        self._release_target()
+        self.capacity = (width, height)
+        self.fbo = GL.glGenFramebuffers(1)
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        self.color, self.depth = GL.glGenRenderbuffers(2)
+        for renderbuffer, internal_format, attachment in (
+            (self.color, GL.GL_RGBA8, GL.GL_COLOR_ATTACHMENT0),
+            (self.depth, GL.GL_DEPTH_COMPONENT24, GL.GL_DEPTH_ATTACHMENT),
+        ):
+            GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, renderbuffer)
+            GL.glRenderbufferStorage(GL.GL_RENDERBUFFER, internal_format, width, height)
+            GL.glFramebufferRenderbuffer(
+                GL.GL_FRAMEBUFFER, attachment, GL.GL_RENDERBUFFER, renderbuffer
+            )
+        GL.glBindRenderbuffer(GL.GL_RENDERBUFFER, 0)
+        status = GL.glCheckFramebufferStatus(GL.GL_FRAMEBUFFER)
+        if status != GL.GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Incomplete render target (status 0x{int(status):x})")
+
+    def _collect(self) -> None:
+        """Feed every finished timer query to the controller; never blocks."""
+        while self._pending:
+            query = self._pending[0]
+            if not GL.glGetQueryObjectuiv(query, GL.GL_QUERY_RESULT_AVAILABLE):
+                break
+            self._pending.popleft()
+            self._free.append(query)
+            GL.glGetQueryObjectui64v(
+                query, GL.GL_QUERY_RESULT, ctypes.byref(self._elapsed)
+            )
+            elapsed_ms = self._elapsed.value / 1.0e6
+            # Some drivers report garbage for the very first query.
+            if elapsed_ms < _MAX_SAMPLE_MS:
+                self.gpu_time_ms = elapsed_ms
+                self.controller.update(elapsed_ms)
+
+    def begin(self, width: int, height: int) -> tuple[int, int]:
+        """Bind the scaled target for a window of ``width`` x ``height``."""
+        self._collect()
+        self._target = int(GL.glGetIntegerv(GL.GL_DRAW_FRAMEBUFFER_BINDING))
+        width, height = max(int(width), 1), max(int(height), 1)
+        if (width, height) != self.window:
+            self.window = (width, height)
+            high = self.controller.bounds[1]
+            self._allocate(
+                max(int(round(width * high)), 1), max(int(round(height * high)), 1)
+            )
+
+        scale = round(self.controller.scale / _SCALE_STEP) * _SCALE_STEP
+        self.viewport = (
+            min(max(int(round(width * scale)), 1), self.capacity[0]),
+            min(max(int(round(height * scale)), 1), self.capacity[1]),
+        )
+
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self.fbo)
+        GL.glViewport(0, 0, *self.viewport)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+
+        if len(self._pending) < _QUERY_RING:
+            if not self._free:
+                self._free.append(int(np.atleast_1d(GL.glGenQueries(1))[0]))
+            self._active = self._free.pop()
+            GL.glBeginQuery(GL.GL_TIME_ELAPSED, self._active)
+        return self.viewport
+
+    def end(self) -> None:
+        """Stop timing and upscale the frame into the previous framebuffer."""
+        if self._active is not None:
+            GL.glEndQuery(GL.GL_TIME_ELAPSED)
+            self._pending.append(self._active)
+            self._active = None
+
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self.fbo)
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, self._target)
+        GL.glBlitFramebuffer(
+            0,
+            0,
+            *self.viewport,
+            0,
+            0,
+            *self.window,
+            GL.GL_COLOR_BUFFER_BIT,
+            GL.GL_LINEAR,
+        )
+        GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, self._target)
+        GL.glViewport(0, 0, *self.window)
+
+    def _release_target(self) -> None:
+        if self.fbo is not None:
+            GL.glDeleteFramebuffers(1, [self.fbo])
+            GL.glDeleteRenderbuffers(2, [self.color, self.depth])
+        self.fbo = self.color = self.depth = None
+        self.capacity = (0, 0)
+
+    def cleanup(self) -> None:
+        self._release_target()
+        queries = [*self._free, *self._pending]
+        if self._active is not None:
+            queries.append(self._active)
+        if queries:
+            GL.glDeleteQueries(len(queries), queries)
+        self._free = []
+        self._pending.clear()
+        self._active = None
+        self.window = (0, 0)
+
+
+__all__ = ["DynamicResolution", "ScaleController"]
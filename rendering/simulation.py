@@ -0,0 +1,179 @@
+"""Fixed-timestep simulation decoupled from rendering."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from graphics.scene import TransformNode
+from rendering.compiled_scene import CompiledScene
+
+StepFn = Callable[[float], None]
+
+
+class SimulationLoop:
+    """Advances animations at a fixed tick and hands matrices to the renderer.
+
+    Every tick updates each animated transform of the bound `CompiledScene`
+    (after the optional ``step_fn(tick)`` hook) and snapshots its local
+    matrix. The renderer never reads the transforms themselves: `apply`
+    writes a blend of the last two snapshots into ``scene.local``, so motion
+    stays smooth while rendering runs one tick behind the simulation.
+
+    With ``threaded=True`` ticks run on a daemon thread against the wall
+    clock. Otherwise nothing happens until `advance` (accumulates frame time)
+    or `step` (runs exact ticks) is called, which makes headless exports and
+    benchmarks deterministic. `bind` evaluates the transforms once with a
+    zero step, so the first frame shows their starting pose.
+    """
+
+    # Ticks run at most this many times per `advance` before time is dropped.
+    MAX_CATCH_UP = 8
+
+    def __init__(
+        self,
+        tick: float = 1.0 / 60.0,
+        threaded: bool = True,
+        step_fn: StepFn | None = None,
+    ):
+        if tick <= 0.0:
+            raise ValueError("Simulation tick must be positive")
+        self.tick = float(tick)
+        self.threaded = threaded
+        self.step_fn = step_fn
+        self.ticks = 0
+
+        self.scene: CompiledScene | None = None
+        self._version = None
+        self._targets: list[tuple[int, TransformNode]] = []
+        self._indices = np.empty(0, dtype=np.int64)
+
+        # previous/current are what `apply` blends; back is being written.
+        self._previous = np.empty((0, 4, 4), dtype=np.float32)
+        self._current = np.empty((0, 4, 4), dtype=np.float32)
+        self._back = np.empty((0, 4, 4), dtype=np.float32)
+        self._tick_time = 0.0
+        self._accumulator = 0.0
+
+        # `_step_lock` is held for a whole tick; `_buffer_lock` only while
+        # swapping or reading the snapshots, so `apply` never waits on a tick.
+        self._step_lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def bind(self, scene: CompiledScene) -> None:
+        """Track the animated transforms of ``scene`` (call after each rebuild)."""
+        with self._step_lock, self._buffer_lock:
+            self.scene = scene
+            self._version = scene.version
+            self._targets = list(scene.dynamic)
+            self._indices = np.asarray(
+                [index for index, _ in self._targets], dtype=np.int64
+            )
+            self._current = np.empty((len(self._targets), 4, 4), dtype=np.float32)
+            self._evaluate(0.0, self._current)
+            self._previous = self._current.copy()
+            self._back = np.empty_like(self._current)
+            self._tick_time = time.perf_counter()
+            self._accumulator = 0.0
+        if self.threaded:
+            self.start()
+
+    def is_stale(self, scene: CompiledScene) -> bool:
+        return scene is not self.scene or scene.version != self._version
+
+    def paused(self) -> threading.Lock:
+        """Context manager that keeps ticks from running, for edits to shared state."""
+        return self._step_lock
+
+    def _evaluate(self, dt: float, out: np.ndarray) -> None:
+        """Advance the targets by ``dt`` and write their local matrices to ``out``."""
+        if self.step_fn is not None:
+            self.step_fn(dt)
+        for slot, (_, node) in enumerate(self._targets):
+            node.transform.update_matrix(dt)
+            out[slot] = node.transform.get_matrix()
+
+    def _tick(self) -> None:
+        with self._step_lock:
+            back = self._back
+            self._evaluate(self.tick, back)
+            with self._buffer_lock:
+                self._previous, self._current, self._back = (
+                    self._current,
+                    back,
+                    self._previous,
+                )
+                self._tick_time = time.perf_counter()
+                self.ticks += 1
+
+    def step(self, count: int = 1) -> None:
+        """Run ``count`` ticks now; the next `apply` shows the latest one."""
+        for _ in range(count):
+            self._tick()
+        # Blending the latest tick with itself shows it whatever the alpha,
+        # and an empty accumulator keeps `advance(0.0)` from ticking again.
+        with self._buffer_lock:
+            self._previous[...] = self._current
+        self._accumulator = 0.0
+
+    def advance(self, delta_time: float) -> None:
+        """Feed frame time to a non-threaded loop and run the ticks it covers."""
+        if self.threaded:
+            return
+        self._accumulator += delta_time
+        ticks = 0
+        while self._accumulator >= self.tick and ticks < self.MAX_CATCH_UP:
+            self._tick()
+            self._accumulator -= self.tick
+            ticks += 1
+        if ticks == self.MAX_CATCH_UP:
+            self._accumulator = min(self._accumulator, self.tick)
+
+    def alpha(self) -> float:
+        """Blend factor between the previous and current snapshot."""
+        if self.threaded:
+            elapsed = time.perf_counter() - self._tick_time
+        else:
+            elapsed = self._accumulator
+        return min(max(elapsed / self.tick, 0.0), 1.0)
+
+    def apply(self, local: np.ndarray) -> None:
+        """Write interpolated matrices of the animated transforms into ``local``."""
+        with self._buffer_lock:
+            if not self._indices.size:
+                return
+            alpha = self.alpha()
+            previous, current = self._previous, self._current
+            local[self._indices] = previous + (current - previous) * alpha
+
+    def _run(self) -> None:
+        next_time = time.perf_counter()
+        while not self._stop.wait(max(0.0, next_time - time.perf_counter())):
+            self._tick()
+            next_time += self.tick
+            # Drop time we cannot catch up on instead of spiralling.
+            if time.perf_counter() - next_time > self.tick * self.MAX_CATCH_UP:
+                next_time = time.perf_counter()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="simulation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+__all__ = ["SimulationLoop", "StepFn"]
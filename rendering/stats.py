@@ -0,0 +1,66 @@
+"""Per-frame rendering statistics."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+
+@dataclass(slots=True)
+class FrameStats:
+    """Counters filled in by the renderer while drawing one frame."""
+
+    draw_calls: int = 0
+    program_binds: int = 0
+    vao_binds: int = 0
+    texture_binds: int = 0
+    # Draw slots rejected by frustum culling.
+    culled: int = 0
+    # Draw slots skipped by occlusion culling, the draw calls that saves and
+    # an estimate of the fragments (projected box area) not shaded.
+    occluded: int = 0
+    draws_saved: int = 0
+    fragments_saved: int = 0
+    occlusion_queries: int = 0
+    # Lights binned by clustered lighting, the (light, cluster) pairs that
+    # produced and the most lights any single cluster holds.
+    lights: int = 0
+    light_assignments: int = 0
+    max_cluster_lights: int = 0
+    # Render target scale chosen by dynamic resolution and the GPU time of
+    # the latest frame it measured, in milliseconds.
+    resolution_scale: float = 1.0
+    gpu_time_ms: float = 0.0
+    # Recorded draw commands rewritten because their shape's program or
+    # texture changed (see CommandList.patch).
+    patched_commands: int = 0
+    # Binds the same draws would have needed when submitted in tree order.
+    unsorted_state_changes: int = 0
+    # Draw-slot indices (see CompiledScene.draw_index) in submission order.
+    draw_order: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=np.int32)
+    )
+
+    @property
+    def state_changes(self) -> int:
+        return self.program_binds + self.vao_binds + self.texture_binds
+
+    def reset(self) -> None:
+        for item in fields(self):
+            if item.name == "draw_order":
+                self.draw_order = np.empty(0, dtype=np.int32)
+            else:
+                setattr(self, item.name, item.default)
+
+    def as_dict(self) -> dict:
+        result = {
+            item.name: getattr(self, item.name)
+            for item in fields(self)
+            if item.name != "draw_order"
+        }
+        result["state_changes"] = self.state_changes
+        return result
+
+
+__all__ = ["FrameStats"]
@@ -5,6 +5,9 @@ from utils.transform import *
 
 
 class Transform:
+    # Set while an AnimationSystem steps this transform's animation in bulk.
+    managed = False
+
     def __init__(self, animate=None):
         self.matrix = np.identity(4)
         self.animate = animate
@@ -13,7 +16,7 @@ class Transform:
         return self.matrix
 
     def update_matrix(self, dt):
-        if self.animate:
+        if self.animate and not self.managed:
             self.animate(self, dt)
 
 
@@ -29,7 +32,7 @@ class Composite(Transform):
         return result
 
     def update_matrix(self, dt):
-        if self.animate:
+        if self.animate and not self.managed:
             self.animate(self, dt)
         for transform in self.transforms:
             transform.update_matrix(dt)
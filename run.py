@@ -30,7 +30,13 @@ def build_engine_config() -> EngineConfig:
 def main() -> None:
     cfg = build_engine_config()
 
-    app = App(cfg.width, cfg.height, use_trackball=True)
+    app = App(
+        cfg.width,
+        cfg.height,
+        use_trackball=True,
+        render_on_demand=cfg.render_on_demand,
+        max_fps=cfg.max_fps,
+    )
     renderer = Renderer(cfg)
     overlay = SceneControlOverlay(app, renderer)
 
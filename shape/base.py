@@ -13,10 +13,12 @@ from config import (
     _BLINN_PHONG_FRAGMENT_PATH,
     _NORMAL_VERTEX_PATH,
     _NORMAL_FRAGMENT_PATH,
+    _CLUSTERED_FRAGMENT_PATH,
     ShadingModel,
 )
+from graphics.bounds import Bounds
 from graphics.buffer import VAO
-from graphics.shader import Shader, ShaderProgram
+from graphics.shader import ShaderProgram
 from graphics.texture import Texture2D
 
 
@@ -33,36 +35,61 @@ class Part:
         self.vertex_num = vertex_num
         self.index_num = index_num
 
+    def triangles(self) -> np.ndarray:
+        """Local-space triangles as a (T, 3, 3) array; empty for lines/points."""
+        positions = self.vao.positions
+        if positions is None:
+            return np.empty((0, 3, 3), dtype=np.float32)
+        if positions.shape[1] < 3:
+            positions = np.pad(positions, ((0, 0), (0, 3 - positions.shape[1])))
+        positions = positions[:, :3]
+
+        if self.vao.indices is not None:
+            order = self.vao.indices[: self.index_num].astype(np.int64)
+        else:
+            order = np.arange(self.vertex_num, dtype=np.int64)
+
+        count = len(order)
+        if self.draw_mode == GL.GL_TRIANGLES:
+            faces = order[: count - count % 3].reshape(-1, 3)
+        elif self.draw_mode == GL.GL_TRIANGLE_STRIP and count >= 3:
+            faces = np.stack([order[:-2], order[1:-1], order[2:]], axis=1)
+        elif self.draw_mode == GL.GL_TRIANGLE_FAN and count >= 3:
+            faces = np.stack(
+                [np.full(count - 2, order[0]), order[1:-1], order[2:]], axis=1
+            )
+        else:
+            return np.empty((0, 3, 3), dtype=np.float32)
+        return positions[faces]
+
 
 # fmt: on
 class Shape:
+    # Material used by `lighting`; override in a shape class to change it.
+    diffuse = (1.0, 1.0, 1.0)
+    specular = (0.2, 0.2, 0.2)
+    ambient = (0.0, 0.0, 0.0)
+    shininess = 32.0
+
     def __init__(self, vertex_file: str, fragment_file: str):
-        # Ignore passed parameters - we now create all 3 shader programs
-        # Create three separate shader programs for each shading technique
-
-        # Normal shading program
-        self.normal_program = ShaderProgram()
-        self.normal_program.add_shader(Shader(_NORMAL_VERTEX_PATH))
-        self.normal_program.add_shader(Shader(_NORMAL_FRAGMENT_PATH))
-        self.normal_program.build()
-
-        # Phong shading program
-        self.phong_program = ShaderProgram()
-        self.phong_program.add_shader(Shader(_SHAPE_VERTEX_PATH))
-        self.phong_program.add_shader(Shader(_SHAPE_FRAGMENT_PATH))
-        self.phong_program.build()
-
-        # Gouraud shading program
-        self.gouraud_program = ShaderProgram()
-        self.gouraud_program.add_shader(Shader(_GOURAUD_VERTEX_PATH))
-        self.gouraud_program.add_shader(Shader(_GOURAUD_FRAGMENT_PATH))
-        self.gouraud_program.build()
-
-        # Blinn-Phong shading program
-        self.blinn_phong_program = ShaderProgram()
-        self.blinn_phong_program.add_shader(Shader(_BLINN_PHONG_VERTEX_PATH))
-        self.blinn_phong_program.add_shader(Shader(_BLINN_PHONG_FRAGMENT_PATH))
-        self.blinn_phong_program.build()
+        # Ignore passed parameters - every shape uses the same four programs,
+        # shared between all shapes so draws can be grouped per program.
+        self.normal_program = ShaderProgram.shared(
+            _NORMAL_VERTEX_PATH, _NORMAL_FRAGMENT_PATH
+        )
+        self.phong_program = ShaderProgram.shared(
+            _SHAPE_VERTEX_PATH, _SHAPE_FRAGMENT_PATH
+        )
+        self.gouraud_program = ShaderProgram.shared(
+            _GOURAUD_VERTEX_PATH, _GOURAUD_FRAGMENT_PATH
+        )
+        self.blinn_phong_program = ShaderProgram.shared(
+            _BLINN_PHONG_VERTEX_PATH, _BLINN_PHONG_FRAGMENT_PATH
+        )
+
+        # Callbacks run with this shape whenever its draw state (program,
+        # texture, texture toggle) changes, e.g. by a recorded CommandList.
+        self.state_observers: list = []
 
         # Geometry containers
         self.shapes: list[Part] = []
@@ -80,6 +107,9 @@ class Shape:
         self.texture = None
         self.texture_enabled = False
         self.shading_mode = ShadingModel.PHONG
+        self.clustered_lighting = False
+        self._bounds = None
+        self._triangles = None
 
         # Get uniform locations for all three programs
         self._init_uniform_locations()
@@ -95,6 +125,8 @@ class Shape:
         self.project_locs = {}
         self.use_texture_locs = {}
         self.texture_data_locs = {}
+        # Capture-only uniform, see rendering/capture.py
+        self.instance_id_locs = {}
 
         # Lighting uniforms (not in normal shader)
         self.I_lights_locs = {}
@@ -121,6 +153,9 @@ class Shape:
             self.texture_data_locs[mode] = GL.glGetUniformLocation(
                 program.program, "textureData"
             )
+            self.instance_id_locs[mode] = GL.glGetUniformLocation(
+                program.program, "instance_id"
+            )
 
             # Lighting uniforms (only for Phong and Gouraud)
             if mode != ShadingModel.NORMAL:
@@ -252,31 +287,98 @@ class Shape:
             I[:, 2] = np.array(light_color, dtype=np.float32)
             GL.glUniformMatrix3fv(self.I_lights_locs[mode], 1, GL.GL_TRUE, I)
 
-        # material coefficients modify this method in the specific shape class.
+        # material coefficients come from the class attributes above.
         if self.K_materials_locs[mode] != -1:
-            K = np.zeros((3, 3), dtype=np.float32)
-            # diffuse
-            K[:, 0] = np.array([1.0, 1.0, 1.0], dtype=np.float32)
-            # specular
-            K[:, 1] = np.array([0.2, 0.2, 0.2], dtype=np.float32)
-            # ambient
-            K[:, 2] = np.array([0.0, 0.0, 0.0], dtype=np.float32)
-            GL.glUniformMatrix3fv(self.K_materials_locs[mode], 1, GL.GL_TRUE, K)
+            GL.glUniformMatrix3fv(
+                self.K_materials_locs[mode], 1, GL.GL_TRUE, self.material_matrix()
+            )
 
         if self.shininess_locs[mode] != -1:
-            GL.glUniform1f(self.shininess_locs[mode], 32.0)
+            GL.glUniform1f(self.shininess_locs[mode], self.shininess)
 
         # light position should be provided in eye-space
         if self.light_coord_locs[mode] != -1:
             GL.glUniform3fv(self.light_coord_locs[mode], 1, light_position)
         program.deactivate()
 
+    def material_matrix(self) -> np.ndarray:
+        """K_materials with [diffuse, specular, ambient] columns."""
+        K = np.zeros((3, 3), dtype=np.float32)
+        K[:, 0] = self.diffuse
+        K[:, 1] = self.specular
+        K[:, 2] = self.ambient
+        return K
+
+    @property
+    def bounds(self) -> Bounds | None:
+        """Local-space AABB and bounding sphere, computed once after building."""
+        if self._bounds is None:
+            self._bounds = self._compute_bounds()
+        return self._bounds
+
+    @property
+    def triangles(self) -> np.ndarray:
+        """All part triangles in local space, cached for ray picking."""
+        if self._triangles is None:
+            parts = [part.triangles() for part in self.shapes]
+            self._triangles = (
+                np.concatenate(parts) if parts else np.empty((0, 3, 3), np.float32)
+            )
+        return self._triangles
+
+    def _compute_bounds(self) -> Bounds | None:
+        return Bounds.from_point_sets(part.vao.positions for part in self.shapes)
+
+    def _state_changed(self) -> None:
+        for observer in self.state_observers:
+            observer(self)
+
+    @property
+    def shading_mode(self) -> ShadingModel:
+        return self._shading_mode
+
+    @shading_mode.setter
+    def shading_mode(self, shading: ShadingModel) -> None:
+        self._shading_mode = shading
+        self._state_changed()
+
+    @property
+    def texture(self) -> Texture2D | None:
+        return self._texture
+
+    @texture.setter
+    def texture(self, texture: Texture2D | None) -> None:
+        self._texture = texture
+        self._state_changed()
+
+    @property
+    def texture_enabled(self) -> bool:
+        return self._texture_enabled
+
+    @texture_enabled.setter
+    def texture_enabled(self, enabled: bool) -> None:
+        self._texture_enabled = enabled
+        self._state_changed()
+
     def set_shading_mode(self, shading: ShadingModel) -> None:
         """Switch to a different shading mode by changing the active shader program."""
         if shading == self.shading_mode:
             return
         self.shading_mode = shading
 
+    def set_clustered_lighting(self, enabled: bool) -> None:
+        """Shade PHONG mode with the clustered multi-light program instead."""
+        if enabled == self.clustered_lighting:
+            return
+        self.clustered_lighting = enabled
+        self.phong_program = ShaderProgram.shared(
+            _SHAPE_VERTEX_PATH,
+            _CLUSTERED_FRAGMENT_PATH if enabled else _SHAPE_FRAGMENT_PATH,
+        )
+        self._init_uniform_locations()
+        self._init_uniform_defaults()
+        self._state_changed()
+
     @staticmethod
     def _apply_color_override(
         colors: np.ndarray,
@@ -302,7 +404,8 @@ class Shape:
 
     def set_texture_enabled(self, enabled: bool) -> None:
         """Enable or disable texture mapping for this shape."""
-        self.texture_enabled = enabled
+        if enabled != self.texture_enabled:
+            self.texture_enabled = enabled
 
     def cleanup(self):
         """Cleanup OpenGL resources used by this shape."""
@@ -316,12 +419,6 @@ class Shape:
             if self.texture and hasattr(self.texture, "cleanup"):
                 self.texture.cleanup()
 
-            # Clean up all three shader programs
-            if hasattr(self.normal_program, "cleanup"):
-                self.normal_program.cleanup()
-            if hasattr(self.phong_program, "cleanup"):
-                self.phong_program.cleanup()
-            if hasattr(self.gouraud_program, "cleanup"):
-                self.gouraud_program.cleanup()
+            # Shader programs are shared, see ShaderProgram.release_shared
         except Exception:
             pass  # Silently ignore cleanup errors
@@ -16,6 +16,7 @@ class LightSource(Shape):
         vertex_file=None,
         fragment_file=None,
         texture_file=None,
+        light_range=None,
     ) -> None:
         super().__init__(vertex_file, fragment_file)
         if texture_file:
@@ -27,6 +28,9 @@ class LightSource(Shape):
             if color is not None
             else np.array([1.0, 1.0, 1.0], dtype=np.float32)
         )
+        # Distance at which clustered lighting fades the light out entirely
+        # (None: reaches everything, like the single-light path).
+        self.light_range = light_range
 
         radius = 1.0
         sector = 30
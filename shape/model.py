@@ -1,9 +1,11 @@
 import numpy as np
 
 from OpenGL import GL
+from scipy.spatial import ConvexHull
 
 from utils.misc import load_model, load_texture
 from shape.base import Shape, Part
+from graphics.bounds import Bounds
 from graphics.buffer import VAO
 from config import ModelVisualizationMode
 
@@ -93,25 +95,54 @@ class Model(Shape):
         # 2D bounding box will be computed dynamically during rendering
         self.bbox_2d_vao = None
         self.current_mvp = None
+        # Homogeneous vertices and their hull subset, built on first use, and
+        # the last box with the matrices it was projected with.
+        self._homogeneous = None
+        self._bbox_key = None
+        self._bbox = None
+
+    def _compute_bounds(self):
+        """Bounds from the loaded mesh vertices kept for visualization."""
+        return Bounds.from_point_sets(self.all_vertices)
+
+    def _homogeneous_vertices(self):
+        """All vertices and their convex hull subset as float32 (N, 4) rows.
+
+        A projected box is bounded by hull vertices only, as long as they
+        all lie in front of the camera.
+        """
+        if self._homogeneous is None:
+            all_verts = np.vstack(self.all_vertices)
+            vertices = np.hstack([all_verts, np.ones((len(all_verts), 1))]).astype(
+                np.float32
+            )
+            try:
+                hull = vertices[np.sort(ConvexHull(all_verts[:, :3]).vertices)]
+            except (RuntimeError, ValueError):  # flat or too few points
+                hull = vertices
+            self._homogeneous = (vertices, hull)
+        return self._homogeneous
 
     def _compute_2d_bounding_box(self, model_matrix, view_matrix, proj_matrix):
         """Compute 2D screen-space bounding box from transformed vertices."""
         if not self.all_vertices:
             return None
 
-        # Combine all vertices
-        all_verts = np.vstack(self.all_vertices)
+        key = tuple(
+            np.asarray(matrix).tobytes()
+            for matrix in (model_matrix, view_matrix, proj_matrix)
+        )
+        if key == self._bbox_key:
+            return self._bbox
 
         # Transform vertices to clip space
         mvp = proj_matrix @ view_matrix @ model_matrix
 
-        # Add homogeneous coordinate
-        vertices_homogeneous = np.hstack(
-            [all_verts, np.ones((len(all_verts), 1))]
-        ).astype(np.float32)
-
-        # Transform to clip space
-        clip_coords = vertices_homogeneous @ mvp.T
+        # Project the hull; all vertices if part of it is behind the camera
+        vertices, hull = self._homogeneous_vertices()
+        clip_coords = hull @ mvp.T
+        if hull is not vertices and (clip_coords[:, 3] <= 0.0).any():
+            clip_coords = vertices @ mvp.T
 
         # Perform perspective division to get NDC coordinates
         ndc_coords = clip_coords[:, :3] / clip_coords[:, 3:4]
@@ -140,7 +171,9 @@ class Model(Shape):
         # Create line indices for rectangle outline
         indices = np.array([0, 1, 1, 2, 2, 3, 3, 0], dtype=np.uint32)
 
-        return corners, indices
+        self._bbox_key = key
+        self._bbox = (corners, indices)
+        return self._bbox
 
     def _generate_depth_map(self):
         """Generate depth-based color visualization."""
@@ -69,4 +69,5 @@ from . import (
     ethane,
     ethylene,
     benzene,
+    molecule_lights,
 )  # noqa: E402,F401
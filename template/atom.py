@@ -92,6 +92,30 @@ def build() -> Node:
     return scene
 
 
+def build_bohr(layers: int = 4) -> Node:
+    """Bohr model with ``layers`` shells of 2n^2 electrons each (radius 4n)."""
+    scene = Node("atom_root")
+    scene.add(_generate_nucleus(0, 0, 0, 1, 7, 4))
+
+    for n in range(1, layers + 1):
+        radius = 4.0 * n
+        speed = 0.4 + 0.1 * n
+        for phase in np.linspace(0, np.pi * 2, 2 * n * n, endpoint=False):
+            scene.add(_generate_orbit_ring(radius))
+            scene.add(_generate_electron(phase, radius, speed))
+
+    light = ShapeFactory.create_shape(ShapeType.LIGHT_SOURCE, shape_cfg)
+    scene.add(
+        TransformNode(
+            "light_parent",
+            Translate(30.0, 30.0, 30.0),
+            [LightNode("light", light)],
+        )
+    )
+
+    return scene
+
+
 from . import register_scene
 
 register_scene("atom", build)
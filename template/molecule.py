@@ -31,6 +31,7 @@ class MoleculeConfig:
     bond_color: Sequence[float] = DEFAULT_BOND_COLOR
     directions: Sequence[Sequence[float]] | None = None
     bond_orders: Sequence[int] | None = None
+    with_light: bool = True
 
 
 def _unit_vectors(count: int) -> Iterable[np.ndarray]:
@@ -191,15 +192,16 @@ def build_ball_and_stick(config: MoleculeConfig | None = None) -> Node:
             )
         )
 
-    light_cfg = ShapeConfig()
-    light = ShapeFactory.create_shape(ShapeType.LIGHT_SOURCE, light_cfg)
-    root.add(
-        TransformNode(
-            "scene_light",
-            Translate(30.0, 30.0, 30.0),
-            [LightNode("light", light)],
+    if cfg.with_light:
+        light_cfg = ShapeConfig()
+        light = ShapeFactory.create_shape(ShapeType.LIGHT_SOURCE, light_cfg)
+        root.add(
+            TransformNode(
+                "scene_light",
+                Translate(30.0, 30.0, 30.0),
+                [LightNode("light", light)],
+            )
         )
-    )
 
     return root
 
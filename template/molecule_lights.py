@@ -0,0 +1,69 @@
+"""Benchmark scene: a molecule orbited by a swarm of small point lights."""
+
+from __future__ import annotations
+
+import colorsys
+
+import numpy as np
+
+from graphics.scene import LightNode, Node, TransformNode
+from rendering.animation import circular_orbit
+from rendering.world import Rotate, Scale, Translate
+from shape.light_source import LightSource
+
+from .molecule import MoleculeConfig, build_ball_and_stick
+
+
+LIGHT_COUNT = 256
+LIGHT_RANGE = 4.0
+
+
+def _orbiting_light(index: int, rng: np.random.Generator) -> TransformNode:
+    """A light on a tilted circular orbit around the molecule."""
+    hue = index / LIGHT_COUNT
+    light = LightSource(
+        color=colorsys.hsv_to_rgb(hue, 0.7, 1.0),
+        light_range=LIGHT_RANGE,
+    )
+    axis = rng.normal(size=3)
+    return TransformNode(
+        f"light_{index}_tilt",
+        Rotate(axis=tuple(axis.tolist()), angle=float(rng.uniform(0.0, 180.0))),
+        [
+            TransformNode(
+                f"light_{index}_orbit",
+                Translate(
+                    0.0,
+                    0.0,
+                    0.0,
+                    circular_orbit(
+                        phase=float(rng.uniform(0.0, 2 * np.pi)),
+                        speed=float(rng.uniform(0.3, 1.2)),
+                        radius=float(rng.uniform(4.0, 10.0)),
+                        axis="xy",
+                    ),
+                ),
+                [
+                    TransformNode(
+                        f"light_{index}_size",
+                        Scale(0.1),
+                        [LightNode(f"light_{index}", light)],
+                    )
+                ],
+            )
+        ],
+    )
+
+
+def build(light_count: int = LIGHT_COUNT) -> Node:
+    """Build the molecule with ``light_count`` orbiting lights."""
+    root = build_ball_and_stick(MoleculeConfig(attached_count=6, with_light=False))
+    rng = np.random.default_rng(0)
+    for index in range(light_count):
+        root.add(_orbiting_light(index, rng))
+    return root
+
+
+from . import register_scene
+
+register_scene("molecule_lights", build)
@@ -427,53 +427,9 @@ class ChemistryPanel:
                 or self.mode == ChemistryMode.BOHR_MODEL
             ):
                 # Load Bohr model (atom scene) with specific electron layers
-                scene = get_scene("atom")
-
-                # Rebuild atom scene with custom electron layers
-                from template.atom import (
-                    _generate_nucleus,
-                    _generate_electron,
-                    _generate_orbit_ring,
-                )
-                from graphics.scene import Node, TransformNode, LightNode
-                from rendering.world import Translate
-                from shape.factory import ShapeFactory
-                from config import ShapeConfig, ShapeType
-                import numpy as np
-
-                root = Node("atom_root")
-                root.add(_generate_nucleus(0, 0, 0, 1, 7, 4))
-
-                # Calculate electrons for each layer using formula: 2 * n^2
-                # Layer 1: 2 * 1^2 = 2, Layer 2: 2 * 2^2 = 8, Layer 3: 2 * 3^2 = 18, Layer 4: 2 * 4^2 = 32
-                radii = [4.0, 8.0, 12.0, 16.0]
-                speeds = [0.5, 0.6, 0.7, 0.8]
-
-                for layer_idx in range(self.electron_layers):
-                    n = layer_idx + 1  # Shell number (1-indexed)
-                    num_electrons = 2 * (n**2)
-                    radius = radii[layer_idx]
-                    speed = speeds[layer_idx]
-
-                    for phase in np.linspace(
-                        0, np.pi * 2, num_electrons, endpoint=False
-                    ):
-                        ring = _generate_orbit_ring(radius)
-                        electron = _generate_electron(phase, radius, speed)
-                        root.add(ring)
-                        root.add(electron)
-
-                # Add light
-                shape_cfg = ShapeConfig()
-                light = ShapeFactory.create_shape(ShapeType.LIGHT_SOURCE, shape_cfg)
-                root.add(
-                    TransformNode(
-                        "light_parent",
-                        Translate(30.0, 30.0, 30.0),
-                        [LightNode("light", light)],
-                    )
-                )
+                from template.atom import build_bohr
 
+                root = build_bohr(self.electron_layers)
                 self.renderer.set_scene(root)
 
             elif self.mode == ChemistryMode.MOLECULES:
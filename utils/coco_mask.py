@@ -0,0 +1,86 @@
+"""COCO segmentation encoding of instance-ID images."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def encode_instances(
+    instance: np.ndarray, ids: Sequence[int] | None = None
+) -> Dict[int, dict]:
+    """Uncompressed COCO RLE of every instance of an ID image in one pass.
+
+    Runs are found once for the whole image and grouped per ID; each RLE
+    alternates background and foreground counts over the column-major
+    pixels, starting with background (possibly 0) and ending with the
+    trailing background, as pycocotools expects. ``ids`` defaults to every
+    nonzero ID present; absent ones get an all-background RLE.
+
+    Value changes are detected in row-major order, which needs no
+    transposed copy of the image, and only the few change positions are
+    sorted into column-major order.
+    """
+    height, width = instance.shape
+    size = height * width
+
+    # Runs start below a vertical change and at the top of a column whose
+    # first pixel differs from the last pixel of the previous column.
+    below = np.flatnonzero(instance[1:] != instance[:-1])
+    rows, cols = np.divmod(below, width)
+    wrapped = np.flatnonzero(instance[0, 1:] != instance[-1, :-1]) + 1
+    starts = np.sort(
+        np.concatenate(([0], cols * height + rows + 1, wrapped * height))
+    )
+    ends = np.append(starts[1:], size)
+    values = instance[starts % height, starts // height]
+
+    if ids is None:
+        ids = np.unique(values[values != 0])
+    ids = np.asarray(ids, dtype=instance.dtype)
+
+    # Runs of the wanted IDs, grouped by ID and in pixel order within one.
+    keep = np.flatnonzero(np.isin(values, ids))
+    keep = keep[np.argsort(values[keep], kind="stable")]
+    run_ids, run_starts, run_ends = values[keep], starts[keep], ends[keep]
+    first = np.ones(keep.size, dtype=bool)
+    first[1:] = run_ids[1:] != run_ids[:-1]
+    previous_end = np.roll(run_ends, 1)
+    previous_end[first] = 0
+    counts = np.stack((run_starts - previous_end, run_ends - run_starts), axis=1)
+
+    group_ids, group_starts = run_ids[first], np.flatnonzero(first)
+    groups = np.split(counts, group_starts[1:]) if keep.size else []
+    encoded = {}
+    for value, runs in zip(group_ids.tolist(), groups):
+        tail = size - int(runs.sum())
+        encoded[value] = {
+            "size": [height, width],
+            "counts": runs.ravel().tolist() + ([tail] if tail else []),
+        }
+    for value in ids.tolist():
+        encoded.setdefault(value, {"size": [height, width], "counts": [size]})
+    return encoded
+
+
+def rle_area(rle: dict) -> int:
+    """Foreground pixels of an uncompressed RLE."""
+    return int(sum(rle["counts"][1::2]))
+
+
+def mask_polygons(mask: np.ndarray) -> List[List[float]]:
+    """Outer contours of a binary mask as COCO ``[x0, y0, x1, y1, ...]`` lists."""
+    import cv2
+
+    contours, _ = cv2.findContours(
+        mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    return [
+        contour.reshape(-1).astype(float).tolist()
+        for contour in contours
+        if len(contour) >= 3
+    ]
+
+
+__all__ = ["encode_instances", "mask_polygons", "rle_area"]
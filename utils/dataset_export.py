@@ -3,45 +3,112 @@
 from __future__ import annotations
 
 import json
+import os
+from collections import defaultdict
+from concurrent.futures import Future
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 import numpy as np
-from PIL import Image
 from OpenGL import GL
 
+from rendering.capture import (
+    CapturePass,
+    CaptureResult,
+    InstanceStats,
+    clip_planes,
+    instance_stats,
+)
+from rendering.readback import PixelReadback
+from utils.coco_mask import encode_instances, mask_polygons, rle_area
+from utils.export_writer import ExportWriter
+from utils.tar_shards import TarShardReader, TarShardWriter, rebuild_index
+
+
+def read_journal(path: Path):
+    """Yield (kind, record) for every complete line of a COCO journal."""
+    if not path.exists():
+        return
+    with path.open("r", encoding="utf-8") as journal:
+        for line in journal:
+            if not line.endswith("\n"):
+                break  # torn final write
+            kind, record = next(iter(json.loads(line).items()))
+            yield kind, record
+
 
 class DatasetExporter:
     """Handles exporting scene data to COCO and YOLO dataset formats."""
 
-    def __init__(self, base_folder: str = "dataset"):
+    def __init__(
+        self,
+        base_folder: str = "dataset",
+        depth_format: str = "npy",
+        depth_scale: float = 1000.0,
+        segmentation: str = "rle",
+        output: str = "files",
+        shard_size: int = 1 << 30,
+    ):
+        if depth_format not in ("npy", "png16"):
+            raise ValueError(f"Unknown depth format: {depth_format}")
+        if segmentation not in ("rle", "polygon"):
+            raise ValueError(f"Unknown segmentation format: {segmentation}")
+        if output not in ("files", "tar"):
+            raise ValueError(f"Unknown output format: {output}")
         self.base_folder = Path(base_folder)
         self.coco_folder = self.base_folder / "coco"
         self.yolo_folder = self.base_folder / "yolo"
+        self.frames_folder = self.base_folder / "frames"
+        self.shards_folder = self.base_folder / "shards"
         self.export_count = 0
+        self.frame_count = 0
+        # Depth maps are float32 ``.npy`` view-space distances, or 16-bit
+        # PNGs holding distance * depth_scale (1000: millimeters for meters).
+        self.depth_format = depth_format
+        self.depth_scale = float(depth_scale)
+        # COCO "segmentation" of each annotation: uncompressed RLE of its
+        # instance mask, or its outer contours as polygons (needs OpenCV).
+        self.segmentation = segmentation
+        # "files" writes the COCO and YOLO folder layouts; "tar" writes each
+        # export as one sample of WebDataset tar shards of about shard_size
+        # bytes, with COCO annotations still journaled next to them.
+        self.output = output
+        self.shards = (
+            TarShardWriter(self.shards_folder, shard_size) if output == "tar" else None
+        )
+        # (file futures, COCO records) of queued exports, journaled in order
+        # once their files or tar sample are written so the two always agree.
+        self._unjournaled: list = []
+        self.readback = PixelReadback()
+        self.capture_pass = CapturePass()
+        # Encodes and saves images off the render thread.
+        self.writer = ExportWriter()
 
         # Create directory structure
         self._setup_directories()
 
-        # COCO dataset structure
-        self.coco_data = {
-            "info": {
-                "description": "3D Graphics Export Dataset",
-                "version": "1.0",
-                "year": datetime.now().year,
-                "contributor": "OpenGL Renderer",
-                "date_created": datetime.now().isoformat(),
-            },
-            "licenses": [],
-            "images": [],
-            "annotations": [],
-            "categories": [{"id": 1, "name": "model", "supercategory": "object"}],
+        # COCO dataset structure; images and annotations are appended to
+        # the journal one record per line and consolidated by `finalize`.
+        self.coco_info = {
+            "description": "3D Graphics Export Dataset",
+            "version": "1.0",
+            "year": datetime.now().year,
+            "contributor": "OpenGL Renderer",
+            "date_created": datetime.now().isoformat(),
         }
+        self.coco_categories = [{"id": 1, "name": "model", "supercategory": "object"}]
         self.annotation_id = 1
+        self.journal_path = self.coco_folder / "annotations.jsonl"
+        self._resume_journal()
 
     def _setup_directories(self):
         """Create necessary directory structure."""
+        self.coco_folder.mkdir(parents=True, exist_ok=True)
+        self.frames_folder.mkdir(parents=True, exist_ok=True)
+        if self.output == "tar":
+            return  # samples live in the shards
+
         # COCO structure
         (self.coco_folder / "images").mkdir(parents=True, exist_ok=True)
         (self.coco_folder / "depth").mkdir(parents=True, exist_ok=True)
@@ -65,6 +132,74 @@ class DatasetExporter:
 
         return image
 
+    def _read_journal(self):
+        return read_journal(self.journal_path)
+
+    def _resume_journal(self):
+        """Continue the numbering of an existing journal, e.g. after a crash."""
+        if not self.journal_path.exists():
+            self._append_journal([("info", self.coco_info)])
+            return
+        valid_bytes = 0
+        with self.journal_path.open("rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                valid_bytes += len(line)
+        with self.journal_path.open("r+b") as journal:
+            journal.truncate(valid_bytes)
+
+        for kind, record in self._read_journal():
+            if kind == "info":
+                self.coco_info = record
+            elif kind == "image":
+                self.export_count = max(self.export_count, record["id"])
+            elif kind == "annotation":
+                self.annotation_id = max(self.annotation_id, record["id"] + 1)
+
+    def _append_journal(self, records):
+        """Append (kind, record) pairs with a single write."""
+        text = "".join(
+            json.dumps({kind: record}, separators=(",", ":")) + "\n"
+            for kind, record in records
+        )
+        with self.journal_path.open("a", encoding="utf-8") as journal:
+            journal.write(text)
+            journal.flush()
+
+    def finalize(self, path: Optional[str] = None) -> Path:
+        """Stream the journal into a COCO annotations file and return its path."""
+        path = Path(path) if path else self.coco_folder / "annotations.json"
+        partial = path.with_name(path.name + ".partial")
+        with partial.open("w", encoding="utf-8") as out:
+            out.write('{"info": ' + json.dumps(self.coco_info))
+            out.write(', "licenses": [], "categories": ')
+            out.write(json.dumps(self.coco_categories))
+            for section, kind in (("images", "image"), ("annotations", "annotation")):
+                out.write(f', "{section}": [')
+                separator = ""
+                for record_kind, record in self._read_journal():
+                    if record_kind == kind:
+                        out.write(separator + json.dumps(record))
+                        separator = ", "
+                out.write("]")
+            out.write("}\n")
+        os.replace(partial, path)
+        return path
+
+    def queue_frame(self, width: int, height: int) -> None:
+        """Start an asynchronous capture of the current frame, see `poll_frames`."""
+        self.frame_count += 1
+        path = self.frames_folder / f"frame_{self.frame_count:06d}.png"
+        self.readback.queue(width, height, path)
+
+    def poll_frames(self, wait: bool = False) -> int:
+        """Save the queued frames whose readback finished; returns how many."""
+        ready = self.readback.poll(wait)
+        for path, image in ready:
+            self.writer.save_image(image, [path])
+        return len(ready)
+
     def extract_bounding_boxes(
         self, models: List
     ) -> List[Tuple[float, float, float, float]]:
@@ -72,42 +207,43 @@ class DatasetExporter:
         Extract 2D bounding boxes from models.
         Returns list of (x_min, y_min, x_max, y_max) in normalized coordinates [0, 1].
         """
-        bboxes = []
-
-        for model in models:
-            if not hasattr(model, "stored_model_matrix"):
-                continue
-
-            # Compute 2D bounding box
-            bbox_data = model._compute_2d_bounding_box(
-                model.stored_model_matrix,
-                model.stored_view_matrix,
-                model.stored_proj_matrix,
-            )
-
-            if bbox_data is None:
-                continue
+        bboxes = [self._model_bounding_box(model) for model in models]
+        return [bbox for bbox in bboxes if bbox is not None]
+
+    @staticmethod
+    def _model_bounding_box(model) -> Optional[Tuple[float, float, float, float]]:
+        """Normalized box of one model as last drawn, None if never drawn."""
+        if not hasattr(model, "stored_model_matrix"):
+            return None
+
+        # Compute 2D bounding box
+        bbox_data = model._compute_2d_bounding_box(
+            model.stored_model_matrix,
+            model.stored_view_matrix,
+            model.stored_proj_matrix,
+        )
 
-            corners, _ = bbox_data
+        if bbox_data is None:
+            return None
 
-            # Extract min/max coordinates (already in NDC [-1, 1])
-            x_coords = corners[:, 0]
-            y_coords = corners[:, 1]
+        corners, _ = bbox_data
 
-            min_x = x_coords.min()
-            max_x = x_coords.max()
-            min_y = y_coords.min()
-            max_y = y_coords.max()
+        # Extract min/max coordinates (already in NDC [-1, 1])
+        x_coords = corners[:, 0]
+        y_coords = corners[:, 1]
 
-            # Convert from NDC [-1, 1] to normalized [0, 1]
-            min_x = (min_x + 1.0) / 2.0
-            max_x = (max_x + 1.0) / 2.0
-            min_y = (min_y + 1.0) / 2.0
-            max_y = (max_y + 1.0) / 2.0
+        min_x = x_coords.min()
+        max_x = x_coords.max()
+        min_y = y_coords.min()
+        max_y = y_coords.max()
 
-            bboxes.append((min_x, min_y, max_x, max_y))
+        # Convert from NDC [-1, 1] to normalized [0, 1]
+        min_x = (min_x + 1.0) / 2.0
+        max_x = (max_x + 1.0) / 2.0
+        min_y = (min_y + 1.0) / 2.0
+        max_y = (max_y + 1.0) / 2.0
 
-        return bboxes
+        return (min_x, min_y, max_x, max_y)
 
     def export_dataset(self, width: int, height: int, models: List, renderer) -> str:
         """
@@ -117,7 +253,7 @@ class DatasetExporter:
             width: Framebuffer width
             height: Framebuffer height
             models: List of Model objects in the scene
-            renderer: Renderer instance for mode switching
+            renderer: Renderer instance used for the capture render
 
         Returns:
             Status message
@@ -125,136 +261,277 @@ class DatasetExporter:
         if not models:
             return "No models found in scene to export"
 
-        self.export_count += 1
-        filename_base = f"export_{self.export_count:04d}"
-
-        # Extract bounding boxes
-        bboxes = self.extract_bounding_boxes(models)
+        # Color, float depth and instance IDs from a single render, plus
+        # the unoccluded coverage of every instance
+        capture = self.capture_pass.capture(renderer, width, height, coverage=True)
+        stats = capture.stats()
+
+        # Each model is one draw slot, so one instance of the capture; its
+        # box is that of its visible pixels
+        slots = {id(node.shape): index + 1 for index, node in enumerate(capture.nodes)}
+        instance_ids = [
+            slots[id(model)]
+            for model in models
+            if id(model) in slots and stats.pixels[slots[id(model)]]
+        ]
+
+        if not instance_ids:
+            return "No visible models to export"
+
+        return self.export_capture(
+            capture,
+            self._stats_boxes(stats, instance_ids, width, height),
+            instance_ids=instance_ids,
+            stats=stats,
+        )
 
-        if not bboxes:
-            return "Could not extract bounding boxes from models"
+    @staticmethod
+    def mask_bounding_boxes(
+        instance: np.ndarray, stats: Optional[InstanceStats] = None
+    ) -> Dict[int, Tuple[float, float, float, float]]:
+        """Normalized top-down box of every instance visible in an ID image.
 
-        # Capture normal render
-        normal_image = self.capture_framebuffer(width, height)
+        ``stats`` are the image's `instance_stats` if already computed.
+        """
+        height, width = instance.shape
+        if stats is None:
+            stats = instance_stats(instance)
+        visible = stats.visible.tolist()
+        boxes = DatasetExporter._stats_boxes(stats, visible, width, height)
+        return dict(zip(visible, boxes))
+
+    @staticmethod
+    def _stats_boxes(
+        stats: InstanceStats, instance_ids: List[int], width: int, height: int
+    ) -> List[Tuple[float, float, float, float]]:
+        """Normalized visible boxes of the given instances."""
+        boxes = stats.boxes[instance_ids] / np.array([width, height, width, height])
+        return [tuple(box) for box in boxes.tolist()]
 
-        # Capture depth map
-        depth_image = self._capture_depth_map(width, height, models, renderer)
+    def export_capture(
+        self,
+        capture: CaptureResult,
+        bboxes: List[Tuple[float, float, float, float]],
+        metadata: Optional[dict] = None,
+        instance_ids: Optional[List[int]] = None,
+        stats: Optional[InstanceStats] = None,
+    ) -> str:
+        """Write one capture and its boxes to both formats.
+
+        ``metadata`` is stored with the COCO image record, e.g. the
+        randomization a generator applied. ``instance_ids`` names the
+        capture instance of each box (0 for none) and fills the COCO
+        segmentation of its annotation. ``stats`` are the capture's
+        `CaptureResult.stats` if the caller already computed them.
+        """
+        self.export_count += 1
+        filename_base = f"export_{self.export_count:04d}"
+        height, width = capture.depth.shape
+        mask_image = self._mask_image(capture.instance)
+        if stats is None and capture.coverage is not None:
+            stats = capture.stats()
+
+        # COCO records, appended to the journal once the files are queued
+        records = self._export_coco(
+            filename_base,
+            bboxes,
+            width,
+            height,
+            capture,
+            metadata,
+            instance_ids,
+            stats,
+        )
 
-        # Capture segmentation mask
-        mask_image = self._capture_segmentation_mask(width, height, models, renderer)
+        if self.output == "tar":
+            sample = self._write_sample(
+                filename_base, capture, mask_image, bboxes, records
+            )
+            self._journal_when_written([sample], records)
+            return f"Exported {filename_base} to {self.shards_folder}"
 
-        # Export COCO format
-        self._export_coco(
-            filename_base, normal_image, depth_image, mask_image, bboxes, width, height
+        # Images are encoded once in the background and shared by both formats
+        files = self._save_images(
+            filename_base, capture.color, capture.depth, mask_image
         )
 
         # Export YOLO format
-        self._export_yolo(
-            filename_base, normal_image, depth_image, mask_image, bboxes, width, height
-        )
+        self._export_yolo(filename_base, bboxes)
+        self._journal_when_written(files, records)
 
         return f"Exported {filename_base} to COCO and YOLO formats"
 
-    def _capture_depth_map(
-        self, width: int, height: int, models: List, renderer
-    ) -> np.ndarray:
-        """Capture depth map visualization."""
-        from config import ModelVisualizationMode
+    def _sample_names(self, filename_base: str) -> Dict[str, str]:
+        """File names of one export by COCO image field.
 
-        # Store original modes
-        original_modes = []
-        for model in models:
-            original_modes.append(model.visualization_mode)
-            model.set_visualization_mode(ModelVisualizationMode.DEPTH_MAP)
-
-        # Force a render with depth visualization
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-        renderer.render(0.0)
-
-        # Capture
-        depth_image = self.capture_framebuffer(width, height)
-
-        # Restore original modes
-        for model, mode in zip(models, original_modes):
-            model.set_visualization_mode(mode)
-
-        # Force another render to restore display
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-        renderer.render(0.0)
+        Tar members are named ``key.ext`` so that WebDataset groups them.
+        """
+        if self.output == "tar":
+            depth = ".depth.npy" if self.depth_format == "npy" else ".depth.png"
+            return {
+                "file_name": f"{filename_base}.png",
+                "depth_map": filename_base + depth,
+                "segmentation_mask": f"{filename_base}.mask.png",
+            }
+        return {
+            "file_name": f"{filename_base}.png",
+            "depth_map": filename_base + self.depth_suffix,
+            "segmentation_mask": f"{filename_base}_mask.png",
+        }
 
-        return depth_image
+    def _write_sample(
+        self,
+        filename_base: str,
+        capture: CaptureResult,
+        mask_image: np.ndarray,
+        bboxes: List[Tuple[float, float, float, float]],
+        records: list,
+    ):
+        """Queue one export as a tar sample keyed by ``filename_base``.
 
-    def _capture_segmentation_mask(
-        self, width: int, height: int, models: List, renderer
-    ) -> np.ndarray:
-        """Capture segmentation mask visualization."""
-        from config import ModelVisualizationMode
+        The sample holds the image, depth and mask, the YOLO label as
+        ``.txt`` and the COCO image record with its annotations as ``.json``.
+        """
+        if self.depth_format == "npy":
+            depth = self.writer.encode_array(capture.depth)
+        else:
+            depth = self.writer.encode_image(self._depth_png(capture.depth))
+        data = {
+            "file_name": self.writer.encode_image(capture.color),
+            "depth_map": depth,
+            "segmentation_mask": self.writer.encode_image(mask_image),
+        }
+        # Member extensions are the names after the key, e.g. "depth.npy"
+        parts = {
+            name.partition(".")[2]: data[field]
+            for field, name in self._sample_names(filename_base).items()
+        }
+        parts["txt"] = self._yolo_label(bboxes).encode()
+        parts["json"] = self._sample_json(records)
+        return self.shards.write(filename_base, parts)
 
-        # Store original modes
-        original_modes = []
-        for model in models:
-            original_modes.append(model.visualization_mode)
-            model.set_visualization_mode(ModelVisualizationMode.SEGMENTATION_MASK)
+    def _journal_when_written(self, files: List[Future], records: list):
+        self._unjournaled.append((files, records))
+        self._journal_written()
 
-        # Force a render with mask visualization
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-        renderer.render(0.0)
+    def _journal_written(self, wait: bool = False):
+        """Journal the records of the written exports, in queue order.
 
-        # Capture
-        mask_image = self.capture_framebuffer(width, height)
+        Exports with a failed file or sample are left out; their error is
+        raised by the writer's flush.
+        """
+        records = []
+        while self._unjournaled and (
+            wait or all(future.done() for future in self._unjournaled[0][0])
+        ):
+            files, export_records = self._unjournaled.pop(0)
+            if all(future.exception() is None for future in files):
+                records.extend(export_records)
+        if records:
+            self._append_journal(records)
+
+    @staticmethod
+    def _sample_json(records: list) -> bytes:
+        image = next(record for kind, record in records if kind == "image")
+        annotations = [record for kind, record in records if kind == "annotation"]
+        return json.dumps({"image": image, "annotations": annotations}).encode()
+
+    @property
+    def depth_suffix(self) -> str:
+        return "_depth.npy" if self.depth_format == "npy" else "_depth.png"
+
+    def _depth_png(self, depth: np.ndarray) -> np.ndarray:
+        """Depth as uint16 units of 1 / depth_scale, clamped to the PNG range."""
+        scaled = np.rint(depth * self.depth_scale)
+        return np.clip(scaled, 0, np.iinfo(np.uint16).max).astype(np.uint16)
+
+    @staticmethod
+    def _mask_image(instance: np.ndarray) -> np.ndarray:
+        """One fixed random color per instance ID, black background."""
+        palette = np.random.default_rng(0).integers(
+            64, 256, size=(int(instance.max()) + 1, 3), dtype=np.uint8
+        )
+        palette[0] = 0
+        return palette[instance]
 
-        # Restore original modes
-        for model, mode in zip(models, original_modes):
-            model.set_visualization_mode(mode)
+    def _save_images(
+        self,
+        filename_base: str,
+        normal_image: np.ndarray,
+        depth: np.ndarray,
+        mask_image: np.ndarray,
+    ):
+        """Queue the images of one export for both the COCO and YOLO layouts.
 
-        # Force another render to restore display
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
-        renderer.render(0.0)
+        Returns the futures of the queued writes.
+        """
 
-        return mask_image
+        def paths(folder, filename):
+            return [
+                self.coco_folder / folder / filename,
+                self.yolo_folder / folder / filename,
+            ]
+
+        image = f"{filename_base}.png"
+        mask = f"{filename_base}_mask.png"
+        files = [
+            self.writer.save_image(normal_image, paths("images", image)),
+            self.writer.save_image(mask_image, paths("masks", mask)),
+        ]
+        depth_paths = paths("depth", filename_base + self.depth_suffix)
+        if self.depth_format == "npy":
+            files.append(self.writer.save_array(depth, depth_paths))
+        else:
+            files.append(self.writer.save_image(self._depth_png(depth), depth_paths))
+        return files
 
     def _export_coco(
         self,
         filename_base: str,
-        normal_image: np.ndarray,
-        depth_image: np.ndarray,
-        mask_image: np.ndarray,
         bboxes: List[Tuple[float, float, float, float]],
         width: int,
         height: int,
+        capture: CaptureResult,
+        metadata: Optional[dict] = None,
+        instance_ids: Optional[List[int]] = None,
+        stats: Optional[InstanceStats] = None,
     ):
-        """Export in COCO format."""
-        # Save images
-        img_filename = f"{filename_base}.png"
-        depth_filename = f"{filename_base}_depth.png"
-        mask_filename = f"{filename_base}_mask.png"
-
-        Image.fromarray(normal_image).save(self.coco_folder / "images" / img_filename)
-        Image.fromarray(depth_image).save(self.coco_folder / "depth" / depth_filename)
-        Image.fromarray(mask_image).save(self.coco_folder / "masks" / mask_filename)
+        """COCO (kind, record) pairs of one export, for the journal."""
+        names = self._sample_names(filename_base)
 
         # Add image info
         image_id = self.export_count
-        self.coco_data["images"].append(
-            {
-                "id": image_id,
-                "file_name": img_filename,
-                "width": width,
-                "height": height,
-                "depth_map": depth_filename,
-                "segmentation_mask": mask_filename,
-            }
+        image = {
+            "id": image_id,
+            "file_name": names["file_name"],
+            "width": width,
+            "height": height,
+            "depth_map": names["depth_map"],
+            "segmentation_mask": names["segmentation_mask"],
+            "camera": self._camera_record(capture),
+        }
+        if metadata:
+            image["metadata"] = metadata
+        records = [("image", image)]
+
+        # Every instance mask is run-length encoded in one pass
+        if instance_ids is None:
+            instance_ids = [0] * len(bboxes)
+        masks = encode_instances(
+            capture.instance, [value for value in instance_ids if value]
         )
+        occlusion = None if stats is None or stats.coverage is None else stats.occlusion
 
         # Add annotations for each bounding box
-        for bbox in bboxes:
+        for bbox, instance_id in zip(bboxes, instance_ids):
             x_min, y_min, x_max, y_max = bbox
 
-            # Convert to pixel coordinates
-            x_min_px = int(x_min * width)
-            y_min_px = int(y_min * height)
-            x_max_px = int(x_max * width)
-            y_max_px = int(y_max * height)
+            # Convert to pixel coordinates; rounded, as boxes of visible
+            # pixels are whole pixels that may not survive normalization
+            x_min_px = round(x_min * width)
+            y_min_px = round(y_min * height)
+            x_max_px = round(x_max * width)
+            y_max_px = round(y_max * height)
 
             bbox_width = x_max_px - x_min_px
             bbox_height = y_max_px - y_min_px
@@ -267,56 +544,81 @@ class DatasetExporter:
                 "bbox": [x_min_px, y_min_px, bbox_width, bbox_height],
                 "area": bbox_width * bbox_height,
                 "iscrowd": 0,
-                "segmentation": [],  # Could be enhanced with polygon segmentation
+                "segmentation": [],
             }
+            if instance_id:
+                rle = masks[instance_id]
+                annotation["area"] = rle_area(rle)
+                annotation["segmentation"] = (
+                    rle
+                    if self.segmentation == "rle"
+                    else mask_polygons(capture.instance == instance_id)
+                )
+                if occlusion is not None and not np.isnan(occlusion[instance_id]):
+                    # Hidden fraction of the pixels it would cover on its own
+                    annotation["occlusion"] = round(float(occlusion[instance_id]), 4)
 
-            self.coco_data["annotations"].append(annotation)
+            records.append(("annotation", annotation))
             self.annotation_id += 1
 
-        # Save COCO JSON
-        with open(self.coco_folder / "annotations.json", "w") as f:
-            json.dump(self.coco_data, f, indent=2)
+        return records
+
+    def _camera_record(self, capture: CaptureResult) -> dict:
+        """Pinhole camera of a capture, in OpenCV conventions.
+
+        ``intrinsics`` is K in pixels, ``extrinsics`` the world-to-camera
+        [R | t] (x right, y down, z forward); ``view_matrix`` is the GL view
+        matrix it came from. Depth maps hold z in the same units, and
+        ``depth_scale`` PNG units make one scene unit.
+        """
+        near, far = clip_planes(capture.proj)
+        record = {
+            "intrinsics": capture.intrinsics.tolist(),
+            "extrinsics": capture.extrinsics.tolist(),
+            "view_matrix": capture.view.tolist(),
+            "near": near,
+            "far": far,
+        }
+        if self.depth_format == "png16":
+            record["depth_scale"] = self.depth_scale
+        return record
 
     def _export_yolo(
         self,
         filename_base: str,
-        normal_image: np.ndarray,
-        depth_image: np.ndarray,
-        mask_image: np.ndarray,
         bboxes: List[Tuple[float, float, float, float]],
-        width: int,
-        height: int,
     ):
         """Export in YOLO format."""
-        # Save images
-        img_filename = f"{filename_base}.png"
-        depth_filename = f"{filename_base}_depth.png"
-        mask_filename = f"{filename_base}_mask.png"
-
-        Image.fromarray(normal_image).save(self.yolo_folder / "images" / img_filename)
-        Image.fromarray(depth_image).save(self.yolo_folder / "depth" / depth_filename)
-        Image.fromarray(mask_image).save(self.yolo_folder / "masks" / mask_filename)
-
         # Create YOLO label file
         label_filename = f"{filename_base}.txt"
         label_path = self.yolo_folder / "labels" / label_filename
 
         with open(label_path, "w") as f:
-            for bbox in bboxes:
-                x_min, y_min, x_max, y_max = bbox
-
-                # YOLO format: class_id center_x center_y width height (all normalized)
-                center_x = (x_min + x_max) / 2.0
-                center_y = (y_min + y_max) / 2.0
-                bbox_width = x_max - x_min
-                bbox_height = y_max - y_min
-
-                # Class 0 for "model"
-                f.write(
-                    f"0 {center_x:.6f} {center_y:.6f} {bbox_width:.6f} {bbox_height:.6f}\n"
-                )
+            f.write(self._yolo_label(bboxes))
+
+        self._write_data_yaml()
 
-        # Create or update data.yaml
+    @staticmethod
+    def _yolo_label(bboxes: List[Tuple[float, float, float, float]]) -> str:
+        """YOLO label file contents for normalized boxes."""
+        lines = []
+        for bbox in bboxes:
+            x_min, y_min, x_max, y_max = bbox
+
+            # YOLO format: class_id center_x center_y width height (all normalized)
+            center_x = (x_min + x_max) / 2.0
+            center_y = (y_min + y_max) / 2.0
+            bbox_width = x_max - x_min
+            bbox_height = y_max - y_min
+
+            # Class 0 for "model"
+            lines.append(
+                f"0 {center_x:.6f} {center_y:.6f} {bbox_width:.6f} {bbox_height:.6f}\n"
+            )
+        return "".join(lines)
+
+    def _write_data_yaml(self):
+        """Create or update the YOLO data.yaml."""
         yaml_path = self.yolo_folder / "data.yaml"
         yaml_content = f"""# YOLO dataset configuration
 path: {self.yolo_folder.absolute()}
@@ -330,6 +632,121 @@ names:
         with open(yaml_path, "w") as f:
             f.write(yaml_content)
 
+    def merge_shards(self, folders: List[Path], order=None) -> int:
+        """Move the exports of other, flushed dataset folders into this one.
+
+        Images and annotations are renumbered after the ones already here,
+        in ``order(image)`` order if given (e.g. a generator's sample index,
+        so the result does not depend on how exports were split) and folder
+        order otherwise, and their files renamed to match; returns how many
+        images moved. Tar samples are copied into this folder's shards
+        under their new key. The folders must use this output format.
+        """
+        images = []
+        annotations = defaultdict(list)
+        for folder in map(Path, folders):
+            for kind, record in read_journal(folder / "coco" / "annotations.jsonl"):
+                if kind == "image":
+                    images.append((folder, record))
+                elif kind == "annotation":
+                    annotations[folder, record["image_id"]].append(record)
+        if order is not None:
+            images.sort(key=lambda item: order(item[1]))
+        readers = {}
+
+        records = []
+        for folder, image in images:
+            self.export_count += 1
+            old_base = Path(image["file_name"]).stem
+            new_base = f"export_{self.export_count:04d}"
+            sample = [
+                (
+                    "image",
+                    dict(
+                        image,
+                        id=self.export_count,
+                        **self._sample_names(new_base),
+                    ),
+                )
+            ]
+            for annotation in annotations[folder, image["id"]]:
+                sample.append(
+                    (
+                        "annotation",
+                        dict(
+                            annotation,
+                            id=self.annotation_id,
+                            image_id=self.export_count,
+                        ),
+                    )
+                )
+                self.annotation_id += 1
+
+            if self.output == "tar":
+                if folder not in readers:
+                    # The index may predate the folder's last samples after a crash
+                    rebuild_index(folder / "shards")
+                    readers[folder] = TarShardReader(folder / "shards")
+                parts = {
+                    ext: bytes(data)
+                    for ext, data in readers[folder].sample(old_base).items()
+                }
+                parts["json"] = self._sample_json(sample)
+                self._journal_when_written([self.shards.write(new_base, parts)], sample)
+                continue
+            for key, subfolder in (
+                ("file_name", "images"),
+                ("depth_map", "depth"),
+                ("segmentation_mask", "masks"),
+            ):
+                filename = sample[0][1][key]
+                for layout, target in (
+                    ("coco", self.coco_folder),
+                    ("yolo", self.yolo_folder),
+                ):
+                    os.replace(
+                        folder / layout / subfolder / image[key],
+                        target / subfolder / filename,
+                    )
+            os.replace(
+                folder / "yolo" / "labels" / f"{old_base}.txt",
+                self.yolo_folder / "labels" / f"{new_base}.txt",
+            )
+            records.extend(sample)
+
+        # Queued behind any unwritten exports, to keep the journal in order
+        self._journal_when_written([], records)
+        if self.output == "files":
+            self._write_data_yaml()
+        return len(images)
+
     def get_export_count(self) -> int:
         """Get the number of exports performed."""
         return self.export_count
+
+    def flush(self):
+        """Wait until every queued image has been written."""
+        self._finish_writes(close=False)
+
+    def _finish_writes(self, close: bool):
+        """Flush or close the image writer and shards, then journal."""
+        try:
+            try:
+                if close:
+                    self.writer.close()
+                else:
+                    self.writer.flush()
+            finally:
+                if self.shards is not None:
+                    if close:
+                        self.shards.close()
+                    else:
+                        self.shards.flush()
+        finally:
+            self._journal_written(wait=True)
+
+    def cleanup(self):
+        """Release the GL buffers and stop the writer threads."""
+        self.readback.cleanup()
+        self.capture_pass.cleanup()
+        self._finish_writes(close=True)
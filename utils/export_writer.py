@@ -0,0 +1,128 @@
+"""Background image writer for dataset exports."""
+
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from PIL import Image
+
+
+def _encode_image(target, image: np.ndarray) -> None:
+    # uint16 single-channel arrays become 16-bit grayscale PNGs.
+    Image.fromarray(image).save(target, format="PNG")
+
+
+class ExportWriter:
+    """Encodes and saves images on worker threads instead of the render thread.
+
+    Every submitted image or array is encoded once, to its first path; the other
+    paths are hard links to that file (copies where the filesystem refuses
+    links). At most ``max_pending`` images wait or run at a time, after
+    which `save_image` blocks until a worker frees a slot, so a fast
+    capture loop cannot queue unbounded memory. `flush` waits for every
+    outstanding write and re-raises the first failure.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(int(max_workers), 1),
+            thread_name_prefix="export-writer",
+        )
+        self._slots = threading.BoundedSemaphore(max(int(max_pending), 1))
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+        # First failure among futures `_finished` dropped since the last flush.
+        self._error: BaseException | None = None
+
+    def save_image(self, image: np.ndarray, paths: Sequence[str | Path]) -> Future:
+        """Write ``image`` (not to be modified afterwards) to every path."""
+        return self._submit(_encode_image, image, paths)
+
+    def save_array(self, array: np.ndarray, paths: Sequence[str | Path]) -> Future:
+        """Write ``array`` as ``.npy``, loadable with ``np.load(mmap_mode="r")``."""
+        return self._submit(np.save, array, paths)
+
+    def encode_image(self, image: np.ndarray) -> Future:
+        """Future of ``image`` as PNG bytes, e.g. for `TarShardWriter`."""
+        return self._submit(_encode_image, image, [])
+
+    def encode_array(self, array: np.ndarray) -> Future:
+        """Future of ``array`` as ``.npy`` bytes."""
+        return self._submit(np.save, array, [])
+
+    def _submit(self, encode, data: np.ndarray, paths: Sequence[str | Path]):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(
+                self._write, encode, data, list(map(Path, paths))
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.append(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        """Drop a finished future, keeping its error unless flush took it."""
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            if future not in self._futures:
+                return  # flush waits on it and reports its error
+            self._futures.remove(future)
+            if error is not None and self._error is None:
+                self._error = error
+
+    @staticmethod
+    def _write(encode, data: np.ndarray, paths: list[Path]) -> bytes | None:
+        if not paths:
+            buffer = io.BytesIO()
+            encode(buffer, data)
+            return buffer.getvalue()
+        first, *others = paths
+        encode(first, data)
+        for path in others:
+            if path.exists():
+                path.unlink()
+            try:
+                os.link(first, path)
+            except OSError:
+                shutil.copyfile(first, path)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(not future.done() for future in self._futures)
+
+    def flush(self) -> None:
+        """Block until every submitted image is on disk."""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        # Waited on directly: a future wakes waiters before `_finished` runs,
+        # and errors of futures finished earlier are in `_error`.
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        with self._lock:
+            error, self._error = self._error, None
+        if errors:
+            raise errors[0]
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+__all__ = ["ExportWriter"]
@@ -0,0 +1,259 @@
+"""WebDataset-style tar shards with a memory-mappable member index."""
+
+from __future__ import annotations
+
+import io
+import os
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Mapping
+
+import numpy as np
+
+# One row per tar member: sample key, extension (the name after the key's
+# first dot), shard number and the byte range of the member's data.
+INDEX_DTYPE = np.dtype(
+    [
+        ("key", "S48"),
+        ("ext", "S16"),
+        ("shard", "<u4"),
+        ("offset", "<u8"),
+        ("size", "<u8"),
+    ]
+)
+
+
+def _shard_path(folder: Path, shard: int) -> Path:
+    return folder / f"shard-{shard:06d}.tar"
+
+
+def _scan_shard(path: Path, shard: int) -> list[tuple]:
+    """Index rows of the members of a shard, from its tar headers.
+
+    A shard cut short by a crash has no end-of-archive blocks and may end
+    inside a sample, which is then left out.
+    """
+    rows = []
+    end = 0
+    truncated = None
+    size = path.stat().st_size
+    try:
+        with tarfile.open(path, "r:", format=tarfile.USTAR_FORMAT) as tar:
+            for info in tar:
+                key, _, ext = info.name.partition(".")
+                if info.offset_data + info.size > size:
+                    truncated = key.encode()
+                    break
+                rows.append(
+                    (key.encode(), ext.encode(), shard, info.offset_data, info.size)
+                )
+                end = info.offset_data + _padded(info.size)
+    except tarfile.ReadError:
+        truncated = rows[-1][0] if rows else None
+    if truncated is None and rows:
+        # tarfile stops quietly at a cut header; only zero blocks may follow
+        # the last member of a complete shard.
+        with open(path, "rb") as file:
+            file.seek(end)
+            if file.read().strip(b"\0"):
+                truncated = rows[-1][0]
+    return [row for row in rows if row[0] != truncated]
+
+
+def _padded(size: int) -> int:
+    return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def rebuild_index(folder: str | Path) -> int:
+    """Rewrite ``index.npy`` of a shard folder from its shards; returns rows."""
+    folder = Path(folder)
+    rows = []
+    for shard in range(len(list(folder.glob("shard-*.tar")))):
+        rows.extend(_scan_shard(_shard_path(folder, shard), shard))
+    _save_index(folder / "index.npy", rows)
+    return len(rows)
+
+
+def _save_index(path: Path, rows: list[tuple]) -> None:
+    index = np.sort(np.array(rows, dtype=INDEX_DTYPE), order=["key", "ext"])
+    partial = path.with_name("index.partial.npy")
+    np.save(partial, index)
+    os.replace(partial, path)
+
+
+class TarShardWriter:
+    """Appends samples to numbered tar shards on one background thread.
+
+    `write` takes a sample key and its parts by extension, as bytes or as
+    futures of bytes (e.g. from `ExportWriter.encode_image`); members are
+    written in call order as ``key.ext``, so the parts of a sample stay
+    adjacent as WebDataset expects. A new shard starts once the current
+    one exceeds ``max_bytes``. A sample's future completes once its
+    members are flushed to the shard file. ``index.npy`` (see
+    `INDEX_DTYPE`, sorted by key) is rewritten whenever a shard is
+    completed and on `flush`; reopening a folder rebuilds it from the
+    shards' tar headers, so samples written before a crash stay indexed,
+    and starts a new shard.
+    """
+
+    def __init__(self, folder: str | Path, max_bytes: int = 1 << 30, max_pending=16):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.folder / "index.npy"
+        self.max_bytes = max(int(max_bytes), 1)
+        self._rows: list[tuple] = []
+        self._shard = len(list(self.folder.glob("shard-*.tar")))
+        for shard in range(self._shard):
+            self._rows.extend(_scan_shard(_shard_path(self.folder, shard), shard))
+        if self._shard:
+            self._save_index()
+        self._tar: tarfile.TarFile | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(max(int(max_pending), 1))
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+        # First failure among futures `_finished` dropped since the last flush.
+        self._error: BaseException | None = None
+
+    def write(self, key: str, parts: Mapping[str, bytes | Future]) -> Future:
+        """Queue one sample; ``key`` must not contain a dot."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="tar-shards"
+            )
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._append, key, dict(parts))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.append(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        """Drop a finished future, keeping its error unless flush took it."""
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            if future not in self._futures:
+                return  # flush waits on it and reports its error
+            self._futures.remove(future)
+            if error is not None and self._error is None:
+                self._error = error
+
+    def _append(self, key: str, parts: Dict[str, bytes | Future]) -> None:
+        # Every part is resolved first, so a failed one leaves no partial sample.
+        parts = {
+            ext: data.result() if isinstance(data, Future) else data
+            for ext, data in parts.items()
+        }
+        if self._tar is None:
+            path = _shard_path(self.folder, self._shard)
+            self._tar = tarfile.open(path, "w", format=tarfile.USTAR_FORMAT)
+        # The sample goes out in one write, so a crash cuts at most its own
+        # members short (see `_scan_shard`).
+        sample = io.BytesIO()
+        mtime = time.time()
+        for ext, data in parts.items():
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            info.mtime = mtime
+            sample.write(info.tobuf(tarfile.USTAR_FORMAT))
+            offset = self._tar.offset + sample.tell()
+            sample.write(data)
+            sample.write(bytes(_padded(len(data)) - len(data)))
+            self._rows.append(
+                (key.encode(), ext.encode(), self._shard, offset, len(data))
+            )
+        self._tar.fileobj.write(sample.getbuffer())
+        self._tar.fileobj.flush()
+        self._tar.offset += sample.tell()
+        if self._tar.offset >= self.max_bytes:
+            self._close_shard()
+
+    def _close_shard(self) -> None:
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._tar = None
+        self._shard += 1
+        self._save_index()
+
+    def _save_index(self) -> None:
+        _save_index(self.index_path, self._rows)
+
+    def flush(self) -> None:
+        """Wait for every queued sample and bring the index up to date."""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        # Waited on directly: a future wakes waiters before `_finished` runs,
+        # and errors of futures finished earlier are in `_error`.
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if self._executor is not None:
+            self._executor.submit(self._save_index).result()
+        with self._lock:
+            error, self._error = self._error, None
+        if errors:
+            raise errors[0]
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.submit(self._close_shard).result()
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class TarShardReader:
+    """Random access to the samples of a shard folder through its index.
+
+    The index and the shards are memory-mapped; member data is returned as
+    read-only memoryviews into the shard files.
+    """
+
+    def __init__(self, folder: str | Path):
+        self.folder = Path(folder)
+        self.index = np.load(self.folder / "index.npy", mmap_mode="r")
+        self._shards: dict[int, np.memmap] = {}
+
+    def keys(self) -> list[str]:
+        return [key.decode() for key in np.unique(self.index["key"])]
+
+    def __len__(self) -> int:
+        return len(np.unique(self.index["key"]))
+
+    def _data(self, row) -> memoryview:
+        shard = int(row["shard"])
+        if shard not in self._shards:
+            path = _shard_path(self.folder, shard)
+            self._shards[shard] = np.memmap(path, dtype=np.uint8, mode="r")
+        offset, size = int(row["offset"]), int(row["size"])
+        return memoryview(self._shards[shard][offset : offset + size])
+
+    def sample(self, key: str) -> Dict[str, memoryview]:
+        """Every member of ``key``, by extension."""
+        keys = self.index["key"]
+        encoded = key.encode()
+        start = np.searchsorted(keys, encoded, side="left")
+        stop = np.searchsorted(keys, encoded, side="right")
+        if start == stop:
+            raise KeyError(key)
+        return {
+            row["ext"].decode(): self._data(row) for row in self.index[start:stop]
+        }
+
+    def read(self, key: str, ext: str) -> memoryview:
+        return self.sample(key)[ext]
+
+
+__all__ = ["INDEX_DTYPE", "TarShardReader", "TarShardWriter", "rebuild_index"]